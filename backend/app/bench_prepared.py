@@ -0,0 +1,96 @@
+"""Compara las sentencias calientes con y sin prepared statements.
+
+Uso: python -m app.bench_prepared [--iterations 500]
+
+Corre cada sentencia registrada en repositories.prepared contra la BD de
+DATABASE_URL, dentro de una transacción que se revierte al final.
+"""
+import argparse
+import time
+
+import psycopg
+
+from .db import get_db_url
+from .repositories import fixed_costs, production, recipes, sales  # noqa: F401  registran sus sentencias
+from .repositories.prepared import HOT_STATEMENTS
+
+# sentencias que corre cada venta (costeo por plan en caché aparte)
+_SALE_PATH = (
+    "sales.lock_supplies_for_update",
+    "fixed_costs.get_active_period",
+    "fixed_costs.sum_cost_items",
+)
+
+
+def _sample_params(cur) -> dict:
+    cur.execute("select id from public.supplies order by id limit 10")
+    supply_ids = [str(r[0]) for r in cur.fetchall()]
+    cur.execute("select recipe_id from public.recipe_items group by recipe_id limit 10")
+    recipe_ids = [str(r[0]) for r in cur.fetchall()]
+    cur.execute("select id from public.fixed_cost_periods order by created_at desc limit 1")
+    period = cur.fetchone()
+
+    params = {"fixed_costs.get_active_period": None}
+    if supply_ids:
+        params["sales.lock_supplies_for_update"] = (supply_ids,)
+        params["production.lock_supplies_stock"] = (supply_ids,)
+    if recipe_ids:
+        params["recipes.list_recipe_items_for_cost"] = (recipe_ids[0],)
+        params["recipes.list_recipe_items_for_cost_many"] = (recipe_ids,)
+    if period:
+        params["fixed_costs.sum_cost_items"] = (str(period[0]),)
+    return params
+
+
+def _run(conn, params: dict, iterations: int, prepare: bool) -> dict[str, float]:
+    out = {}
+    with conn.transaction(force_rollback=True):
+        with conn.cursor() as cur:
+            for name, args in params.items():
+                sql = HOT_STATEMENTS[name]
+                # la primera ejecución prepara la sentencia; no se cuenta
+                cur.execute(sql, args, prepare=prepare)
+                cur.fetchall()
+                start = time.perf_counter()
+                for _ in range(iterations):
+                    cur.execute(sql, args, prepare=prepare)
+                    cur.fetchall()
+                out[name] = (time.perf_counter() - start) / iterations * 1_000_000
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    with psycopg.connect(get_db_url()) as conn:
+        conn.prepare_threshold = None
+        with conn.cursor() as cur:
+            params = _sample_params(cur)
+        conn.rollback()
+
+        plain = _run(conn, params, args.iterations, prepare=False)
+        prepared = _run(conn, params, args.iterations, prepare=True)
+
+    print(f"{'sentencia':45} {'sin preparar':>14} {'preparada':>12} {'ahorro':>8}")
+    for name in params:
+        saved = (plain[name] - prepared[name]) / plain[name] * 100 if plain[name] > 0 else 0.0
+        print(f"{name:45} {plain[name]:11.1f} µs {prepared[name]:9.1f} µs {saved:7.1f}%")
+
+    sale_names = [n for n in _SALE_PATH if n in params]
+    if sale_names:
+        plain_total = sum(plain[n] for n in sale_names)
+        prepared_total = sum(prepared[n] for n in sale_names)
+        print(
+            f"\nruta de venta ({len(sale_names)} sentencias): "
+            f"{plain_total:.1f} µs -> {prepared_total:.1f} µs por venta "
+            f"({plain_total - prepared_total:.1f} µs menos)"
+        )
+    skipped = sorted(set(HOT_STATEMENTS) - set(params))
+    if skipped:
+        print("sin datos de ejemplo:", ", ".join(skipped))
+
+
+if __name__ == "__main__":
+    main()
@@ -15,10 +15,44 @@ except Exception:  # pragma: no cover - fallback for pydantic v2
         Field = None  # type: ignore
 
 
+def _env_bool(name: str, default: bool) -> bool:
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    return raw.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_int(name: str, default: int) -> int:
+    raw = os.getenv(name)
+    return int(raw) if raw not in (None, "") else default
+
+
+def _env_float(name: str, default: float) -> float:
+    raw = os.getenv(name)
+    return float(raw) if raw not in (None, "") else default
+
+
 if BaseSettings:
     class Settings(BaseSettings):
         DATABASE_URL: str = Field("", env="DATABASE_URL")
         ALLOWED_ORIGINS: str = Field("http://localhost:3000", env="ALLOWED_ORIGINS")
+        DB_ASYNC_ENABLED: bool = Field(False, env="DB_ASYNC_ENABLED")
+        DB_POOL_MIN_SIZE: int = Field(1, env="DB_POOL_MIN_SIZE")
+        DB_POOL_MAX_SIZE: int = Field(5, env="DB_POOL_MAX_SIZE")
+        DB_POOL_TIMEOUT: float = Field(30.0, env="DB_POOL_TIMEOUT")
+        DB_POOL_MAX_WAITING: int = Field(0, env="DB_POOL_MAX_WAITING")
+        DB_POOL_MAX_IDLE: float = Field(600.0, env="DB_POOL_MAX_IDLE")
+        DB_POOL_MAX_LIFETIME: float = Field(3600.0, env="DB_POOL_MAX_LIFETIME")
+        DB_POOL_CHECK: bool = Field(True, env="DB_POOL_CHECK")
+        DB_POOL_OPEN_ON_STARTUP: bool = Field(True, env="DB_POOL_OPEN_ON_STARTUP")
+        DB_PREPARE_THRESHOLD: int = Field(5, env="DB_PREPARE_THRESHOLD")
+        DB_PGBOUNCER_TRANSACTION_MODE: bool = Field(False, env="DB_PGBOUNCER_TRANSACTION_MODE")
+        DB_LISTEN_ENABLED: bool = Field(True, env="DB_LISTEN_ENABLED")
+        DB_LISTEN_URL: str = Field("", env="DB_LISTEN_URL")
+        FIXED_COST_CACHE_TTL: float = Field(60.0, env="FIXED_COST_CACHE_TTL")
+        QUOTE_EXPIRY_INTERVAL_SEC: float = Field(0.0, env="QUOTE_EXPIRY_INTERVAL_SEC")
+        PRICE_LIST_CACHE_TTL: float = Field(30.0, env="PRICE_LIST_CACHE_TTL")
+        SALES_TIMEZONE: str = Field("America/Tegucigalpa", env="SALES_TIMEZONE")
 
         class Config:
             env_file = ".env"
@@ -29,6 +63,23 @@ else:
         def __init__(self) -> None:
             self.DATABASE_URL = os.getenv("DATABASE_URL", "")
             self.ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000")
+            self.DB_ASYNC_ENABLED = _env_bool("DB_ASYNC_ENABLED", False)
+            self.DB_POOL_MIN_SIZE = _env_int("DB_POOL_MIN_SIZE", 1)
+            self.DB_POOL_MAX_SIZE = _env_int("DB_POOL_MAX_SIZE", 5)
+            self.DB_POOL_TIMEOUT = _env_float("DB_POOL_TIMEOUT", 30.0)
+            self.DB_POOL_MAX_WAITING = _env_int("DB_POOL_MAX_WAITING", 0)
+            self.DB_POOL_MAX_IDLE = _env_float("DB_POOL_MAX_IDLE", 600.0)
+            self.DB_POOL_MAX_LIFETIME = _env_float("DB_POOL_MAX_LIFETIME", 3600.0)
+            self.DB_POOL_CHECK = _env_bool("DB_POOL_CHECK", True)
+            self.DB_POOL_OPEN_ON_STARTUP = _env_bool("DB_POOL_OPEN_ON_STARTUP", True)
+            self.DB_PREPARE_THRESHOLD = _env_int("DB_PREPARE_THRESHOLD", 5)
+            self.DB_PGBOUNCER_TRANSACTION_MODE = _env_bool("DB_PGBOUNCER_TRANSACTION_MODE", False)
+            self.DB_LISTEN_ENABLED = _env_bool("DB_LISTEN_ENABLED", True)
+            self.DB_LISTEN_URL = os.getenv("DB_LISTEN_URL", "")
+            self.FIXED_COST_CACHE_TTL = _env_float("FIXED_COST_CACHE_TTL", 60.0)
+            self.QUOTE_EXPIRY_INTERVAL_SEC = _env_float("QUOTE_EXPIRY_INTERVAL_SEC", 0.0)
+            self.PRICE_LIST_CACHE_TTL = _env_float("PRICE_LIST_CACHE_TTL", 30.0)
+            self.SALES_TIMEZONE = os.getenv("SALES_TIMEZONE", "America/Tegucigalpa")
 
 
 @lru_cache
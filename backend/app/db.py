@@ -1,19 +1,32 @@
+import asyncio
 import os
-from contextlib import contextmanager
+import threading
+from contextlib import AsyncExitStack, ExitStack, asynccontextmanager, contextmanager
 from dotenv import load_dotenv
 from fastapi import HTTPException
 import psycopg
 
 try:
-    from psycopg_pool import ConnectionPool
+    from psycopg_pool import ConnectionPool, PoolTimeout, TooManyRequests
 except Exception:  # pragma: no cover
     ConnectionPool = None  # type: ignore
+    PoolTimeout = TooManyRequests = None  # type: ignore
+
+try:
+    from psycopg_pool import AsyncConnectionPool
+except Exception:  # pragma: no cover
+    AsyncConnectionPool = None  # type: ignore
 
 from .core.config import get_settings
 
 load_dotenv()
 
 _pool = None
+_pool_lock = threading.Lock()
+_async_pool = None
+# se crea dentro del event loop que lo usa (uvicorn --reload o los tests abren loops nuevos)
+_async_pool_lock: asyncio.Lock | None = None
+_async_pool_loop = None
 
 
 def get_db_url() -> str:
@@ -24,24 +37,159 @@ def get_db_url() -> str:
     return db_url
 
 
+def _prepare_threshold() -> int | None:
+    settings = get_settings()
+    if getattr(settings, "DB_PGBOUNCER_TRANSACTION_MODE", False):
+        # sin prepared statements: el servidor puede cambiar entre transacciones
+        return None
+    return int(getattr(settings, "DB_PREPARE_THRESHOLD", 5))
+
+
+def _configure_connection(conn) -> None:
+    conn.prepare_threshold = _prepare_threshold()
+
+
+async def _configure_async_connection(conn) -> None:
+    conn.prepare_threshold = _prepare_threshold()
+
+
+def _pool_kwargs(pool_cls) -> dict:
+    settings = get_settings()
+    kwargs = {
+        "conninfo": get_db_url(),
+        "min_size": int(getattr(settings, "DB_POOL_MIN_SIZE", 1)),
+        "max_size": int(getattr(settings, "DB_POOL_MAX_SIZE", 5)),
+        "timeout": float(getattr(settings, "DB_POOL_TIMEOUT", 30.0)),
+        "max_waiting": int(getattr(settings, "DB_POOL_MAX_WAITING", 0)),
+        "max_idle": float(getattr(settings, "DB_POOL_MAX_IDLE", 600.0)),
+        "max_lifetime": float(getattr(settings, "DB_POOL_MAX_LIFETIME", 3600.0)),
+    }
+    if getattr(settings, "DB_POOL_CHECK", True) and hasattr(pool_cls, "check_connection"):
+        # verifica la conexión al entregarla; descarta las que el servidor cerró
+        kwargs["check"] = pool_cls.check_connection
+    return kwargs
+
+
+def _pool_exhausted_error(exc) -> bool:
+    return PoolTimeout is not None and isinstance(exc, (PoolTimeout, TooManyRequests))
+
+
 def get_pool():
     global _pool
     if ConnectionPool is None:
         return None
     if _pool is None:
-        _pool = ConnectionPool(conninfo=get_db_url(), min_size=1, max_size=5, open=True)
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    name="sync",
+                    open=True,
+                    configure=_configure_connection,
+                    **_pool_kwargs(ConnectionPool),
+                )
     return _pool
 
 
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
 @contextmanager
 def get_conn():
     pool = get_pool()
     if pool is not None:
-        with pool.connection() as conn:
+        with ExitStack() as stack:
+            try:
+                conn = stack.enter_context(pool.connection())
+            except Exception as e:
+                if _pool_exhausted_error(e):
+                    raise HTTPException(status_code=503, detail="Pool de conexiones agotado, reintentar")
+                raise
             yield conn
     else:
         with psycopg.connect(get_db_url()) as conn:
+            _configure_connection(conn)
+            yield conn
+
+
+def async_db_enabled() -> bool:
+    return bool(getattr(get_settings(), "DB_ASYNC_ENABLED", False))
+
+
+def _get_async_pool_lock() -> asyncio.Lock:
+    global _async_pool_lock, _async_pool_loop
+    loop = asyncio.get_running_loop()
+    if _async_pool_lock is None or _async_pool_loop is not loop:
+        _async_pool_lock = asyncio.Lock()
+        _async_pool_loop = loop
+    return _async_pool_lock
+
+
+async def get_async_pool():
+    global _async_pool
+    if AsyncConnectionPool is None:
+        return None
+    if _async_pool is not None:
+        return _async_pool
+    async with _get_async_pool_lock():
+        if _async_pool is None:
+            # el pool async no se puede abrir en el constructor; se abre dentro del event loop
+            pool = AsyncConnectionPool(
+                name="async",
+                open=False,
+                configure=_configure_async_connection,
+                **_pool_kwargs(AsyncConnectionPool),
+            )
+            await pool.open()
+            _async_pool = pool
+    return _async_pool
+
+
+async def close_async_pool():
+    global _async_pool
+    if _async_pool is not None:
+        await _async_pool.close()
+        _async_pool = None
+
+
+@asynccontextmanager
+async def get_async_conn():
+    pool = await get_async_pool()
+    if pool is not None:
+        async with AsyncExitStack() as stack:
+            try:
+                conn = await stack.enter_async_context(pool.connection())
+            except Exception as e:
+                if _pool_exhausted_error(e):
+                    raise HTTPException(status_code=503, detail="Pool de conexiones agotado, reintentar")
+                raise
             yield conn
+    else:
+        async with await psycopg.AsyncConnection.connect(get_db_url()) as conn:
+            await _configure_async_connection(conn)
+            yield conn
+
+
+def pool_stats() -> dict:
+    # get_stats() de psycopg_pool: tamaño, disponibles, esperas, tiempos y errores
+    out = {}
+    for name, pool in (("sync", _pool), ("async", _async_pool)):
+        out[name] = pool.get_stats() if pool is not None else None
+    return out
+
+
+@contextmanager
+def write_pipeline(conn):
+    # agrupa INSERT/UPDATE en pocos viajes a la BD; un fetch dentro del bloque fuerza un flush
+    if psycopg.Pipeline.is_supported():
+        with conn.pipeline():
+            yield
+    else:
+        yield
 
 
 def check_db():
@@ -0,0 +1,100 @@
+"""Exporta ventas, ítems de venta y movimientos a Parquet o Arrow IPC.
+
+Uso: python -m app.export {sales,sale_items,movements} -o salida.parquet
+     [--format parquet|arrow] [--from 2025-01-01] [--to 2025-12-31] [--batch-size 50000]
+
+Lee con un cursor del servidor por lotes y escribe cada lote al archivo, así la
+memoria no crece con el rango. Con --format arrow y -o - escribe el stream a stdout.
+Los montos salen como decimal128(38, 6), sin pérdida de centavos; cantidades y
+márgenes como float64.
+"""
+import argparse
+import sys
+import time
+from datetime import date
+
+import psycopg
+
+from .db import get_db_url
+from .repositories.exports import EXPORT_TABLES, execute_export
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except Exception:  # pragma: no cover
+    pa = None  # type: ignore
+    pq = None  # type: ignore
+
+
+def _arrow_type(kind: str):
+    return {
+        "text": pa.string(),
+        "float": pa.float64(),
+        # debe coincidir con el ::numeric(38, 6) de repositories/exports.py
+        "money": pa.decimal128(38, 6),
+        "bool": pa.bool_(),
+        "timestamp": pa.timestamp("us", tz="UTC"),
+    }[kind]
+
+
+def _schema(table: str):
+    return pa.schema([(name, _arrow_type(kind)) for name, _expr, kind in EXPORT_TABLES[table]["columns"]])
+
+
+def _open_writer(fmt: str, output: str, schema):
+    if fmt == "parquet":
+        return pq.ParquetWriter(output, schema, compression="zstd")
+    sink = pa.PythonFile(sys.stdout.buffer, mode="w") if output == "-" else output
+    return pa.ipc.new_stream(sink, schema)
+
+
+def export_table(conn, table: str, writer, schema, date_from=None, date_to=None, batch_size: int = 50_000) -> int:
+    total = 0
+    with conn.transaction():
+        with conn.cursor(name=f"export_{table}") as cur:
+            cur.itersize = batch_size
+            execute_export(cur, table, date_from, date_to)
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                columns = list(zip(*rows))
+                arrays = [pa.array(col, type=field.type) for col, field in zip(columns, schema)]
+                writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+                total += len(rows)
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("table", choices=sorted(EXPORT_TABLES))
+    parser.add_argument("-o", "--output", required=True)
+    parser.add_argument("--format", choices=["parquet", "arrow"], default="parquet")
+    parser.add_argument("--from", dest="date_from", type=date.fromisoformat)
+    parser.add_argument("--to", dest="date_to", type=date.fromisoformat)
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    args = parser.parse_args(argv)
+
+    if pa is None:
+        parser.error("pyarrow no está instalado")
+    if args.batch_size < 1:
+        parser.error("--batch-size debe ser >= 1")
+    if args.date_from and args.date_to and args.date_to < args.date_from:
+        parser.error("--to debe ser >= --from")
+    if args.format == "parquet" and args.output == "-":
+        parser.error("parquet necesita un archivo de salida")
+
+    schema = _schema(args.table)
+    start = time.perf_counter()
+    with psycopg.connect(get_db_url()) as conn:
+        writer = _open_writer(args.format, args.output, schema)
+        try:
+            rows = export_table(conn, args.table, writer, schema, args.date_from, args.date_to, args.batch_size)
+        finally:
+            writer.close()
+
+    print(f"{args.table}: {rows} filas en {time.perf_counter() - start:.1f} s -> {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
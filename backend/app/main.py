@@ -1,9 +1,15 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from .core.config import get_settings
+from .db import close_async_pool, close_pool, get_pool
+from .notifications import start_listener, stop_listener
+from .quote_expiry import start_sweeper, stop_sweeper
+from .services.pagination import NEXT_CURSOR_HEADER
 from .routers import (
     alerts,
+    catalog,
     fixed_costs,
     health,
     movements,
@@ -27,7 +33,22 @@ origins = getattr(settings, "ALLOWED_ORIGINS", ["http://localhost:3000"])
 if isinstance(origins, str):
     origins = [o.strip() for o in origins.split(",") if o.strip()]
 
-app = FastAPI(title="SDSinventory API")
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    if getattr(settings, "DB_POOL_OPEN_ON_STARTUP", True) and getattr(settings, "DATABASE_URL", ""):
+        get_pool()
+    if getattr(settings, "DATABASE_URL", ""):
+        start_listener()
+        start_sweeper()
+    yield
+    stop_sweeper()
+    stop_listener()
+    await close_async_pool()
+    close_pool()
+
+
+app = FastAPI(title="SDSinventory API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -35,6 +56,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 app.include_router(health.router)
@@ -54,3 +76,4 @@ app.include_router(alerts.router)
 app.include_router(sales.router)
 app.include_router(fixed_costs.router)
 app.include_router(quotes.router)
+app.include_router(catalog.router)
@@ -0,0 +1,90 @@
+import logging
+import threading
+from typing import Callable
+import psycopg
+from psycopg import sql
+
+from .core.config import get_settings
+from .db import get_db_url
+
+logger = logging.getLogger(__name__)
+
+# payload None = posible pérdida de avisos (reconexión): invalidar todo
+Handler = Callable[[str | None], None]
+
+_handlers: dict[str, list[Handler]] = {}
+_thread: threading.Thread | None = None
+_stop = threading.Event()
+_RECONNECT_DELAY_SEC = 5.0
+
+
+def on_notify(channel: str, handler: Handler) -> None:
+    _handlers.setdefault(channel, []).append(handler)
+
+
+def notify(cur, channel: str, payload: str = "") -> None:
+    # dentro de la transacción: el aviso sale solo si hace commit
+    cur.execute("select pg_notify(%s, %s)", (channel, payload))
+
+
+def _listen_url() -> str | None:
+    settings = get_settings()
+    url = getattr(settings, "DB_LISTEN_URL", "")
+    if url:
+        return url
+    if getattr(settings, "DB_PGBOUNCER_TRANSACTION_MODE", False):
+        # LISTEN no sobrevive al pooler en modo transacción; quedan los TTL
+        return None
+    return get_db_url()
+
+
+def _dispatch(channel: str, payload: str | None) -> None:
+    for handler in _handlers.get(channel, ()):
+        try:
+            handler(payload)
+        except Exception:  # pragma: no cover
+            logger.exception("handler de %s falló", channel)
+
+
+def _run(url: str) -> None:
+    while not _stop.is_set():
+        try:
+            with psycopg.connect(url, autocommit=True) as conn:
+                for channel in _handlers:
+                    conn.execute(sql.SQL("listen {}").format(sql.Identifier(channel)))
+                # lo que cambió mientras no escuchábamos
+                for channel in _handlers:
+                    _dispatch(channel, None)
+                while not _stop.is_set():
+                    for n in conn.notifies(timeout=1.0):
+                        _dispatch(n.channel, n.payload)
+        except Exception:
+            logger.warning("listener de notificaciones desconectado; reintentando", exc_info=True)
+            _stop.wait(_RECONNECT_DELAY_SEC)
+
+
+def start_listener() -> bool:
+    global _thread
+    if not getattr(get_settings(), "DB_LISTEN_ENABLED", True) or not _handlers:
+        return False
+    url = _listen_url()
+    if url is None:
+        return False
+    if _thread is None or not _thread.is_alive():
+        _stop.clear()
+        _thread = threading.Thread(target=_run, args=(url,), name="pg-listener", daemon=True)
+        _thread.start()
+    return True
+
+
+def stop_listener(timeout: float = 5.0) -> None:
+    global _thread
+    _stop.set()
+    if _thread is not None:
+        _thread.join(timeout)
+        _thread = None
+
+
+def listener_alive() -> bool:
+    return _thread is not None and _thread.is_alive()
+
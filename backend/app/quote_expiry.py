@@ -0,0 +1,73 @@
+"""Pasa a expired las cotizaciones draft/sent con valid_until vencido.
+
+Uso: python -m app.quote_expiry [--batch-size 500] [--loop 300]
+
+Sin --loop corre una vez (para cron). Con QUOTE_EXPIRY_INTERVAL_SEC > 0 la API
+corre lo mismo en un hilo. Varios procesos a la vez no chocan: cada lote toma
+sus filas con FOR UPDATE SKIP LOCKED.
+"""
+import argparse
+import logging
+import threading
+
+from .core.config import get_settings
+from .services import quotes as quotes_service
+
+logger = logging.getLogger(__name__)
+
+_thread: threading.Thread | None = None
+_stop = threading.Event()
+
+
+def _run(interval: float, batch_size: int) -> None:
+    while not _stop.wait(interval):
+        try:
+            expired = quotes_service.expire_quotes(batch_size)
+            if expired:
+                logger.info("cotizaciones expiradas: %s", expired)
+        except Exception:
+            logger.exception("fallo al expirar cotizaciones")
+
+
+def start_sweeper() -> bool:
+    global _thread
+    interval = float(getattr(get_settings(), "QUOTE_EXPIRY_INTERVAL_SEC", 0))
+    if interval <= 0:
+        return False
+    if _thread is None or not _thread.is_alive():
+        _stop.clear()
+        _thread = threading.Thread(
+            target=_run,
+            args=(interval, quotes_service.EXPIRY_BATCH_SIZE),
+            name="quote-expiry",
+            daemon=True,
+        )
+        _thread.start()
+    return True
+
+
+def stop_sweeper(timeout: float = 5.0) -> None:
+    global _thread
+    _stop.set()
+    if _thread is not None:
+        _thread.join(timeout)
+        _thread = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=quotes_service.EXPIRY_BATCH_SIZE)
+    parser.add_argument("--loop", type=float, metavar="SEGUNDOS", help="repetir cada N segundos")
+    args = parser.parse_args(argv)
+
+    if args.batch_size < 1:
+        parser.error("--batch-size debe ser >= 1")
+
+    expired = quotes_service.expire_quotes(args.batch_size)
+    print(f"cotizaciones expiradas: {expired}")
+    if args.loop:
+        _run(args.loop, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,3 +11,18 @@ def list_low_stock(cur):
         """
     )
     return cur.fetchall()
+
+
+def list_alert_events(cur, after_id: int, limit: int):
+    cur.execute(
+        """
+        select e.id, e.supply_id, s.name, e.kind, e.stock_on_hand, e.stock_min, e.created_at
+        from public.stock_alert_events e
+        join public.supplies s on s.id = e.supply_id
+        where e.id > %s
+        order by e.id asc
+        limit %s;
+        """,
+        (after_id, limit),
+    )
+    return cur.fetchall()
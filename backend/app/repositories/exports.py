@@ -0,0 +1,82 @@
+# columnas de app.export: (nombre, expresión SQL, tipo); uuid como texto, montos como
+# numeric(38,6) (decimal exacto en Arrow) y cantidades o márgenes como float8
+EXPORT_TABLES = {
+    "sales": {
+        "from": "public.sales s",
+        "created_at": "s.created_at",
+        "order": "s.created_at, s.id",
+        "columns": (
+            ("id", "s.id::text", "text"),
+            ("created_at", "s.created_at", "timestamp"),
+            ("customer_name", "s.customer_name", "text"),
+            ("currency", "s.currency", "text"),
+            ("total_sale", "s.total_sale::numeric(38, 6)", "money"),
+            ("total_cost", "s.total_cost::numeric(38, 6)", "money"),
+            ("total_profit", "s.total_profit::numeric(38, 6)", "money"),
+            ("materials_cost_total", "s.materials_cost_total::numeric(38, 6)", "money"),
+            ("operational_cost_total", "s.operational_cost_total::numeric(38, 6)", "money"),
+            ("margin", "s.margin::float8", "float"),
+            ("voided", "s.voided", "bool"),
+            ("voided_at", "s.voided_at", "timestamp"),
+        ),
+    },
+    "sale_items": {
+        "from": "public.sale_items si join public.sales s on s.id = si.sale_id",
+        "created_at": "s.created_at",
+        "order": "s.created_at, si.sale_id, si.id",
+        "columns": (
+            ("id", "si.id::text", "text"),
+            ("sale_id", "si.sale_id::text", "text"),
+            ("sale_created_at", "s.created_at", "timestamp"),
+            ("sale_voided", "s.voided", "bool"),
+            ("product_id", "si.product_id::text", "text"),
+            ("recipe_id", "si.recipe_id::text", "text"),
+            ("qty", "si.qty::float8", "float"),
+            ("materials_cost", "si.materials_cost::numeric(38, 6)", "money"),
+            ("suggested_price", "si.suggested_price::numeric(38, 6)", "money"),
+            ("sale_price", "si.sale_price::numeric(38, 6)", "money"),
+            ("profit", "si.profit::numeric(38, 6)", "money"),
+            ("var_width", "si.var_width::float8", "float"),
+            ("var_height", "si.var_height::float8", "float"),
+        ),
+    },
+    "movements": {
+        "from": "public.inventory_movements m",
+        "created_at": "m.created_at",
+        "order": "m.created_at, m.id",
+        "columns": (
+            ("id", "m.id::text", "text"),
+            ("supply_id", "m.supply_id::text", "text"),
+            ("movement_type", "m.movement_type", "text"),
+            ("qty_base", "m.qty_base::float8", "float"),
+            ("unit_cost_snapshot", "m.unit_cost_snapshot::numeric(38, 6)", "money"),
+            ("ref_type", "m.ref_type", "text"),
+            ("ref_id", "m.ref_id::text", "text"),
+            ("created_at", "m.created_at", "timestamp"),
+        ),
+    },
+}
+
+
+def execute_export(cur, table: str, date_from=None, date_to=None):
+    # pensado para un cursor con nombre; date_to es inclusivo
+    spec = EXPORT_TABLES[table]
+    where = []
+    params: list = []
+    if date_from is not None:
+        where.append(f"{spec['created_at']} >= %s")
+        params.append(date_from)
+    if date_to is not None:
+        where.append(f"{spec['created_at']} < %s::date + 1")
+        params.append(date_to)
+    where_sql = f"where {' and '.join(where)}" if where else ""
+    select_sql = ", ".join(f"{expr} as {name}" for name, expr, _kind in spec["columns"])
+    cur.execute(
+        f"""
+        select {select_sql}
+        from {spec['from']}
+        {where_sql}
+        order by {spec['order']}
+        """,
+        tuple(params),
+    )
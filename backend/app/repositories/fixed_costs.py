@@ -1,3 +1,6 @@
+from .prepared import execute_hot, hot_statement
+
+
 def insert_period(cur, year: int, month: int, estimated_orders: float, currency: str, active: bool):
     cur.execute(
         """
@@ -50,16 +53,20 @@ def set_all_inactive(cur):
     cur.execute("update public.fixed_cost_periods set active = false")
 
 
+hot_statement(
+    "fixed_costs.get_active_period",
+    """
+    select id, year, month, estimated_orders, currency, active, created_at
+    from public.fixed_cost_periods
+    where active = true
+    order by year desc, month desc, created_at desc
+    limit 1
+    """,
+)
+
+
 def get_active_period(cur):
-    cur.execute(
-        """
-        select id, year, month, estimated_orders, currency, active, created_at
-        from public.fixed_cost_periods
-        where active = true
-        order by year desc, month desc, created_at desc
-        limit 1
-        """
-    )
+    execute_hot(cur, "fixed_costs.get_active_period")
     return cur.fetchone()
 
 
@@ -93,13 +100,16 @@ def delete_cost_item(cur, item_id: str):
     return cur.rowcount > 0
 
 
+hot_statement(
+    "fixed_costs.sum_cost_items",
+    """
+    select coalesce(sum(amount), 0)
+    from public.fixed_cost_items
+    where period_id = %s
+    """,
+)
+
+
 def sum_cost_items(cur, period_id: str):
-    cur.execute(
-        """
-        select coalesce(sum(amount), 0)
-        from public.fixed_cost_items
-        where period_id = %s
-        """,
-        (period_id,),
-    )
+    execute_hot(cur, "fixed_costs.sum_cost_items", (period_id,))
     return cur.fetchone()[0]
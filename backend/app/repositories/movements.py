@@ -1,26 +1,203 @@
-def list_movements(cur, supply_id: str):
+def list_movements(cur, supply_id: str, limit: int | None = None, after=None):
+    # sin limit devuelve todo el kardex del insumo
+    where_sql = "where supply_id = %s"
+    params: list = [supply_id]
+    if after is not None:
+        where_sql += " and (created_at, id) < (%s, %s)"
+        params.extend([after[0], after[1]])
+    limit_sql = ""
+    if limit is not None:
+        limit_sql = "limit %s"
+        params.append(limit)
     cur.execute(
-        """
+        f"""
         select id, movement_type, qty_base, unit_cost_snapshot,
                ref_type, ref_id, created_at
         from public.inventory_movements
-        where supply_id = %s
-        order by created_at desc;
+        {where_sql}
+        order by created_at desc, id desc
+        {limit_sql}
         """,
-        (supply_id,),
+        tuple(params),
     )
     return cur.fetchall()
 
 
 def summary_movements(cur, supply_id: str):
+    # checkpoint + movimientos posteriores; sin checkpoint recorre todo el historial
     cur.execute(
         """
         select
-          coalesce(sum(case when movement_type='IN' then qty_base else 0 end),0) as total_in,
-          coalesce(sum(case when movement_type='OUT' then qty_base else 0 end),0) as total_out
-        from public.inventory_movements
-        where supply_id=%s
+          coalesce(c.total_in, 0)
+            + coalesce(sum(m.qty_base) filter (where m.movement_type='IN'), 0) as total_in,
+          coalesce(c.total_out, 0)
+            + coalesce(sum(m.qty_base) filter (where m.movement_type='OUT'), 0) as total_out
+        from public.supplies s
+        left join public.supply_stock_checkpoints c on c.supply_id = s.id
+        left join public.inventory_movements m
+          on m.supply_id = s.id
+         and (c.supply_id is null or (m.created_at, m.id) > (c.last_created_at, c.last_movement_id))
+        where s.id = %s
+        group by c.total_in, c.total_out
         """,
         (supply_id,),
     )
-    return cur.fetchone()
+    return cur.fetchone() or (0, 0)
+
+
+_SIGNED_QTY_SQL = "(case m.movement_type when 'IN' then m.qty_base when 'OUT' then -m.qty_base else 0 end)"
+
+
+def _kardex_query(supply_id: str, after=None, date_from=None, date_to=None, limit: int | None = None):
+    # saldo de apertura = checkpoint anterior al inicio de la página (si hay)
+    # + movimientos entre ese checkpoint y la primera fila;
+    # luego saldo acumulado con funciones de ventana en orden cronológico
+    if after is not None:
+        start_sql = "(m.created_at, m.id) <= (%s, %s)"
+        cp_start_sql = "(c.last_created_at, c.last_movement_id) <= (%s, %s)"
+        start_params: list = [after[0], after[1]]
+    elif date_from is not None:
+        start_sql = "m.created_at < %s"
+        cp_start_sql = "c.last_created_at < %s"
+        start_params = [date_from]
+    else:
+        start_sql = cp_start_sql = "false"
+        start_params = []
+    opening_params = [supply_id, *start_params, supply_id, *start_params]
+
+    page_where = ["m.supply_id = %s"]
+    page_params: list = [supply_id]
+    if after is not None:
+        page_where.append("(m.created_at, m.id) > (%s, %s)")
+        page_params.extend([after[0], after[1]])
+    if date_from is not None:
+        page_where.append("m.created_at >= %s")
+        page_params.append(date_from)
+    if date_to is not None:
+        page_where.append("m.created_at < %s::date + 1")
+        page_params.append(date_to)
+
+    limit_sql = ""
+    if limit is not None:
+        limit_sql = "limit %s"
+        page_params.append(limit)
+
+    sql = f"""
+        with cp as (
+          select c.last_created_at, c.last_movement_id,
+                 c.total_in - c.total_out as qty, c.balance_value as value
+          from public.supply_stock_checkpoints c
+          where c.supply_id = %s and {cp_start_sql}
+        ),
+        opening as (
+          select coalesce((select qty from cp), 0) + coalesce(sum({_SIGNED_QTY_SQL}), 0) as qty,
+                 coalesce((select value from cp), 0)
+                   + coalesce(sum({_SIGNED_QTY_SQL} * m.unit_cost_snapshot), 0) as value
+          from public.inventory_movements m
+          where m.supply_id = %s and {start_sql}
+            and not exists (
+              select 1 from cp where (m.created_at, m.id) <= (cp.last_created_at, cp.last_movement_id)
+            )
+        )
+        select m.id, m.movement_type, m.qty_base, m.unit_cost_snapshot,
+               m.ref_type, m.ref_id, m.created_at,
+               o.qty + sum({_SIGNED_QTY_SQL}) over w as running_qty,
+               o.value + sum({_SIGNED_QTY_SQL} * m.unit_cost_snapshot) over w as running_value
+        from public.inventory_movements m
+        cross join opening o
+        where {" and ".join(page_where)}
+        window w as (order by m.created_at, m.id rows between unbounded preceding and current row)
+        order by m.created_at, m.id
+        {limit_sql}
+        """
+    return sql, (*opening_params, *page_params)
+
+
+def execute_kardex(cur, supply_id: str, after=None, date_from=None, date_to=None, limit: int | None = None):
+    # pensado para un cursor con nombre (server-side); el llamador itera las filas
+    cur.execute(*_kardex_query(supply_id, after, date_from, date_to, limit))
+
+
+def supply_exists(cur, supply_id: str) -> bool:
+    cur.execute("select 1 from public.supplies where id = %s", (supply_id,))
+    return cur.fetchone() is not None
+
+
+def advance_checkpoints(cur, lag_seconds: int, supply_id: str | None = None) -> int:
+    # suma al checkpoint los movimientos posteriores con más de lag_seconds de
+    # antigüedad; el margen deja fuera transacciones aún sin commit cuyo
+    # created_at quedaría detrás del checkpoint
+    supply_sql = ""
+    params: list = [lag_seconds]
+    if supply_id is not None:
+        supply_sql = "and m.supply_id = %s"
+        params.append(supply_id)
+    cur.execute(
+        f"""
+        with delta as (
+          select m.supply_id,
+                 (array_agg(m.created_at order by m.created_at desc, m.id desc))[1] as last_created_at,
+                 (array_agg(m.id order by m.created_at desc, m.id desc))[1] as last_movement_id,
+                 coalesce(sum(m.qty_base) filter (where m.movement_type='IN'), 0) as total_in,
+                 coalesce(sum(m.qty_base) filter (where m.movement_type='OUT'), 0) as total_out,
+                 coalesce(sum({_SIGNED_QTY_SQL} * m.unit_cost_snapshot), 0) as balance_value,
+                 count(*) as movement_count
+          from public.inventory_movements m
+          left join public.supply_stock_checkpoints c on c.supply_id = m.supply_id
+          where m.created_at < now() - make_interval(secs => %s)
+            and (c.supply_id is null or (m.created_at, m.id) > (c.last_created_at, c.last_movement_id))
+            {supply_sql}
+          group by m.supply_id
+        )
+        insert into public.supply_stock_checkpoints as c
+          (supply_id, last_created_at, last_movement_id, total_in, total_out,
+           balance_value, movement_count, updated_at)
+        select supply_id, last_created_at, last_movement_id, total_in, total_out,
+               balance_value, movement_count, now()
+        from delta
+        on conflict (supply_id) do update set
+          last_created_at = excluded.last_created_at,
+          last_movement_id = excluded.last_movement_id,
+          total_in = c.total_in + excluded.total_in,
+          total_out = c.total_out + excluded.total_out,
+          balance_value = c.balance_value + excluded.balance_value,
+          movement_count = c.movement_count + excluded.movement_count,
+          updated_at = now()
+        """,
+        tuple(params),
+    )
+    return cur.rowcount
+
+
+def delete_checkpoints(cur, supply_id: str | None = None) -> None:
+    if supply_id is None:
+        cur.execute("delete from public.supply_stock_checkpoints")
+    else:
+        cur.execute("delete from public.supply_stock_checkpoints where supply_id = %s", (supply_id,))
+
+
+def reconcile_stock(cur, supply_id: str | None = None):
+    # stock_on_hand vs saldo del log (checkpoint + movimientos posteriores)
+    supply_sql = ""
+    params: list = []
+    if supply_id is not None:
+        supply_sql = "where s.id = %s"
+        params.append(supply_id)
+    cur.execute(
+        f"""
+        select s.id, s.name, s.stock_on_hand,
+               coalesce(c.total_in - c.total_out, 0)
+                 + coalesce(sum({_SIGNED_QTY_SQL}), 0) as ledger_qty,
+               count(m.id) as scanned
+        from public.supplies s
+        left join public.supply_stock_checkpoints c on c.supply_id = s.id
+        left join public.inventory_movements m
+          on m.supply_id = s.id
+         and (c.supply_id is null or (m.created_at, m.id) > (c.last_created_at, c.last_movement_id))
+        {supply_sql}
+        group by s.id, s.name, s.stock_on_hand, c.total_in, c.total_out
+        order by s.name
+        """,
+        tuple(params),
+    )
+    return cur.fetchall()
@@ -0,0 +1,26 @@
+from ..core.config import get_settings
+
+# sentencias de la ruta caliente; psycopg las prepara en el servidor en su primer uso
+# por conexión y reutiliza el plan mientras la conexión viva en el pool
+HOT_STATEMENTS: dict[str, str] = {}
+
+
+def hot_statement(name: str, sql: str) -> str:
+    previous = HOT_STATEMENTS.get(name)
+    if previous is not None and previous != sql:
+        raise ValueError(f"Sentencia preparada duplicada: {name}")
+    HOT_STATEMENTS[name] = sql
+    return sql
+
+
+def use_prepared() -> bool:
+    # PgBouncer en modo transacción puede cambiar la conexión del servidor entre transacciones
+    return not getattr(get_settings(), "DB_PGBOUNCER_TRANSACTION_MODE", False)
+
+
+def execute_hot(cur, name: str, params=None):
+    cur.execute(HOT_STATEMENTS[name], params, prepare=use_prepared())
+
+
+async def execute_hot_async(cur, name: str, params=None):
+    await cur.execute(HOT_STATEMENTS[name], params, prepare=use_prepared())
@@ -26,3 +26,11 @@ def list_presentations(cur):
 def get_presentation_units(cur, presentation_id: str):
     cur.execute("select units_in_base from public.presentations where id=%s", (presentation_id,))
     return cur.fetchone()
+
+
+def get_presentation_units_many(cur, presentation_ids: list[str]):
+    cur.execute(
+        "select id, units_in_base from public.presentations where id = any(%s)",
+        (presentation_ids,),
+    )
+    return cur.fetchall()
@@ -1,7 +1,10 @@
+from .prepared import execute_hot, hot_statement
+
+
 def list_recipe_items_for_production(cur, recipe_id: str):
     cur.execute(
         """
-        select ri.supply_id, ri.qty_base, ri.waste_pct, s.avg_unit_cost, s.stock_on_hand, ri.qty_formula, u.code, u.name
+        select ri.supply_id, ri.qty_base, ri.waste_pct, s.avg_unit_cost, s.stock_on_hand, ri.qty_formula, u.is_piece
         from public.recipe_items ri
         join public.supplies s on s.id = ri.supply_id
         join public.units u on u.id = s.unit_base_id
@@ -24,32 +27,43 @@ def insert_production_order(cur, product_id: str, recipe_id: str, qty: float, ma
     return cur.fetchone()[0]
 
 
-def lock_supply_stock(cur, supply_id: str):
-    cur.execute(
-        """
-        select stock_on_hand
-        from public.supplies
-        where id=%s
-        for update
-        """,
-        (supply_id,),
-    )
-    return cur.fetchone()
+# orden determinístico de bloqueo, igual que en ventas
+hot_statement(
+    "production.lock_supplies_stock",
+    """
+    select id, stock_on_hand
+    from public.supplies
+    where id = any(%s)
+    order by id
+    for update
+    """,
+)
 
 
-def insert_inventory_movement(cur, supply_id: str, qty_base: float, unit_cost: float, ref_id: str):
-    cur.execute(
+def lock_supplies_stock(cur, supply_ids: list[str]):
+    execute_hot(cur, "production.lock_supplies_stock", (supply_ids,))
+    return cur.fetchall()
+
+
+def insert_inventory_movements(cur, rows: list[tuple]):
+    # rows: (supply_id, qty_base, unit_cost, ref_id)
+    if not rows:
+        return
+    cur.executemany(
         """
         insert into public.inventory_movements
         (supply_id, movement_type, qty_base, unit_cost_snapshot, ref_type, ref_id)
         values (%s,'OUT',%s,%s,'production',%s)
         """,
-        (supply_id, qty_base, unit_cost, ref_id),
+        rows,
     )
 
 
-def update_supply_stock(cur, supply_id: str, new_stock: float):
-    cur.execute(
+def update_supplies_stock(cur, rows: list[tuple]):
+    # rows: (new_stock, supply_id)
+    if not rows:
+        return
+    cur.executemany(
         "update public.supplies set stock_on_hand=%s where id=%s",
-        (new_stock, supply_id),
+        rows,
     )
@@ -10,19 +10,26 @@ def insert_product(cur, name: str, product_type: str, category: str | None, unit
     return cur.fetchone()
 
 
-def list_products(cur, include_inactive: bool = False):
+def _list_products_sql(include_inactive: bool) -> str:
     where_sql = "" if include_inactive else "where active = true"
-    cur.execute(
-        f"""
+    return f"""
         select id, name, active, created_at, product_type, category, unit_sale, margin_target
         from public.products
         {where_sql}
         order by created_at desc;
         """
-    )
+
+
+def list_products(cur, include_inactive: bool = False):
+    cur.execute(_list_products_sql(include_inactive))
     return cur.fetchall()
 
 
+async def list_products_async(cur, include_inactive: bool = False):
+    await cur.execute(_list_products_sql(include_inactive))
+    return await cur.fetchall()
+
+
 def update_product(
     cur,
     product_id: str,
@@ -1,14 +1,16 @@
-def lock_supply(cur, supply_id: str):
+def lock_supplies(cur, supply_ids: list[str]):
+    # orden por id, igual que ventas y producción, para no cruzar bloqueos
     cur.execute(
         """
-        select stock_on_hand, avg_unit_cost
+        select id, stock_on_hand, avg_unit_cost
         from public.supplies
-        where id=%s
+        where id = any(%s)
+        order by id
         for update
         """,
-        (supply_id,),
+        (supply_ids,),
     )
-    return cur.fetchone()
+    return cur.fetchall()
 
 
 def insert_purchase(cur, supplier_name: str | None):
@@ -23,53 +25,48 @@ def insert_purchase(cur, supplier_name: str | None):
     return cur.fetchone()[0]
 
 
-def insert_purchase_item(
-    cur,
-    purchase_id: str,
-    supply_id: str,
-    presentation_id: str,
-    packs_qty: float,
-    units_in_base: float,
-    total_cost: float,
-    unit_cost: float,
-):
-    cur.execute(
+def insert_purchase_items(cur, purchase_id, rows: list[tuple]) -> list:
+    # rows: (supply_id, presentation_id, packs_qty, units_in_base, total_cost, unit_cost);
+    # devuelve los ids en el mismo orden
+    if not rows:
+        return []
+    cur.executemany(
         """
         insert into public.purchase_items
         (purchase_id, supply_id, presentation_id, packs_qty, units_in_base, total_cost, unit_cost)
         values (%s,%s,%s,%s,%s,%s,%s)
         returning id
         """,
-        (
-            purchase_id,
-            supply_id,
-            presentation_id,
-            packs_qty,
-            units_in_base,
-            total_cost,
-            unit_cost,
-        ),
+        [(purchase_id, *row) for row in rows],
+        returning=True,
     )
-    return cur.fetchone()[0]
+    ids = []
+    while True:
+        ids.append(cur.fetchone()[0])
+        if not cur.nextset():
+            break
+    return ids
 
 
-def insert_inventory_movement(cur, supply_id: str, qty_base: float, unit_cost: float, ref_id: str):
-    cur.execute(
+def insert_inventory_movements(cur, rows: list[tuple]):
+    # rows: (supply_id, qty_base, unit_cost, purchase_item_id)
+    cur.executemany(
         """
         insert into public.inventory_movements
         (supply_id, movement_type, qty_base, unit_cost_snapshot, ref_type, ref_id)
         values (%s,'IN',%s,%s,'purchase',%s)
         """,
-        (supply_id, qty_base, unit_cost, ref_id),
+        rows,
     )
 
 
-def update_supply_stock(cur, supply_id: str, new_stock: float, new_avg: float):
-    cur.execute(
+def update_supplies_stock(cur, rows: list[tuple]):
+    # rows: (new_stock, new_avg, supply_id)
+    cur.executemany(
         """
         update public.supplies
         set stock_on_hand=%s, avg_unit_cost=%s
         where id=%s
         """,
-        (new_stock, new_avg, supply_id),
+        rows,
     )
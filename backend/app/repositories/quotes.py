@@ -1,23 +1,15 @@
-def lock_sequence(cur, year: int):
+def allocate_number(cur, year: int) -> int:
+    # una sola sentencia: el bloqueo de la fila del año dura solo hasta el commit
     cur.execute(
-        "select last_number from public.quote_number_sequence where year = %s for update",
-        (year,),
-    )
-    return cur.fetchone()
-
-
-def insert_sequence(cur, year: int):
-    cur.execute(
-        "insert into public.quote_number_sequence (year, last_number) values (%s, 0)",
+        """
+        insert into public.quote_number_sequence as q (year, last_number)
+        values (%s, 1)
+        on conflict (year) do update set last_number = q.last_number + 1
+        returning last_number
+        """,
         (year,),
     )
-
-
-def update_sequence(cur, year: int, last_number: int):
-    cur.execute(
-        "update public.quote_number_sequence set last_number = %s where year = %s",
-        (last_number, year),
-    )
+    return int(cur.fetchone()[0])
 
 
 def insert_quote(
@@ -66,43 +58,28 @@ def insert_quote(
 import json
 
 
-def insert_quote_item(
-    cur,
-    quote_id,
-    product_id,
-    recipe_id,
-    qty,
-    materials_cost,
-    suggested_price,
-    sale_price,
-    profit,
-    var_width,
-    var_height,
-    var_payload,
-):
-    cur.execute(
+def insert_quote_items(cur, quote_id, rows: list[tuple]):
+    # rows: (product_id, recipe_id, qty, materials_cost, suggested_price, sale_price, profit,
+    #        var_width, var_height, var_payload, materials_snapshot)
+    if not rows:
+        return
+    cur.executemany(
         """
         insert into public.quote_items
         (quote_id, product_id, recipe_id, qty, materials_cost, suggested_price, sale_price,
-         profit, var_width, var_height, var_payload)
-        values (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-        returning id
+         profit, var_width, var_height, var_payload, materials_snapshot)
+        values (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
         """,
-        (
-            quote_id,
-            product_id,
-            recipe_id,
-            qty,
-            materials_cost,
-            suggested_price,
-            sale_price,
-            profit,
-            var_width,
-            var_height,
-            json.dumps(var_payload) if var_payload is not None else None,
-        ),
+        [
+            (
+                quote_id,
+                *row[:9],
+                json.dumps(row[9]) if row[9] is not None else None,
+                json.dumps(row[10]) if row[10] is not None else None,
+            )
+            for row in rows
+        ],
     )
-    return cur.fetchone()[0]
 
 
 def insert_status_history(cur, quote_id, status: str, notes: str | None, changed_by: str | None):
@@ -115,37 +92,63 @@ def insert_status_history(cur, quote_id, status: str, notes: str | None, changed
     )
 
 
-def list_quotes(cur, limit: int, offset: int, status: str | None):
-    where_sql = ""
-    params = [limit, offset]
+# mismos predicados que los índices parciales de la migración 011
+_ACTIVE_STATUS_SQL = "status in ('draft', 'sent', 'accepted')"
+_EXPIRABLE_STATUS_SQL = "status in ('draft', 'sent')"
+
+
+def _list_quotes_query(limit: int, offset: int, status: str | None, after, active: bool = False):
+    # after = (created_at, id) de la última fila de la página anterior
+    conditions = []
+    params: list = []
     if status:
-        where_sql = "where status = %s"
-        params = [status, limit, offset]
-    cur.execute(
-        f"""
+        conditions.append("status = %s")
+        params.append(status)
+    if active:
+        conditions.append(_ACTIVE_STATUS_SQL)
+    if after is not None:
+        conditions.append("(created_at, id) < (%s, %s)")
+        params.extend([after[0], after[1]])
+        offset = 0
+    where_sql = ("where " + " and ".join(conditions)) if conditions else ""
+    sql = f"""
         select id, quote_number, status, valid_until, customer_name,
                currency, total_price, total_cost, total_profit, created_at
         from public.quotes
         {where_sql}
-        order by created_at desc
+        order by created_at desc, id desc
         limit %s offset %s
-        """,
-        tuple(params),
-    )
+        """
+    return sql, (*params, limit, offset)
+
+
+def list_quotes(cur, limit: int, offset: int, status: str | None, after=None, active: bool = False):
+    cur.execute(*_list_quotes_query(limit, offset, status, after, active))
     return cur.fetchall()
 
 
+async def list_quotes_async(cur, limit: int, offset: int, status: str | None, after=None, active: bool = False):
+    await cur.execute(*_list_quotes_query(limit, offset, status, after, active))
+    return await cur.fetchall()
+
+
+_QUOTE_HEAD_SQL = """
+    select id, quote_number, status, valid_until, customer_name, notes,
+           currency, margin, materials_cost_total, operational_cost_total,
+           total_cost, total_price, total_profit, fixed_cost_period_id, converted_sale_id, created_at
+    from public.quotes
+    where id = %s
+"""
+
+
 def get_quote(cur, quote_id: str):
-    cur.execute(
-        """
-        select id, quote_number, status, valid_until, customer_name, notes,
-               currency, margin, materials_cost_total, operational_cost_total,
-               total_cost, total_price, total_profit, fixed_cost_period_id, converted_sale_id, created_at
-        from public.quotes
-        where id = %s
-        """,
-        (quote_id,),
-    )
+    cur.execute(_QUOTE_HEAD_SQL, (quote_id,))
+    return cur.fetchone()
+
+
+def lock_quote(cur, quote_id: str):
+    # evita convertir dos veces la misma cotización en paralelo
+    cur.execute(_QUOTE_HEAD_SQL + " for update", (quote_id,))
     return cur.fetchone()
 
 
@@ -153,7 +156,8 @@ def list_quote_items(cur, quote_id: str):
     cur.execute(
         """
         select id, product_id, recipe_id, qty, materials_cost, suggested_price,
-               sale_price, profit, var_width, var_height, var_payload, created_at
+               sale_price, profit, var_width, var_height, var_payload, created_at,
+               materials_snapshot
         from public.quote_items
         where quote_id = %s
         order by created_at asc
@@ -184,3 +188,31 @@ def mark_quote_converted(cur, quote_id: str, sale_id: str):
         """,
         (sale_id, quote_id),
     )
+
+
+def expire_due_quotes(cur, batch_size: int, changed_by: str) -> int:
+    # un lote: bloquea sin esperar (skip locked), marca expired e inserta el historial de una vez
+    cur.execute(
+        f"""
+        with due as (
+          select id
+          from public.quotes
+          where {_EXPIRABLE_STATUS_SQL} and valid_until < current_date
+          order by valid_until, id
+          limit %s
+          for update skip locked
+        ),
+        expired as (
+          update public.quotes q
+          set status = 'expired'
+          from due
+          where q.id = due.id
+          returning q.id
+        )
+        insert into public.quote_status_history (quote_id, status, notes, changed_by)
+        select id, 'expired', 'valid_until vencido', %s
+        from expired
+        """,
+        (batch_size, changed_by),
+    )
+    return cur.rowcount
@@ -0,0 +1,58 @@
+def list_recipes_using_supplies(cur, supply_ids: list[str]):
+    cur.execute(
+        """
+        select distinct recipe_id
+        from public.recipe_items
+        where supply_id = any(%s);
+        """,
+        (supply_ids,),
+    )
+    return [str(r[0]) for r in cur.fetchall()]
+
+
+def lock_recipe_costs(cur, recipe_ids: list[str]):
+    # espera a las transacciones que marcan estas filas como viejas
+    cur.execute(
+        """
+        select recipe_id
+        from public.recipe_cost_cache
+        where recipe_id = any(%s)
+        order by recipe_id
+        for update;
+        """,
+        (recipe_ids,),
+    )
+    return cur.fetchall()
+
+
+def get_recipe_costs(cur, recipe_ids: list[str]):
+    cur.execute(
+        """
+        select recipe_id, materials_cost, stale, computed_at
+        from public.recipe_cost_cache
+        where recipe_id = any(%s);
+        """,
+        (recipe_ids,),
+    )
+    return cur.fetchall()
+
+
+def upsert_recipe_costs(cur, rows: list[tuple[str, float | None]]):
+    cur.executemany(
+        """
+        insert into public.recipe_cost_cache (recipe_id, materials_cost, stale, computed_at)
+        values (%s, %s, false, now())
+        on conflict (recipe_id) do update set
+          materials_cost = excluded.materials_cost,
+          stale = false,
+          computed_at = excluded.computed_at;
+        """,
+        rows,
+    )
+
+
+def delete_recipe_costs(cur, recipe_ids: list[str]):
+    cur.execute(
+        "delete from public.recipe_cost_cache where recipe_id = any(%s);",
+        (recipe_ids,),
+    )
@@ -55,3 +55,22 @@ def list_options_with_values(cur, recipe_id: str):
         (recipe_id,),
     )
     return cur.fetchall()
+
+
+_OPTIONS_WITH_VALUES_MANY_SQL = """
+        select o.recipe_id, o.id, o.code, o.label, v.id, v.value_key, v.label, v.numeric_value
+        from public.recipe_options o
+        left join public.recipe_option_values v on v.option_id = o.id
+        where o.recipe_id = any(%s)
+        order by o.created_at asc, v.created_at asc
+        """
+
+
+def list_options_with_values_many(cur, recipe_ids: list[str]):
+    cur.execute(_OPTIONS_WITH_VALUES_MANY_SQL, (recipe_ids,))
+    return cur.fetchall()
+
+
+async def list_options_with_values_many_async(cur, recipe_ids: list[str]):
+    await cur.execute(_OPTIONS_WITH_VALUES_MANY_SQL, (recipe_ids,))
+    return await cur.fetchall()
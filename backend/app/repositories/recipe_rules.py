@@ -45,6 +45,25 @@ def list_recipe_rules(cur, recipe_id: str):
     return cur.fetchall()
 
 
+_RECIPE_RULES_MANY_SQL = """
+        select id, recipe_id, scope, target_supply_id, condition_var, operator,
+               condition_value, effect_type, effect_value, created_at
+        from public.recipe_rules
+        where recipe_id = any(%s)
+        order by created_at asc
+        """
+
+
+def list_recipe_rules_many(cur, recipe_ids: list[str]):
+    cur.execute(_RECIPE_RULES_MANY_SQL, (recipe_ids,))
+    return cur.fetchall()
+
+
+async def list_recipe_rules_many_async(cur, recipe_ids: list[str]):
+    await cur.execute(_RECIPE_RULES_MANY_SQL, (recipe_ids,))
+    return await cur.fetchall()
+
+
 def update_recipe_rule(
     cur,
     rule_id: str,
@@ -24,6 +24,24 @@ def list_recipe_variables(cur, recipe_id: str):
     return cur.fetchall()
 
 
+_RECIPE_VARIABLES_MANY_SQL = """
+        select id, recipe_id, code, label, min_value, max_value, default_value, created_at
+        from public.recipe_variables
+        where recipe_id = any(%s)
+        order by created_at asc
+        """
+
+
+def list_recipe_variables_many(cur, recipe_ids: list[str]):
+    cur.execute(_RECIPE_VARIABLES_MANY_SQL, (recipe_ids,))
+    return cur.fetchall()
+
+
+async def list_recipe_variables_many_async(cur, recipe_ids: list[str]):
+    await cur.execute(_RECIPE_VARIABLES_MANY_SQL, (recipe_ids,))
+    return await cur.fetchall()
+
+
 def update_recipe_variable(cur, var_id: str, recipe_id: str, code: str, label: str, min_value, max_value, default_value):
     cur.execute(
         """
@@ -1,3 +1,6 @@
+from .prepared import execute_hot, execute_hot_async, hot_statement
+
+
 def insert_recipe(cur, product_id: str, name: str):
     cur.execute(
         """
@@ -36,20 +39,59 @@ def get_recipe(cur, recipe_id: str):
     return cur.fetchone()
 
 
+hot_statement(
+    "recipes.list_recipe_items_for_cost",
+    """
+    select ri.supply_id, s.name, ri.qty_base, ri.waste_pct, s.avg_unit_cost, ri.qty_formula, u.code, u.is_piece
+    from public.recipe_items ri
+    join public.supplies s on s.id = ri.supply_id
+    join public.units u on u.id = s.unit_base_id
+    where ri.recipe_id = %s
+    """,
+)
+
+
 def list_recipe_items_for_cost(cur, recipe_id: str):
-    cur.execute(
-        """
-        select ri.supply_id, s.name, ri.qty_base, ri.waste_pct, s.avg_unit_cost, ri.qty_formula, u.code, u.name
-        from public.recipe_items ri
-        join public.supplies s on s.id = ri.supply_id
-        join public.units u on u.id = s.unit_base_id
-        where ri.recipe_id = %s
-        """,
-        (recipe_id,),
-    )
+    execute_hot(cur, "recipes.list_recipe_items_for_cost", (recipe_id,))
+    return cur.fetchall()
+
+
+hot_statement(
+    "recipes.list_recipe_items_for_cost_many",
+    """
+    select ri.recipe_id, ri.supply_id, s.name, ri.qty_base, ri.waste_pct, s.avg_unit_cost,
+           ri.qty_formula, u.code, u.is_piece
+    from public.recipe_items ri
+    join public.supplies s on s.id = ri.supply_id
+    join public.units u on u.id = s.unit_base_id
+    where ri.recipe_id = any(%s)
+    """,
+)
+
+
+def list_recipe_items_for_cost_many(cur, recipe_ids: list[str]):
+    execute_hot(cur, "recipes.list_recipe_items_for_cost_many", (recipe_ids,))
+    return cur.fetchall()
+
+
+async def list_recipe_items_for_cost_many_async(cur, recipe_ids: list[str]):
+    await execute_hot_async(cur, "recipes.list_recipe_items_for_cost_many", (recipe_ids,))
+    return await cur.fetchall()
+
+
+_RECIPE_PRODUCTS_SQL = "select id, product_id from public.recipes where id = any(%s)"
+
+
+def list_recipe_products(cur, recipe_ids: list[str]):
+    cur.execute(_RECIPE_PRODUCTS_SQL, (recipe_ids,))
     return cur.fetchall()
 
 
+async def list_recipe_products_async(cur, recipe_ids: list[str]):
+    await cur.execute(_RECIPE_PRODUCTS_SQL, (recipe_ids,))
+    return await cur.fetchall()
+
+
 def update_recipe(cur, recipe_id: str, name: str):
     cur.execute(
         """
@@ -87,3 +129,17 @@ def recipe_has_sales(cur, recipe_id: str) -> bool:
         (recipe_id,),
     )
     return cur.fetchone() is not None
+
+
+def list_catalog_recipes(cur):
+    cur.execute(
+        """
+        select r.id, r.name, r.margin_target,
+               p.id, p.name, p.product_type, p.category, p.unit_sale
+        from public.recipes r
+        join public.products p on p.id = r.product_id
+        where p.active = true
+        order by p.name, r.name, r.id;
+        """
+    )
+    return cur.fetchall()
@@ -1,37 +1,23 @@
-def ensure_recipe_belongs(cur, recipe_id: str, product_id: str):
-    cur.execute(
-        "select 1 from public.recipes where id=%s and product_id=%s",
-        (recipe_id, product_id),
-    )
-    return cur.fetchone()
+from ..core.config import get_settings
+from .prepared import execute_hot, hot_statement
 
 
-def list_recipe_items_for_sale(cur, recipe_id: str):
-    cur.execute(
-        """
-        select ri.supply_id, ri.qty_base, ri.waste_pct,
-               s.avg_unit_cost, s.stock_on_hand, ri.qty_formula, u.code, u.name
-        from public.recipe_items ri
-        join public.supplies s on s.id = ri.supply_id
-        join public.units u on u.id = s.unit_base_id
-        where ri.recipe_id = %s
-        """,
-        (recipe_id,),
-    )
-    return cur.fetchall()
+# orden determinístico de bloqueo para evitar deadlocks entre ventas concurrentes
+hot_statement(
+    "sales.lock_supplies_for_update",
+    """
+    select id, stock_on_hand
+    from public.supplies
+    where id = any(%s)
+    order by id
+    for update
+    """,
+)
 
 
-def lock_supply_for_update(cur, supply_id: str):
-    cur.execute(
-        """
-        select stock_on_hand
-        from public.supplies
-        where id=%s
-        for update
-        """,
-        (supply_id,),
-    )
-    return cur.fetchone()
+def lock_supplies_for_update(cur, supply_ids: list[str]):
+    execute_hot(cur, "sales.lock_supplies_for_update", (supply_ids,))
+    return cur.fetchall()
 
 
 def insert_sale(
@@ -74,65 +60,66 @@ def insert_sale(
 import json
 
 
-def insert_sale_item(
-    cur,
-    sale_id,
-    product_id,
-    recipe_id,
-    qty,
-    materials_cost,
-    suggested_price,
-    sale_price,
-    profit,
-    var_width,
-    var_height,
-    var_payload,
-):
-    cur.execute(
+def insert_sale_items(cur, sale_id, rows: list[tuple]) -> list:
+    # rows: (product_id, recipe_id, qty, materials_cost, suggested_price, sale_price, profit,
+    #        var_width, var_height, var_payload); devuelve los ids en el mismo orden
+    if not rows:
+        return []
+    cur.executemany(
         """
         insert into public.sale_items
         (sale_id, product_id, recipe_id, qty, materials_cost, suggested_price, sale_price, profit, var_width, var_height, var_payload)
         values (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
         returning id
         """,
-        (
-            sale_id,
-            product_id,
-            recipe_id,
-            qty,
-            materials_cost,
-            suggested_price,
-            sale_price,
-            profit,
-            var_width,
-            var_height,
-            json.dumps(var_payload) if var_payload is not None else None,
-        ),
+        [
+            (sale_id, *row[:9], json.dumps(row[9]) if row[9] is not None else None)
+            for row in rows
+        ],
+        returning=True,
     )
-    return cur.fetchone()[0]
-
-
-def insert_sale_movement_out(cur, supply_id, qty_out, cost_u, sale_item_id):
+    ids = []
+    while True:
+        ids.append(cur.fetchone()[0])
+        if not cur.nextset():
+            break
+    return ids
+
+
+def insert_sale_movements_out(cur, rows: list[tuple]):
+    # rows: (supply_id, qty_out, cost_u, sale_item_id)
+    if not rows:
+        return
+    values_sql = ",".join(["(%s,'OUT',%s,%s,'sale',%s)"] * len(rows))
     cur.execute(
-        """
+        f"""
         insert into public.inventory_movements
         (supply_id, movement_type, qty_base, unit_cost_snapshot, ref_type, ref_id)
-        values (%s,'OUT',%s,%s,'sale',%s)
+        values {values_sql}
         """,
-        (supply_id, qty_out, cost_u, sale_item_id),
+        [v for row in rows for v in row],
     )
 
 
-def update_supply_stock(cur, supply_id, new_stock):
-    cur.execute(
+def update_supplies_stock(cur, rows: list[tuple]):
+    # rows: (new_stock, supply_id)
+    if not rows:
+        return
+    cur.executemany(
         "update public.supplies set stock_on_hand=%s where id=%s",
-        (new_stock, supply_id),
+        rows,
     )
 
 
-def list_sales(cur, limit: int, offset: int):
-    cur.execute(
-        """
+def _list_sales_query(limit: int, offset: int, after):
+    # after = (created_at, id) de la última fila de la página anterior
+    where_sql = ""
+    params: list = []
+    if after is not None:
+        where_sql = "where (s.created_at, s.id) < (%s, %s)"
+        params = [after[0], after[1]]
+        offset = 0
+    sql = f"""
         select
             s.id,
             s.created_at,
@@ -150,27 +137,152 @@ def list_sales(cur, limit: int, offset: int):
             s.void_reason,
             s.voided_by
         from public.sales s
-        order by s.created_at desc
+        {where_sql}
+        order by s.created_at desc, s.id desc
         limit %s offset %s
+        """
+    return sql, (*params, limit, offset)
+
+
+def list_sales(cur, limit: int, offset: int, after=None):
+    cur.execute(*_list_sales_query(limit, offset, after))
+    return cur.fetchall()
+
+
+async def list_sales_async(cur, limit: int, offset: int, after=None):
+    await cur.execute(*_list_sales_query(limit, offset, after))
+    return await cur.fetchall()
+
+
+def sales_summary(cur, interval_literal: str | None, include_voided: bool):
+    # días completos desde el rollup + el día parcial del inicio del periodo desde public.sales
+    tz = sales_timezone()
+    voided_sql = "" if include_voided else "and voided = false"
+    if interval_literal is None:
+        cur.execute(
+            f"""
+            select coalesce(sum(total_sale),0), coalesce(sum(total_cost),0),
+                   coalesce(sum(total_profit),0), coalesce(sum(count_sales),0)
+            from public.sales_daily_rollup
+            where true {voided_sql}
+            """
+        )
+        return cur.fetchone()
+    cur.execute(
+        f"""
+        with bounds as (
+          select now() - %s::interval as start_at
+        ), days as (
+          select start_at, (start_at at time zone %s)::date as start_day from bounds
+        ), parts as (
+          select r.total_sale, r.total_cost, r.total_profit, r.count_sales
+          from public.sales_daily_rollup r, days d
+          where r.day > d.start_day {voided_sql}
+          union all
+          select s.total_sale, s.total_cost, s.total_profit, 1
+          from public.sales s, days d
+          where s.created_at >= d.start_at
+            and s.created_at < ((d.start_day + 1)::timestamp at time zone %s)
+            {voided_sql}
+        )
+        select coalesce(sum(total_sale),0), coalesce(sum(total_cost),0),
+               coalesce(sum(total_profit),0), coalesce(sum(count_sales),0)
+        from parts
+        """,
+        (interval_literal, tz, tz),
+    )
+    return cur.fetchone()
+
+
+def sales_daily(cur, date_from, date_to, include_voided: bool):
+    voided_sql = "" if include_voided else "and voided = false"
+    cur.execute(
+        f"""
+        select day, sum(count_sales), sum(total_sale), sum(total_cost), sum(total_profit)
+        from public.sales_daily_rollup
+        where day between %s and %s {voided_sql}
+        group by day
+        order by day asc
         """,
-        (limit, offset),
+        (date_from, date_to),
     )
     return cur.fetchall()
 
 
-def sales_summary(cur, where_sql: str):
+def sales_timezone() -> str:
+    # el día de una venta es el de esta zona, no el de la sesión de la BD
+    return getattr(get_settings(), "SALES_TIMEZONE", "America/Tegucigalpa")
+
+
+# acepta created_at con o sin zona; sin zona se interpreta en la zona de la sesión, como la escribió now()
+_SALE_DAY_SQL = "(created_at::timestamptz at time zone %s)::date"
+
+
+def add_sale_to_daily_rollup(cur, sale_id):
+    # bloquea la fila (día, false) hasta el commit: las ventas del mismo día se
+    # serializan en este punto, por eso va al final de la transacción de la venta
     cur.execute(
         f"""
-        select
-          coalesce(sum(total_sale),0) as total_sale,
-          coalesce(sum(total_cost),0) as total_cost,
-          coalesce(sum(total_profit),0) as total_profit,
-          count(*) as count_sales
+        insert into public.sales_daily_rollup as r
+        (day, voided, count_sales, total_sale, total_cost, total_profit)
+        select {_SALE_DAY_SQL}, voided, 1, total_sale, total_cost, total_profit
         from public.sales
-        {where_sql}
-        """
+        where id = %s
+        on conflict (day, voided) do update
+        set count_sales = r.count_sales + excluded.count_sales,
+            total_sale = r.total_sale + excluded.total_sale,
+            total_cost = r.total_cost + excluded.total_cost,
+            total_profit = r.total_profit + excluded.total_profit
+        """,
+        (sales_timezone(), sale_id),
+    )
+
+
+def move_sale_to_voided_rollup(cur, sale_id):
+    # resta la venta de (día, false) y la suma en (día, true)
+    cur.execute(
+        f"""
+        insert into public.sales_daily_rollup as r
+        (day, voided, count_sales, total_sale, total_cost, total_profit)
+        select {_SALE_DAY_SQL.replace("created_at", "s.created_at")}, v.voided, v.sign, v.sign * s.total_sale,
+               v.sign * s.total_cost, v.sign * s.total_profit
+        from public.sales s
+        cross join (values (false, -1), (true, 1)) as v(voided, sign)
+        where s.id = %s
+        on conflict (day, voided) do update
+        set count_sales = r.count_sales + excluded.count_sales,
+            total_sale = r.total_sale + excluded.total_sale,
+            total_cost = r.total_cost + excluded.total_cost,
+            total_profit = r.total_profit + excluded.total_profit
+        """,
+        (sales_timezone(), sale_id),
     )
-    return cur.fetchone()
+
+
+def rebuild_daily_rollup(cur, date_from=None, date_to=None) -> int:
+    # bloquea escrituras en sales mientras se recalcula para no perder ventas concurrentes
+    cur.execute("lock table public.sales in share mode")
+    tz = sales_timezone()
+    range_sql = ""
+    params: tuple = (tz,)
+    if date_from is not None and date_to is not None:
+        range_sql = f"where {_SALE_DAY_SQL} between %s and %s"
+        params = (tz, tz, date_from, date_to)
+        cur.execute("delete from public.sales_daily_rollup where day between %s and %s", (date_from, date_to))
+    else:
+        cur.execute("delete from public.sales_daily_rollup")
+    cur.execute(
+        f"""
+        insert into public.sales_daily_rollup (day, voided, count_sales, total_sale, total_cost, total_profit)
+        select {_SALE_DAY_SQL} as day, voided, count(*), coalesce(sum(total_sale), 0),
+               coalesce(sum(total_cost), 0), coalesce(sum(total_profit), 0)
+        from public.sales
+        {range_sql}
+        group by 1, voided
+        """,
+        params,
+    )
+    return cur.rowcount
 
 
 def get_sale_head(cur, sale_id: str):
@@ -285,17 +397,26 @@ def list_sale_out_movements(cur, sale_id: str):
     return cur.fetchall()
 
 
-def insert_sale_void_movement(cur, supply_id, qty_in, cost_u, ref_id):
-    cur.execute(
+def insert_sale_void_movements(cur, rows: list[tuple]) -> list:
+    # rows: (supply_id, qty_in, cost_u, ref_id); devuelve los ids en el mismo orden
+    if not rows:
+        return []
+    cur.executemany(
         """
         insert into public.inventory_movements
         (supply_id, movement_type, qty_base, unit_cost_snapshot, ref_type, ref_id)
         values (%s,'IN',%s,%s,'sale_void',%s)
         returning id
         """,
-        (supply_id, qty_in, cost_u, ref_id),
+        rows,
+        returning=True,
     )
-    return cur.fetchone()[0]
+    ids = []
+    while True:
+        ids.append(cur.fetchone()[0])
+        if not cur.nextset():
+            break
+    return ids
 
 
 def mark_sale_voided(cur, sale_id: str, reason: str | None):
@@ -10,10 +10,9 @@ def insert_supply(cur, name: str, unit_base_id: int, stock_min: float):
     return cur.fetchone()
 
 
-def list_supplies(cur, include_inactive: bool = False):
+def _list_supplies_sql(include_inactive: bool) -> str:
     where_sql = "" if include_inactive else "where s.active = true"
-    cur.execute(
-        f"""
+    return f"""
         select s.id, s.name, u.code as unit_code,
                s.stock_on_hand, s.stock_min, s.avg_unit_cost, s.active
         from public.supplies s
@@ -21,10 +20,18 @@ def list_supplies(cur, include_inactive: bool = False):
         {where_sql}
         order by s.created_at desc;
         """
-    )
+
+
+def list_supplies(cur, include_inactive: bool = False):
+    cur.execute(_list_supplies_sql(include_inactive))
     return cur.fetchall()
 
 
+async def list_supplies_async(cur, include_inactive: bool = False):
+    await cur.execute(_list_supplies_sql(include_inactive))
+    return await cur.fetchall()
+
+
 def update_supply(cur, supply_id: str, name: str, unit_base_id: int, stock_min: float):
     cur.execute(
         """
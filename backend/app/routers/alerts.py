@@ -1,4 +1,5 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Header
+from fastapi.responses import StreamingResponse
 from ..services import alerts as alerts_service
 
 router = APIRouter()
@@ -7,3 +8,18 @@ router = APIRouter()
 @router.get("/alerts/low-stock")
 def low_stock_alerts():
     return alerts_service.list_low_stock()
+
+
+@router.get("/alerts/events")
+def alert_events(after_id: int = 0, limit: int = 100):
+    return alerts_service.list_alert_events(after_id=after_id, limit=limit)
+
+
+@router.get("/alerts/stream")
+async def alert_stream(last_event_id: int | None = Header(None, alias="Last-Event-ID")):
+    events = await alerts_service.stream_alerts(last_event_id)
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
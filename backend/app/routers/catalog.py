@@ -0,0 +1,9 @@
+from fastapi import APIRouter, Response
+from ..services import price_list as price_list_service
+
+router = APIRouter()
+
+
+@router.get("/catalog/price-list")
+def price_list(refresh: bool = False):
+    return Response(content=price_list_service.price_list_json(refresh=refresh), media_type="application/json")
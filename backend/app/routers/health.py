@@ -1,5 +1,7 @@
 from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
 from ..db import check_db
+from ..services import metrics as metrics_service
 
 router = APIRouter()
 
@@ -13,3 +15,13 @@ def health():
 def db_health():
     result = check_db()
     return {"db": "ok", "result": result}
+
+
+@router.get("/db-pool")
+def db_pool():
+    return metrics_service.db_pool_status()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(metrics_service.render_metrics(), media_type="text/plain; version=0.0.4")
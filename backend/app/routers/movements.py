@@ -1,14 +1,37 @@
-from fastapi import APIRouter
+from datetime import date
+from fastapi import APIRouter, Response
+from fastapi.responses import StreamingResponse
 from ..services import movements as movements_service
+from ..services.pagination import NEXT_CURSOR_HEADER
 
 router = APIRouter()
 
 
 @router.get("/movements")
-def list_movements(supply_id: str):
-    return movements_service.list_movements(supply_id)
+def list_movements(response: Response, supply_id: str, limit: int = 50, cursor: str | None = None):
+    result = movements_service.list_movements(supply_id, limit=limit, cursor=cursor)
+    if result["next_cursor"]:
+        response.headers[NEXT_CURSOR_HEADER] = result["next_cursor"]
+    return result["items"]
 
 
 @router.get("/movements/summary")
 def movements_summary(supply_id: str):
     return movements_service.movements_summary(supply_id)
+
+
+@router.get("/kardex")
+def kardex(
+    supply_id: str,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    cursor: str | None = None,
+    limit: int | None = None,
+):
+    # NDJSON: una línea por movimiento con running_qty y running_value;
+    # sin limit es ilimitado a propósito (exportación en streaming, memoria constante);
+    # con limit, si hay más filas la última línea es {"next_cursor": ...}
+    return StreamingResponse(
+        movements_service.stream_kardex(supply_id, date_from, date_to, cursor, limit),
+        media_type="application/x-ndjson",
+    )
@@ -1,5 +1,7 @@
 from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
+from ..db import async_db_enabled
 from ..services import products as products_service
 
 router = APIRouter()
@@ -25,8 +27,10 @@ def create_product(payload: ProductCreate):
 
 
 @router.get("/products")
-def list_products(include_inactive: bool = False):
-    return products_service.list_products(include_inactive=include_inactive)
+async def list_products(include_inactive: bool = False):
+    if async_db_enabled():
+        return await products_service.list_products_async(include_inactive=include_inactive)
+    return await run_in_threadpool(products_service.list_products, include_inactive=include_inactive)
 
 
 @router.get("/products/{product_id}")
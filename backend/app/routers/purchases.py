@@ -1,4 +1,5 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from ..services import purchases as purchases_service
 
@@ -13,6 +14,18 @@ class PurchaseCreate(BaseModel):
     supplier_name: str | None = None
 
 
+class PurchaseLine(BaseModel):
+    supply_id: str
+    presentation_id: str
+    packs_qty: float
+    total_cost: float
+
+
+class PurchaseBatchCreate(BaseModel):
+    supplier_name: str | None = None
+    lines: list[PurchaseLine]
+
+
 @router.post("/purchases")
 def create_purchase(payload: PurchaseCreate):
     return purchases_service.create_purchase(
@@ -22,3 +35,22 @@ def create_purchase(payload: PurchaseCreate):
         payload.total_cost,
         payload.supplier_name,
     )
+
+
+@router.post("/purchases/batch")
+def create_purchase_batch(payload: PurchaseBatchCreate):
+    return purchases_service.create_purchase_batch(
+        [line.model_dump() for line in payload.lines],
+        payload.supplier_name,
+    )
+
+
+@router.post("/purchases/import-csv")
+async def import_purchase_csv(request: Request, supplier_name: str | None = None):
+    # cuerpo text/csv: supply_id,presentation_id,packs_qty,total_cost
+    body = await request.body()
+    try:
+        text = body.decode("utf-8")
+    except UnicodeDecodeError:
+        text = body.decode("latin-1")
+    return await run_in_threadpool(purchases_service.import_purchase_csv, text, supplier_name)
@@ -1,7 +1,10 @@
 from datetime import date
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
+from ..db import async_db_enabled
 from ..services import quotes as quotes_service
+from ..services.pagination import NEXT_CURSOR_HEADER
 
 router = APIRouter()
 
@@ -33,8 +36,23 @@ def create_quote(payload: QuoteCreate):
 
 
 @router.get("/quotes")
-def list_quotes(limit: int = 50, offset: int = 0, status: str | None = None):
-    return quotes_service.list_quotes(limit=limit, offset=offset, status=status)
+async def list_quotes(
+    response: Response,
+    limit: int = 50,
+    offset: int = 0,
+    status: str | None = None,
+    cursor: str | None = None,
+    active: bool = False,
+):
+    # active=true: solo draft/sent/accepted (índice parcial)
+    kwargs = {"limit": limit, "offset": offset, "status": status, "cursor": cursor, "active": active}
+    if async_db_enabled():
+        result = await quotes_service.list_quotes_async(**kwargs)
+    else:
+        result = await run_in_threadpool(quotes_service.list_quotes, **kwargs)
+    if result["next_cursor"]:
+        response.headers[NEXT_CURSOR_HEADER] = result["next_cursor"]
+    return result["items"]
 
 
 @router.get("/quotes/{quote_id}")
@@ -53,6 +71,15 @@ def update_quote_status(quote_id: str, payload: QuoteStatusUpdate):
     return quotes_service.update_quote_status(quote_id, payload.status, payload.notes, payload.changed_by)
 
 
+class QuoteConvertBatch(BaseModel):
+    quote_ids: list[str]
+
+
+@router.post("/quotes:convert-batch")
+def convert_quotes_batch(payload: QuoteConvertBatch):
+    return quotes_service.convert_quotes_batch(payload.quote_ids)
+
+
 @router.post("/quotes/{quote_id}/convert")
 def convert_quote(quote_id: str):
     return quotes_service.convert_quote(quote_id)
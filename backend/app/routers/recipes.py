@@ -1,5 +1,8 @@
 from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
+from ..db import async_db_enabled
+from ..services import price_matrix as price_matrix_service
 from ..services import recipes as recipes_service
 
 router = APIRouter()
@@ -39,8 +42,10 @@ def delete_recipe(recipe_id: str):
 
 
 @router.get("/recipes/{recipe_id}/cost")
-def recipe_cost(recipe_id: str, width: float | None = None, height: float | None = None):
-    return recipes_service.recipe_cost(recipe_id, width=width, height=height)
+async def recipe_cost(recipe_id: str, width: float | None = None, height: float | None = None):
+    if async_db_enabled():
+        return await recipes_service.recipe_cost_async(recipe_id, width=width, height=height)
+    return await run_in_threadpool(recipes_service.recipe_cost, recipe_id, width=width, height=height)
 
 
 class RecipeCostBody(BaseModel):
@@ -52,15 +57,26 @@ class RecipeCostBody(BaseModel):
 
 
 @router.post("/recipes/{recipe_id}/cost")
-def recipe_cost_post(recipe_id: str, payload: RecipeCostBody):
-    return recipes_service.recipe_cost(
-        recipe_id,
-        width=payload.width,
-        height=payload.height,
-        vars_payload=payload.vars,
-        opts_payload=payload.opts,
-        strict=payload.strict,
-    )
+async def recipe_cost_post(recipe_id: str, payload: RecipeCostBody):
+    kwargs = {
+        "width": payload.width,
+        "height": payload.height,
+        "vars_payload": payload.vars,
+        "opts_payload": payload.opts,
+        "strict": payload.strict,
+    }
+    if async_db_enabled():
+        return await recipes_service.recipe_cost_async(recipe_id, **kwargs)
+    return await run_in_threadpool(recipes_service.recipe_cost, recipe_id, **kwargs)
+
+
+class RecipeCostBatchEntry(RecipeCostBody):
+    recipe_id: str
+
+
+@router.post("/recipes/cost:batch")
+def recipe_cost_batch(payload: list[RecipeCostBatchEntry]):
+    return recipes_service.recipe_cost_batch([e.model_dump() for e in payload])
 
 
 @router.get("/recipes/{recipe_id}/suggested-price")
@@ -74,6 +90,34 @@ def suggested_price(
     return recipes_service.suggested_price(recipe_id, value=value, mode=mode, width=width, height=height)
 
 
+class MatrixAxis(BaseModel):
+    start: float
+    stop: float
+    step: float
+
+
+class PriceMatrixBody(BaseModel):
+    width: MatrixAxis | None = None
+    height: MatrixAxis | None = None
+    vars: dict[str, float] | None = None
+    opts: dict[str, str] | None = None
+    vary_options: list[str] | None = None
+    margin: float | None = None
+
+
+@router.post("/recipes/{recipe_id}/price-matrix")
+def price_matrix(recipe_id: str, payload: PriceMatrixBody):
+    return price_matrix_service.price_matrix(
+        recipe_id,
+        width_axis=(payload.width.start, payload.width.stop, payload.width.step) if payload.width else None,
+        height_axis=(payload.height.start, payload.height.stop, payload.height.step) if payload.height else None,
+        vars_payload=payload.vars,
+        opts_payload=payload.opts,
+        vary_options=payload.vary_options,
+        margin=payload.margin,
+    )
+
+
 class RecipeMarginUpdate(BaseModel):
     margin_target: float
     apply_to_product: bool = True
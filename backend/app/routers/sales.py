@@ -1,6 +1,10 @@
-from fastapi import APIRouter
+from datetime import date
+from fastapi import APIRouter, Response
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
+from ..db import async_db_enabled
 from ..services import sales as sales_service
+from ..services.pagination import NEXT_CURSOR_HEADER
 
 router = APIRouter()
 
@@ -30,8 +34,14 @@ def create_sale(payload: SaleCreate):
 
 
 @router.get("/sales")
-def list_sales(limit: int = 50, offset: int = 0):
-    return sales_service.list_sales(limit=limit, offset=offset)
+async def list_sales(response: Response, limit: int = 50, offset: int = 0, cursor: str | None = None):
+    if async_db_enabled():
+        result = await sales_service.list_sales_async(limit=limit, offset=offset, cursor=cursor)
+    else:
+        result = await run_in_threadpool(sales_service.list_sales, limit=limit, offset=offset, cursor=cursor)
+    if result["next_cursor"]:
+        response.headers[NEXT_CURSOR_HEADER] = result["next_cursor"]
+    return result["items"]
 
 
 @router.get("/sales/summary")
@@ -39,6 +49,11 @@ def sales_summary(include_voided: bool = False, period: str = "7d"):
     return sales_service.sales_summary(include_voided=include_voided, period=period)
 
 
+@router.get("/sales/daily")
+def sales_daily(date_from: date, date_to: date, include_voided: bool = False):
+    return sales_service.sales_daily(date_from, date_to, include_voided=include_voided)
+
+
 @router.get("/sales/{sale_id}")
 def get_sale_detail(sale_id: str):
     return sales_service.get_sale_detail(sale_id)
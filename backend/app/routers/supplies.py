@@ -1,5 +1,7 @@
 from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
+from ..db import async_db_enabled
 from ..services import supplies as supplies_service
 
 router = APIRouter()
@@ -17,8 +19,10 @@ def create_supply(payload: SupplyCreate):
 
 
 @router.get("/supplies")
-def list_supplies(include_inactive: bool = False):
-    return supplies_service.list_supplies(include_inactive=include_inactive)
+async def list_supplies(include_inactive: bool = False):
+    if async_db_enabled():
+        return await supplies_service.list_supplies_async(include_inactive=include_inactive)
+    return await run_in_threadpool(supplies_service.list_supplies, include_inactive=include_inactive)
 
 
 class SupplyUpdate(BaseModel):
@@ -0,0 +1,34 @@
+"""Reconstruye public.sales_daily_rollup a partir de public.sales.
+
+Uso: python -m app.sales_rollup rebuild [--from 2025-01-01 --to 2025-01-31]
+"""
+import argparse
+from datetime import date
+
+import psycopg
+
+from .db import get_db_url
+from .repositories import sales as sales_repo
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--from", dest="date_from", type=date.fromisoformat)
+    parser.add_argument("--to", dest="date_to", type=date.fromisoformat)
+    args = parser.parse_args(argv)
+
+    if (args.date_from is None) != (args.date_to is None):
+        parser.error("--from y --to van juntos")
+
+    with psycopg.connect(get_db_url()) as conn:
+        with conn.transaction():
+            with conn.cursor() as cur:
+                rows = sales_repo.rebuild_daily_rollup(cur, args.date_from, args.date_to)
+
+    scope = f"{args.date_from} a {args.date_to}" if args.date_from else "todo el historial"
+    print(f"sales_daily_rollup reconstruido ({scope}): {rows} filas")
+
+
+if __name__ == "__main__":
+    main()
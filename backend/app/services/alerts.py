@@ -1,5 +1,20 @@
+import asyncio
+import json
+import threading
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
 from ..db import get_conn
+from ..notifications import listener_alive, on_notify
 from ..repositories import alerts as alerts_repo
+from .pagination import MAX_PAGE_SIZE, check_limit
+
+STOCK_ALERTS_CHANNEL = "stock_alerts"
+SSE_KEEPALIVE_SEC = 15.0
+# un cliente lento que acumula más avisos recibe "resync" y vuelve a leer la lista
+SSE_QUEUE_SIZE = 1000
+
+_subscribers_lock = threading.Lock()
+_subscribers: set[tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = set()
 
 
 def list_low_stock():
@@ -19,3 +34,97 @@ def list_low_stock():
         }
         for r in rows
     ]
+
+
+def _event_row(r) -> dict:
+    return {
+        "id": int(r[0]),
+        "supply_id": str(r[1]),
+        "name": r[2],
+        "kind": r[3],
+        "stock_on_hand": round(float(r[4]), 6),
+        "stock_min": round(float(r[5]), 6),
+        "created_at": r[6].isoformat(),
+    }
+
+
+def list_alert_events(after_id: int = 0, limit: int = 100):
+    limit = check_limit(limit)
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            rows = alerts_repo.list_alert_events(cur, after_id, limit)
+    return [_event_row(r) for r in rows]
+
+
+def _offer(queue: asyncio.Queue, payload: str | None) -> None:
+    try:
+        queue.put_nowait(payload)
+    except asyncio.QueueFull:
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+
+def _on_stock_alert(payload: str | None) -> None:
+    # corre en el hilo del listener; cada cliente SSE tiene su cola en su event loop
+    with _subscribers_lock:
+        subscribers = list(_subscribers)
+    for loop, queue in subscribers:
+        try:
+            loop.call_soon_threadsafe(_offer, queue, payload)
+        except RuntimeError:  # pragma: no cover
+            pass  # loop cerrado
+
+
+on_notify(STOCK_ALERTS_CHANNEL, _on_stock_alert)
+
+
+def _sse(event: str, data: str, event_id: int | None = None) -> str:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {data}\n\n"
+
+
+async def stream_alerts(last_event_id: int | None):
+    """Generador SSE; con ``last_event_id`` primero reenvía lo que el cliente no vio."""
+    if not listener_alive():
+        raise HTTPException(status_code=503, detail="Alertas en vivo no disponibles (LISTEN deshabilitado)")
+
+    async def events():
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SSE_QUEUE_SIZE)
+        entry = (asyncio.get_running_loop(), queue)
+        # suscribir antes de leer la tabla: lo que llegue en medio ya reenviado se descarta
+        with _subscribers_lock:
+            _subscribers.add(entry)
+        replayed: set[int] = set()
+        try:
+            if last_event_id is not None:
+                after_id = last_event_id
+                while True:
+                    rows = await run_in_threadpool(list_alert_events, after_id, MAX_PAGE_SIZE)
+                    for ev in rows:
+                        after_id = ev["id"]
+                        replayed.add(after_id)
+                        yield _sse("stock_alert", json.dumps(ev), after_id)
+                    if len(rows) < MAX_PAGE_SIZE:
+                        break
+            while True:
+                try:
+                    payload = await asyncio.wait_for(queue.get(), SSE_KEEPALIVE_SEC)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if payload is None:
+                    # reconexión del listener o cola llena: pueden faltar avisos
+                    yield _sse("resync", "{}")
+                    continue
+                # los avisos llegan en orden de commit, no de id: solo se filtra lo reenviado
+                event_id = int(json.loads(payload)["id"])
+                if event_id in replayed:
+                    replayed.discard(event_id)
+                    continue
+                yield _sse("stock_alert", payload, event_id)
+        finally:
+            with _subscribers_lock:
+                _subscribers.discard(entry)
+
+    return events()
@@ -0,0 +1,335 @@
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Callable, Mapping
+from ..db import get_async_conn, get_conn
+from ..notifications import notify, on_notify
+from ..repositories import recipes as recipes_repo
+from ..repositories import recipe_variables as recipe_variables_repo
+from ..repositories import recipe_options as recipe_options_repo
+from ..repositories import recipe_rules as recipe_rules_repo
+from .formulas import compile_formula
+from .rules_engine import RuleIndex, compile_rules
+
+
+@dataclass(frozen=True)
+class PlanItem:
+    supply_id: str
+    supply_name: str
+    qty_base: float
+    waste_pct: float
+    avg_unit_cost: float
+    qty_formula: str | None
+    unit_code: str | None
+    is_piece: bool
+    formula: Callable | None
+
+
+@dataclass(frozen=True)
+class PlanVariable:
+    code: str
+    min_value: float | None
+    max_value: float | None
+    default_value: float | None
+    # límites tal como vienen de la BD, para los mensajes de validación
+    min_text: str | None = None
+    max_text: str | None = None
+
+
+@dataclass(frozen=True)
+class CostPlan:
+    recipe_id: str
+    product_id: str | None
+    version: tuple[int, int]
+    loaded_at: float
+    items: tuple[PlanItem, ...]
+    variables: tuple[PlanVariable, ...]
+    options: Mapping[str, Mapping[str, float]]
+    rules: RuleIndex
+    supply_ids: frozenset[str]
+
+
+# aviso entre procesos: "recipe:<id>", "supply:<id>" o "all"
+COST_PLANS_CHANNEL = "cost_plans_changed"
+
+# red de seguridad si no hay listener (PgBouncer sin DB_LISTEN_URL)
+_PLAN_TTL_SEC = 300
+
+_lock = threading.Lock()
+_plans: dict[str, CostPlan] = {}
+_recipe_versions: dict[str, int] = {}
+_generation = 0
+_supply_epoch = 0
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+def plan_key(value) -> str:
+    # los ids pueden llegar como uuid desde la BD o como texto en el payload
+    return str(value).strip().lower()
+
+
+def _opt_float(value) -> float | None:
+    return float(value) if value is not None else None
+
+
+def _current_version(recipe_id: str) -> tuple[int, int]:
+    return (_generation, _recipe_versions.get(recipe_id, 0))
+
+
+def _fetch_plan_rows(cur, recipe_ids: list[str]):
+    return (
+        recipes_repo.list_recipe_products(cur, recipe_ids),
+        recipes_repo.list_recipe_items_for_cost_many(cur, recipe_ids),
+        recipe_variables_repo.list_recipe_variables_many(cur, recipe_ids),
+        recipe_options_repo.list_options_with_values_many(cur, recipe_ids),
+        recipe_rules_repo.list_recipe_rules_many(cur, recipe_ids),
+    )
+
+
+async def _fetch_plan_rows_async(cur, recipe_ids: list[str]):
+    return (
+        await recipes_repo.list_recipe_products_async(cur, recipe_ids),
+        await recipes_repo.list_recipe_items_for_cost_many_async(cur, recipe_ids),
+        await recipe_variables_repo.list_recipe_variables_many_async(cur, recipe_ids),
+        await recipe_options_repo.list_options_with_values_many_async(cur, recipe_ids),
+        await recipe_rules_repo.list_recipe_rules_many_async(cur, recipe_ids),
+    )
+
+
+def _build_plans(versions: dict[str, tuple[int, int]], rows) -> dict[str, CostPlan]:
+    recipe_ids = list(versions.keys())
+    product_rows, item_rows, vars_rows, options_rows, rules_rows = rows
+
+    products = {plan_key(r[0]): str(r[1]) for r in product_rows}
+
+    items: dict[str, list[PlanItem]] = {rid: [] for rid in recipe_ids}
+    for recipe_id, supply_id, supply_name, qty_base, waste_pct, avg_unit_cost, qty_formula, unit_code, is_piece in item_rows:
+        items.setdefault(plan_key(recipe_id), []).append(
+            PlanItem(
+                supply_id=str(supply_id),
+                supply_name=supply_name,
+                qty_base=float(qty_base),
+                waste_pct=float(waste_pct),
+                avg_unit_cost=float(avg_unit_cost),
+                qty_formula=qty_formula,
+                unit_code=unit_code,
+                is_piece=bool(is_piece),
+                formula=compile_formula(qty_formula) if qty_formula else None,
+            )
+        )
+
+    variables: dict[str, list[PlanVariable]] = {rid: [] for rid in recipe_ids}
+    for r in vars_rows:
+        variables.setdefault(plan_key(r[1]), []).append(
+            PlanVariable(
+                code=str(r[2]).strip().lower(),
+                min_value=_opt_float(r[4]),
+                max_value=_opt_float(r[5]),
+                default_value=_opt_float(r[6]),
+                min_text=str(r[4]) if r[4] is not None else None,
+                max_text=str(r[5]) if r[5] is not None else None,
+            )
+        )
+
+    options: dict[str, dict[str, dict[str, float]]] = {rid: {} for rid in recipe_ids}
+    for recipe_id, _opt_id, opt_code, _opt_label, _val_id, value_key, _value_label, numeric_value in options_rows:
+        if opt_code is None:
+            continue
+        recipe_options = options.setdefault(plan_key(recipe_id), {})
+        code = str(opt_code).strip().lower()
+        if code not in recipe_options:
+            recipe_options[code] = {}
+        if value_key is not None:
+            recipe_options[code][str(value_key)] = float(numeric_value)
+
+    rules: dict[str, list] = {rid: [] for rid in recipe_ids}
+    for r in rules_rows:
+        rules.setdefault(plan_key(r[1]), []).append(r)
+
+    now = time.monotonic()
+    return {
+        rid: CostPlan(
+            recipe_id=rid,
+            product_id=products.get(rid),
+            version=versions[rid],
+            loaded_at=now,
+            items=tuple(items[rid]),
+            variables=tuple(variables[rid]),
+            options=MappingProxyType({k: MappingProxyType(v) for k, v in options[rid].items()}),
+            rules=compile_rules(rules[rid]),
+            supply_ids=frozenset(it.supply_id for it in items[rid]),
+        )
+        for rid in recipe_ids
+    }
+
+
+def _lookup(recipe_id: str):
+    # devuelve (plan vigente o None, versión actual); llamar con _lock
+    plan = _plans.get(recipe_id)
+    version = _current_version(recipe_id)
+    if plan is not None and plan.version == version and (time.monotonic() - plan.loaded_at) < _PLAN_TTL_SEC:
+        _stats["hits"] += 1
+        return plan, version
+    _stats["misses"] += 1
+    return None, version
+
+
+def _store(plans, epoch: int) -> None:
+    with _lock:
+        # si hubo una invalidación durante la carga, el plan queda viejo y no se guarda
+        if epoch != _supply_epoch:
+            return
+        for plan in plans:
+            if plan.version == _current_version(plan.recipe_id):
+                _plans[plan.recipe_id] = plan
+
+
+def get_cost_plan(recipe_id: str, cur=None) -> CostPlan:
+    return get_cost_plans([recipe_id], cur)[plan_key(recipe_id)]
+
+
+def _split_cached(recipe_ids):
+    # (planes vigentes, versiones de los que faltan, epoch al momento de buscar)
+    out: dict[str, CostPlan] = {}
+    versions: dict[str, tuple[int, int]] = {}
+    with _lock:
+        epoch = _supply_epoch
+        for recipe_id in dict.fromkeys(plan_key(r) for r in recipe_ids):
+            plan, version = _lookup(recipe_id)
+            if plan is not None:
+                out[recipe_id] = plan
+            else:
+                versions[recipe_id] = version
+    return out, versions, epoch
+
+
+def get_cost_plans(recipe_ids, cur=None) -> dict[str, CostPlan]:
+    """Planes por recipe_id; los que falten se cargan juntos con consultas ``= any(%s)``."""
+    out, versions, epoch = _split_cached(recipe_ids)
+    if not versions:
+        return out
+
+    if cur is None:
+        with get_conn() as conn:
+            with conn.cursor() as own_cur:
+                rows = _fetch_plan_rows(own_cur, list(versions.keys()))
+    else:
+        rows = _fetch_plan_rows(cur, list(versions.keys()))
+
+    loaded = _build_plans(versions, rows)
+    _store(loaded.values(), epoch)
+    out.update(loaded)
+    return out
+
+
+def load_cost_plans(recipe_ids, cur) -> dict[str, CostPlan]:
+    """Carga planes desde la BD sin leer la caché (costos vigentes de otros procesos)."""
+    with _lock:
+        epoch = _supply_epoch
+        versions = {rid: _current_version(rid) for rid in dict.fromkeys(plan_key(r) for r in recipe_ids)}
+    if not versions:
+        return {}
+    loaded = _build_plans(versions, _fetch_plan_rows(cur, list(versions.keys())))
+    _store(loaded.values(), epoch)
+    return loaded
+
+
+async def get_cost_plans_async(recipe_ids, cur=None) -> dict[str, CostPlan]:
+    out, versions, epoch = _split_cached(recipe_ids)
+    if not versions:
+        return out
+
+    if cur is None:
+        async with get_async_conn() as conn:
+            async with conn.cursor() as own_cur:
+                rows = await _fetch_plan_rows_async(own_cur, list(versions.keys()))
+    else:
+        rows = await _fetch_plan_rows_async(cur, list(versions.keys()))
+
+    loaded = _build_plans(versions, rows)
+    _store(loaded.values(), epoch)
+    out.update(loaded)
+    return out
+
+
+def invalidate_recipe(recipe_id: str) -> None:
+    recipe_id = plan_key(recipe_id)
+    with _lock:
+        _recipe_versions[recipe_id] = _recipe_versions.get(recipe_id, 0) + 1
+        _plans.pop(recipe_id, None)
+        _stats["invalidations"] += 1
+
+
+def invalidate_supply(supply_id: str) -> None:
+    global _supply_epoch
+    supply_id = str(supply_id)
+    with _lock:
+        _supply_epoch += 1
+        affected = [rid for rid, plan in _plans.items() if supply_id in plan.supply_ids]
+        for rid in affected:
+            _recipe_versions[rid] = _recipe_versions.get(rid, 0) + 1
+            del _plans[rid]
+        _stats["invalidations"] += 1
+
+
+def invalidate_all() -> None:
+    global _generation
+    with _lock:
+        _generation += 1
+        _plans.clear()
+        _stats["invalidations"] += 1
+
+
+def plan_fingerprint(plan: CostPlan) -> str:
+    """Huella de la estructura del plan (sin costos promedio): cambia si se edita la receta."""
+    rules = list(plan.rules.global_rules) + [r for rs in plan.rules.by_supply.values() for r in rs]
+    items = [[it.supply_id, it.qty_base, it.waste_pct, it.qty_formula or "", it.is_piece] for it in plan.items]
+    variables = [[v.code, v.min_value, v.max_value, v.default_value] for v in plan.variables]
+    rule_rows = [
+        [r.scope, r.target_supply_id or "", r.condition_var, r.operator, str(r.condition_value), r.effect_type, r.effect_value]
+        for r in rules
+    ]
+    raw = json.dumps(
+        [
+            plan.product_id,
+            sorted(items, key=str),
+            sorted(variables, key=str),
+            {code: dict(values) for code, values in plan.options.items()},
+            sorted(rule_rows, key=str),
+        ],
+        sort_keys=True,
+    )
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def notify_recipe(cur, recipe_id: str) -> None:
+    notify(cur, COST_PLANS_CHANNEL, f"recipe:{plan_key(recipe_id)}")
+
+
+def notify_supply(cur, supply_id: str) -> None:
+    notify(cur, COST_PLANS_CHANNEL, f"supply:{supply_id}")
+
+
+def notify_all(cur) -> None:
+    notify(cur, COST_PLANS_CHANNEL, "all")
+
+
+def _on_cost_plans_changed(payload: str | None) -> None:
+    kind, _, value = (payload or "").partition(":")
+    if kind == "recipe" and value:
+        invalidate_recipe(value)
+    elif kind == "supply" and value:
+        invalidate_supply(value)
+    else:
+        invalidate_all()
+
+
+on_notify(COST_PLANS_CHANNEL, _on_cost_plans_changed)
+
+
+def cost_plan_cache_stats() -> dict:
+    with _lock:
+        return {**_stats, "size": len(_plans), "generation": _generation}
@@ -1,7 +1,18 @@
+import threading
+import time
 from fastapi import HTTPException
+from ..core.config import get_settings
 from ..db import get_conn
+from ..notifications import notify, on_notify
 from ..repositories import fixed_costs as fixed_costs_repo
 
+# aviso entre procesos cuando cambian periodos o ítems de costos fijos
+FIXED_COSTS_CHANNEL = "fixed_costs_changed"
+
+_active_lock = threading.Lock()
+_active_cache: tuple[dict, float] | None = None
+_active_generation = 0
+
 
 def _round2(x: float) -> float:
     return round(float(x), 2)
@@ -20,7 +31,9 @@ def create_period(year: int, month: int, estimated_orders: float, currency: str,
             if active:
                 fixed_costs_repo.set_all_inactive(cur)
             row = fixed_costs_repo.insert_period(cur, year, month, estimated_orders, currency, active)
+            notify(cur, FIXED_COSTS_CHANNEL)
         conn.commit()
+    invalidate_active_period()
 
     return {
         "id": str(row[0]),
@@ -74,7 +87,9 @@ def set_period_active(period_id: str, active: bool):
             if active:
                 fixed_costs_repo.set_all_inactive(cur)
             row = fixed_costs_repo.set_active(cur, period_id, active)
+            notify(cur, FIXED_COSTS_CHANNEL)
         conn.commit()
+    invalidate_active_period()
     if not row:
         raise HTTPException(status_code=404, detail="period_id no existe")
     return {"id": str(row[0]), "active": bool(row[1])}
@@ -86,7 +101,9 @@ def add_cost_item(period_id: str, name: str, amount: float):
     with get_conn() as conn:
         with conn.cursor() as cur:
             row = fixed_costs_repo.insert_cost_item(cur, period_id, name.strip(), amount)
+            notify(cur, FIXED_COSTS_CHANNEL)
         conn.commit()
+    invalidate_active_period()
     return {
         "id": str(row[0]),
         "period_id": str(row[1]),
@@ -116,7 +133,10 @@ def delete_cost_item(item_id: str):
     with get_conn() as conn:
         with conn.cursor() as cur:
             ok = fixed_costs_repo.delete_cost_item(cur, item_id)
+            if ok:
+                notify(cur, FIXED_COSTS_CHANNEL)
         conn.commit()
+    invalidate_active_period()
     if not ok:
         raise HTTPException(status_code=404, detail="item_id no existe")
     return {"ok": True, "id": item_id}
@@ -145,20 +165,23 @@ def period_summary(period_id: str):
     }
 
 
-def active_period_summary():
-    with get_conn() as conn:
-        with conn.cursor() as cur:
-            period = fixed_costs_repo.get_active_period(cur)
-            if not period:
-                return {
-                    "period_id": None,
-                    "operational_cost_per_order": 0.0,
-                    "total_fixed_costs": 0.0,
-                    "estimated_orders": 0.0,
-                    "currency": "HNL",
-                    "active": False,
-                }
-            total = fixed_costs_repo.sum_cost_items(cur, period[0])
+def _load_active_period(cur):
+    period = fixed_costs_repo.get_active_period(cur)
+    if not period:
+        return None, 0.0
+    return period, fixed_costs_repo.sum_cost_items(cur, period[0])
+
+
+def _active_summary(period, total) -> dict:
+    if not period:
+        return {
+            "period_id": None,
+            "operational_cost_per_order": 0.0,
+            "total_fixed_costs": 0.0,
+            "estimated_orders": 0.0,
+            "currency": "HNL",
+            "active": False,
+        }
 
     estimated = float(period[3])
     cost_per_order = float(total) / estimated if estimated > 0 else 0.0
@@ -175,6 +198,51 @@ def active_period_summary():
     }
 
 
-def get_operational_cost_per_order():
-    data = active_period_summary()
+def _cache_ttl() -> float:
+    return float(getattr(get_settings(), "FIXED_COST_CACHE_TTL", 60.0))
+
+
+def active_period_summary(cur=None):
+    """Resumen del periodo activo, en caché hasta que cambien los costos fijos.
+
+    Con ``cur`` la carga (si hace falta) corre en la transacción del llamador.
+    """
+    with _active_lock:
+        cached = _active_cache
+        generation = _active_generation
+    if cached is not None and (time.monotonic() - cached[1]) < _cache_ttl():
+        return dict(cached[0])
+
+    if cur is None:
+        with get_conn() as conn:
+            with conn.cursor() as own_cur:
+                period, total = _load_active_period(own_cur)
+    else:
+        period, total = _load_active_period(cur)
+    data = _active_summary(period, total)
+
+    _store_active(data, generation)
+    return dict(data)
+
+
+def _store_active(data: dict, generation: int) -> None:
+    global _active_cache
+    with _active_lock:
+        # si hubo una invalidación durante la carga, el valor ya es viejo
+        if generation == _active_generation:
+            _active_cache = (data, time.monotonic())
+
+
+def invalidate_active_period(_payload: str | None = None) -> None:
+    global _active_cache, _active_generation
+    with _active_lock:
+        _active_generation += 1
+        _active_cache = None
+
+
+on_notify(FIXED_COSTS_CHANNEL, invalidate_active_period)
+
+
+def get_operational_cost_per_order(cur=None):
+    data = active_period_summary(cur)
     return float(data.get("operational_cost_per_order") or 0.0), data.get("period_id")
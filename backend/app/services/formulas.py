@@ -1,6 +1,9 @@
 import ast
 import math
+import operator
 import re
+import threading
+from collections import OrderedDict
 from fastapi import HTTPException
 
 
@@ -39,12 +42,12 @@ class FormulaEvaluator(ast.NodeVisitor):
             if isinstance(node.op, ast.USub):
                 return -val
             raise HTTPException(status_code=400, detail="Operador unario no permitido en fórmula")
-        if isinstance(node, ast.Num):  # py<3.8
-            return float(node.n)
         if isinstance(node, ast.Constant):
             if isinstance(node.value, (int, float)):
                 return float(node.value)
             raise HTTPException(status_code=400, detail="Constante no permitida en fórmula")
+        if isinstance(node, ast.Num):  # py<3.8
+            return float(node.n)
         if isinstance(node, ast.Name):
             name = node.id.lower()
             if not _NAME_RE.match(node.id):
@@ -57,7 +60,142 @@ class FormulaEvaluator(ast.NodeVisitor):
         raise HTTPException(status_code=400, detail="Expresión no permitida en fórmula")
 
 
+_BINOP_FUNCS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.Pow: operator.pow,
+    ast.Mod: operator.mod,
+}
+_UNARYOP_FUNCS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+_FORMULA_CACHE_SIZE = 512
+_formula_cache: "OrderedDict[str, object]" = OrderedDict()
+_formula_cache_lock = threading.Lock()
+_formula_cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def _raise_at_eval(detail: str):
+    # errores diferidos: se lanzan en el mismo orden que FormulaEvaluator.visit
+    def fn(_variables):
+        raise HTTPException(status_code=400, detail=detail)
+
+    return fn
+
+
+def _lower(node):
+    if isinstance(node, ast.Expression):
+        return _lower(node.body)
+    if isinstance(node, ast.BinOp):
+        # los operandos se evalúan antes de rechazar el operador, como en FormulaEvaluator
+        left = _lower(node.left)
+        right = _lower(node.right)
+        op = _BINOP_FUNCS.get(type(node.op))
+        if op is None:
+            reject = _raise_at_eval("Operador no permitido en fórmula")
+
+            def rejected(v):
+                left(v)
+                right(v)
+                return reject(v)
+
+            return rejected
+        return lambda v: op(left(v), right(v))
+    if isinstance(node, ast.UnaryOp):
+        operand = _lower(node.operand)
+        uop = _UNARYOP_FUNCS.get(type(node.op))
+        if uop is None:
+            reject_unary = _raise_at_eval("Operador unario no permitido en fórmula")
+
+            def rejected_unary(v):
+                operand(v)
+                return reject_unary(v)
+
+            return rejected_unary
+        return lambda v: uop(operand(v))
+    if isinstance(node, ast.Constant):
+        if isinstance(node.value, (int, float)):
+            const = float(node.value)
+            return lambda v: const
+        return _raise_at_eval("Constante no permitida en fórmula")
+    if isinstance(node, ast.Name):
+        if not _NAME_RE.match(node.id):
+            return _raise_at_eval(f"Variable inválida en fórmula: {node.id}")
+        name = node.id.lower()
+        original = node.id
+
+        def load(v):
+            try:
+                return v[name]
+            except KeyError:
+                raise HTTPException(status_code=400, detail=f"Variable requerida no enviada: {original}")
+
+        return load
+    if isinstance(node, ast.Call):
+        return _raise_at_eval("Funciones no permitidas en fórmula")
+    return _raise_at_eval("Expresión no permitida en fórmula")
+
+
+def compile_formula(expr: str):
+    """Devuelve un callable ``fn(variables)`` para ``expr``, cacheado (LRU) por texto.
+
+    ``variables`` debe venir normalizado: claves en minúscula y valores numéricos
+    (float o arreglos NumPy). El resultado no se convierte a float.
+    """
+    with _formula_cache_lock:
+        fn = _formula_cache.get(expr)
+        if fn is not None:
+            _formula_cache.move_to_end(expr)
+            _formula_cache_stats["hits"] += 1
+            return fn
+        _formula_cache_stats["misses"] += 1
+
+    try:
+        tree = ast.parse(expr, mode="eval")
+    except SyntaxError:
+        raise HTTPException(status_code=400, detail="Fórmula inválida")
+    fn = _lower(tree)
+
+    with _formula_cache_lock:
+        _formula_cache[expr] = fn
+        _formula_cache.move_to_end(expr)
+        while len(_formula_cache) > _FORMULA_CACHE_SIZE:
+            _formula_cache.popitem(last=False)
+            _formula_cache_stats["evictions"] += 1
+    return fn
+
+
+def formula_cache_stats() -> dict:
+    with _formula_cache_lock:
+        return {
+            **_formula_cache_stats,
+            "size": len(_formula_cache),
+            "max_size": _FORMULA_CACHE_SIZE,
+        }
+
+
+def clear_formula_cache() -> None:
+    with _formula_cache_lock:
+        _formula_cache.clear()
+        for k in _formula_cache_stats:
+            _formula_cache_stats[k] = 0
+
+
+def normalize_formula_vars(variables: dict[str, float]) -> dict[str, float]:
+    return {k.lower(): float(v) for k, v in variables.items()}
+
+
 def eval_formula(expr: str, variables: dict[str, float]) -> float:
+    fn = compile_formula(expr)
+    return float(fn(normalize_formula_vars(variables)))
+
+
+def interpret_formula(expr: str, variables: dict[str, float]) -> float:
+    """Evaluación por recorrido del AST (sin cache); referencia para compile_formula."""
     try:
         tree = ast.parse(expr, mode="eval")
     except SyntaxError:
@@ -0,0 +1,44 @@
+from ..core.config import get_settings
+from ..db import pool_stats
+from .cost_plans import cost_plan_cache_stats
+from .formulas import formula_cache_stats
+
+_PREFIX = "sdsinventory"
+
+_POOL_CONFIG_KEYS = (
+    "DB_POOL_MIN_SIZE",
+    "DB_POOL_MAX_SIZE",
+    "DB_POOL_TIMEOUT",
+    "DB_POOL_MAX_WAITING",
+    "DB_POOL_MAX_IDLE",
+    "DB_POOL_MAX_LIFETIME",
+    "DB_POOL_CHECK",
+)
+
+
+def db_pool_status() -> dict:
+    settings = get_settings()
+    return {
+        "config": {k.lower(): getattr(settings, k, None) for k in _POOL_CONFIG_KEYS},
+        "pools": pool_stats(),
+    }
+
+
+def _metric_lines(name: str, values: dict, labels: str = "") -> list[str]:
+    lines = []
+    for key, value in sorted(values.items()):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        lines.append(f"{_PREFIX}_{name}_{key}{labels} {value}")
+    return lines
+
+
+def render_metrics() -> str:
+    # formato de texto de Prometheus, sin tipos (untyped)
+    lines: list[str] = []
+    for pool_name, stats in pool_stats().items():
+        if stats:
+            lines.extend(_metric_lines("db", stats, f'{{pool="{pool_name}"}}'))
+    lines.extend(_metric_lines("formula_cache", formula_cache_stats()))
+    lines.extend(_metric_lines("cost_plan_cache", cost_plan_cache_stats()))
+    return "\n".join(lines) + "\n"
@@ -1,27 +1,41 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from fastapi import HTTPException
 from ..db import get_conn
 from ..repositories import movements as movements_repo
+from .pagination import check_limit, decode_cursor, encode_cursor, page
+
+# filas que trae el cursor del servidor en cada viaje
+KARDEX_FETCH_SIZE = 500
 
 
 def _round2(x: float) -> float:
     return round(float(x), 2)
 
 
-def list_movements(supply_id: str):
+def list_movements(supply_id: str, limit: int = 50, cursor: str | None = None):
+    limit = check_limit(limit)
+    after = decode_cursor(cursor)
     with get_conn() as conn:
         with conn.cursor() as cur:
-            rows = movements_repo.list_movements(cur, supply_id)
-    return [
-        {
-            "id": str(r[0]),
-            "movement_type": r[1],
-            "qty_base": float(r[2]),
-            "unit_cost_snapshot": float(r[3]),
-            "ref_type": r[4],
-            "ref_id": str(r[5]),
-            "created_at": r[6],
-        }
-        for r in rows
-    ]
+            rows = movements_repo.list_movements(cur, supply_id, limit + 1, after)
+    rows, next_cursor = page(rows, limit, created_at_index=6)
+    return {
+        "items": [
+            {
+                "id": str(r[0]),
+                "movement_type": r[1],
+                "qty_base": float(r[2]),
+                "unit_cost_snapshot": float(r[3]),
+                "ref_type": r[4],
+                "ref_id": str(r[5]),
+                "created_at": r[6],
+            }
+            for r in rows
+        ],
+        "next_cursor": next_cursor,
+    }
 
 
 def movements_summary(supply_id: str):
@@ -37,3 +51,74 @@ def movements_summary(supply_id: str):
         "total_out": _round2(total_out),
         "balance": _round2(total_in - total_out),
     }
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _kardex_line(r) -> str:
+    return (
+        json.dumps(
+            {
+                "id": str(r[0]),
+                "movement_type": r[1],
+                "qty_base": r[2],
+                "unit_cost_snapshot": r[3],
+                "ref_type": r[4],
+                "ref_id": str(r[5]) if r[5] is not None else None,
+                "created_at": r[6],
+                "running_qty": r[7],
+                "running_value": r[8],
+            },
+            default=_json_default,
+        )
+        + "\n"
+    )
+
+
+def _iter_kardex(supply_id: str, after, date_from, date_to, limit: int | None):
+    # sin limit el stream recorre todo el rango: es la exportación completa del kardex,
+    # con memoria constante gracias al cursor del servidor
+    sent = 0
+    last = None
+    with get_conn() as conn:
+        with conn.transaction():
+            with conn.cursor(name="kardex") as cur:
+                cur.itersize = KARDEX_FETCH_SIZE
+                movements_repo.execute_kardex(
+                    cur, supply_id, after, date_from, date_to, limit + 1 if limit is not None else None
+                )
+                for r in cur:
+                    if limit is not None and sent == limit:
+                        # última línea: cursor para la página siguiente
+                        yield json.dumps({"next_cursor": encode_cursor(last[6], last[0])}) + "\n"
+                        break
+                    yield _kardex_line(r)
+                    sent += 1
+                    last = r
+
+
+def stream_kardex(
+    supply_id: str,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    cursor: str | None = None,
+    limit: int | None = None,
+):
+    if limit is not None and limit < 1:
+        raise HTTPException(status_code=400, detail="limit debe ser >= 1")
+    if date_from is not None and date_to is not None and date_to < date_from:
+        raise HTTPException(status_code=400, detail="date_to debe ser >= date_from")
+    after = decode_cursor(cursor)
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            if not movements_repo.supply_exists(cur, supply_id):
+                raise HTTPException(status_code=404, detail="supply_id no existe")
+
+    return _iter_kardex(supply_id, after, date_from, date_to, limit)
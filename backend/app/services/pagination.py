@@ -0,0 +1,40 @@
+import base64
+import json
+from datetime import datetime
+from fastapi import HTTPException
+
+MAX_PAGE_SIZE = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def check_limit(limit: int) -> int:
+    # limit mayores al máximo se recortan (antes no había tope); devuelve el limit efectivo
+    if limit < 1:
+        raise HTTPException(status_code=400, detail="limit debe ser >= 1")
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def encode_cursor(created_at: datetime, row_id) -> str:
+    raw = json.dumps([created_at.isoformat(), str(row_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str | None):
+    # devuelve (created_at, id) de la última fila vista, o None para la primera página
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(created_at), str(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="cursor inválido")
+
+
+def page(rows, limit: int, created_at_index: int, id_index: int = 0):
+    # los repositorios traen limit + 1 filas para saber si hay otra página
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last[created_at_index], last[id_index])
@@ -0,0 +1,107 @@
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from fastapi import HTTPException
+from ..core.config import get_settings
+from ..db import get_conn
+from ..repositories import recipes as recipes_repo
+from .cost_plans import cost_plan_cache_stats, get_cost_plans, plan_key
+from .fixed_costs import active_period_summary
+from .recipe_costs import cached_recipe_costs, is_fixed_plan
+from .recipes import materials_cost_at_defaults
+
+_lock = threading.Lock()
+# (JSON ya serializado, momento de carga, invalidaciones de planes al cargar)
+_cached: tuple[bytes, float, int] | None = None
+
+
+def _cache_ttl() -> float:
+    return float(getattr(get_settings(), "PRICE_LIST_CACHE_TTL", 30.0))
+
+
+def _plans_version() -> int:
+    # cualquier invalidación de planes descarta la lista; con NOTIFY también llegan
+    # las de otros procesos (compras, cambios de receta)
+    return cost_plan_cache_stats()["invalidations"]
+
+
+def _price_row(row, fixed_cost: float | None, plan) -> dict:
+    recipe_id, recipe_name, margin_target, product_id, product_name, product_type, category, unit_sale = row
+    margin = float(margin_target) if margin_target is not None else 0.4
+    out = {
+        "product_id": str(product_id),
+        "product_name": product_name,
+        "product_type": product_type,
+        "category": category,
+        "unit_sale": unit_sale,
+        "recipe_id": str(recipe_id),
+        "recipe_name": recipe_name,
+        "margin_target": margin,
+        # las recetas variables se costean con sus valores por defecto
+        "is_variable": fixed_cost is None and not is_fixed_plan(plan),
+        "materials_cost": None,
+        "price": None,
+        "error": None,
+    }
+    cost = fixed_cost
+    if cost is None:
+        try:
+            cost = materials_cost_at_defaults(out["recipe_id"], plan)
+        except HTTPException as exc:
+            out["error"] = exc.detail
+            return out
+        except Exception as exc:
+            out["error"] = f"Internal error: {str(exc)}"
+            return out
+    out["materials_cost"] = cost
+    if margin < 1:
+        out["price"] = round(cost / (1.0 - margin), 2)
+    return out
+
+
+def _build_price_list() -> dict:
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            rows = recipes_repo.list_catalog_recipes(cur)
+
+    # recetas fijas: costo precalculado en recipe_cost_cache (compartido entre procesos)
+    fixed = cached_recipe_costs([r[0] for r in rows])
+    # el resto (variables o que no se pudieron costear) se costea aquí con sus planes
+    pending = [r[0] for r in rows if fixed.get(plan_key(r[0])) is None]
+    plans = get_cost_plans(pending) if pending else {}
+
+    items = [_price_row(r, fixed.get(plan_key(r[0])), plans.get(plan_key(r[0]))) for r in rows]
+    return {
+        "currency": active_period_summary()["currency"],
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "count": len(items),
+        "items": items,
+    }
+
+
+def price_list_json(refresh: bool = False) -> bytes:
+    """Lista de precios de todas las recetas de productos activos, en una sola pasada.
+
+    Se guarda ya serializada: con miles de recetas codificar la respuesta cuesta
+    más que armarla.
+    """
+    global _cached
+    ttl = _cache_ttl()
+    version = _plans_version()
+    with _lock:
+        cached = _cached
+    if (
+        not refresh
+        and ttl > 0
+        and cached is not None
+        and cached[2] == version
+        and (time.monotonic() - cached[1]) < ttl
+    ):
+        return cached[0]
+
+    body = json.dumps(_build_price_list(), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if ttl > 0:
+        with _lock:
+            _cached = (body, time.monotonic(), version)
+    return body
@@ -0,0 +1,167 @@
+import itertools
+import math
+from fastapi import HTTPException
+from ..db import get_conn
+from ..repositories import recipes as recipes_repo
+from .cost_plans import CostPlan, get_cost_plan
+from .quantity import check_waste
+from .recipes import _build_variable_context
+
+try:
+    import numpy as np
+except Exception:  # pragma: no cover
+    np = None  # type: ignore
+
+
+MAX_MATRIX_CELLS = 250_000
+MAX_AXIS_POINTS = 5_000
+
+_WIDTH_ALIASES = ("width", "w", "ancho")
+_HEIGHT_ALIASES = ("height", "h", "alto")
+
+
+def _axis(axis: tuple[float, float, float] | None, name: str):
+    if axis is None:
+        return np.array([1.0])
+    start, stop, step = (float(x) for x in axis)
+    if step <= 0:
+        raise HTTPException(status_code=400, detail=f"{name}.step debe ser > 0")
+    if stop < start:
+        raise HTTPException(status_code=400, detail=f"{name}.stop debe ser >= {name}.start")
+    count = int(math.floor((stop - start) / step + 1e-9)) + 1
+    if count > MAX_AXIS_POINTS:
+        raise HTTPException(status_code=400, detail=f"{name} excede {MAX_AXIS_POINTS} puntos")
+    values = np.round(start + step * np.arange(count, dtype=float), 10)
+    if values[0] <= 0:
+        raise HTTPException(status_code=400, detail=f"{name} debe ser > 0")
+    return values
+
+
+def _apply_effect(values, mask, effect_type: str, effect_value: float):
+    if effect_type == "multiplier":
+        changed = values * effect_value
+    elif effect_type == "add_qty":
+        changed = values + effect_value
+    else:
+        return values
+    if np.ndim(mask) == 0:
+        return changed if mask else values
+    return np.where(mask, changed, values)
+
+
+def _matrix_to_json(values):
+    # round() de Python para redondear igual que /recipes/{id}/cost
+    return [[round(x, 2) if math.isfinite(x) else None for x in row] for row in values.tolist()]
+
+
+def _layer_cost(plan: CostPlan, numeric_vars: dict, opts_selected: dict, shape):
+    total = np.zeros(shape)
+    for it in plan.items:
+        if it.formula is not None:
+            qty = np.asarray(it.formula(numeric_vars), dtype=float)
+        else:
+            qty = np.asarray(it.qty_base)
+
+        for r in plan.rules.for_supply(it.supply_id):
+            mask = r.matches(numeric_vars, opts_selected)
+            qty = _apply_effect(qty, mask, r.effect_type, r.effect_value)
+
+        waste = check_waste(it.waste_pct, it.is_piece)
+        if waste > 0:
+            if it.is_piece:
+                qty = np.ceil(qty / (1 - waste / 100.0))
+            else:
+                qty = qty * (1 + waste / 100.0)
+
+        total = total + qty * it.avg_unit_cost
+
+    for r in plan.rules.global_rules:
+        mask = r.matches(numeric_vars, opts_selected)
+        if r.effect_type == "multiplier":
+            total = _apply_effect(total, mask, "multiplier", r.effect_value)
+
+    return np.broadcast_to(total, shape)
+
+
+def price_matrix(
+    recipe_id: str,
+    width_axis: tuple[float, float, float] | None = None,
+    height_axis: tuple[float, float, float] | None = None,
+    vars_payload: dict | None = None,
+    opts_payload: dict | None = None,
+    vary_options: list[str] | None = None,
+    margin: float | None = None,
+):
+    if np is None:
+        raise HTTPException(status_code=500, detail="numpy no está instalado")
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            recipe = recipes_repo.get_recipe(cur, recipe_id)
+            if not recipe:
+                raise HTTPException(status_code=404, detail="recipe_id no existe")
+            plan = get_cost_plan(recipe_id, cur)
+
+    if margin is None:
+        margin = float(recipe[5]) if recipe[5] is not None else 0.4
+    if margin < 0 or margin >= 1:
+        raise HTTPException(status_code=400, detail="margin debe estar entre 0 y < 1 (ej 0.4)")
+
+    widths = _axis(width_axis, "width")
+    heights = _axis(height_axis, "height")
+    shape = (len(widths), len(heights))
+
+    vary = [str(c).strip().lower() for c in (vary_options or [])]
+    options_def = plan.options
+    for code in vary:
+        if code not in options_def:
+            raise HTTPException(status_code=400, detail=f"Opción no existe: {code}")
+    combos = list(itertools.product(*(list(options_def[c].keys()) for c in vary)))
+    if shape[0] * shape[1] * len(combos) > MAX_MATRIX_CELLS:
+        raise HTTPException(status_code=400, detail=f"La matriz excede {MAX_MATRIX_CELLS} celdas")
+
+    # variables y opciones de la receta tienen prioridad sobre los alias de ancho/alto
+    shadowed = {v.code for v in plan.variables} | set(options_def.keys())
+    grid_w = widths[:, None]
+    grid_h = heights[None, :]
+
+    layers = []
+    with np.errstate(all="ignore"):
+        for combo in combos:
+            layer_opts = dict(opts_payload or {})
+            layer_opts.update(dict(zip(vary, combo)))
+            numeric_vars, opts_selected = _build_variable_context(
+                plan.variables,
+                options_def,
+                None,
+                None,
+                vars_payload,
+                layer_opts,
+                False,
+            )
+            for alias in _WIDTH_ALIASES:
+                if alias not in shadowed:
+                    numeric_vars[alias] = grid_w
+            for alias in _HEIGHT_ALIASES:
+                if alias not in shadowed:
+                    numeric_vars[alias] = grid_h
+
+            cost = _layer_cost(plan, numeric_vars, opts_selected, shape)
+            price = cost / (1.0 - margin)
+            layers.append(
+                {
+                    "opts": opts_selected,
+                    "materials_cost": _matrix_to_json(cost),
+                    "price": _matrix_to_json(price),
+                }
+            )
+
+    return {
+        "recipe_id": recipe_id,
+        "currency": "HNL",
+        "margin": float(margin),
+        "widths": widths.tolist(),
+        "heights": heights.tolist(),
+        "cells": shape[0] * shape[1] * len(layers),
+        "layers": layers,
+    }
@@ -1,5 +1,5 @@
 from fastapi import HTTPException
-from ..db import get_conn
+from ..db import get_conn, write_pipeline
 from ..repositories import production as production_repo
 from .quantity import apply_waste
 
@@ -20,11 +20,11 @@ def create_production(product_id: str, recipe_id: str, qty: float = 1):
             consumptions = []
             consumptions_out = []
 
-            for supply_id, qty_base, waste_pct, avg_cost, stock_on_hand, qty_formula, unit_code, unit_name in items:
+            for supply_id, qty_base, waste_pct, avg_cost, stock_on_hand, qty_formula, is_piece in items:
                 if qty_formula:
                     raise HTTPException(status_code=400, detail="Recetas con fórmula no son válidas para producción")
                 line_qty = float(qty_base) * float(qty)
-                qty_with_waste = apply_waste(line_qty, float(waste_pct), unit_code, unit_name)
+                qty_with_waste = apply_waste(line_qty, float(waste_pct), bool(is_piece))
 
                 cost_u = float(avg_cost)
                 total_cost += qty_with_waste * cost_u
@@ -43,26 +43,36 @@ def create_production(product_id: str, recipe_id: str, qty: float = 1):
                     {"supply_id": str(supply_id), "qty_base": qty_with_waste, "unit_cost": cost_u}
                 )
 
-            prod_id = production_repo.insert_production_order(cur, product_id, recipe_id, qty, total_cost)
+            stock_needs: dict[str, float] = {}
+            for supply_id, qty_out, _cost_u in consumptions:
+                stock_needs[str(supply_id)] = stock_needs.get(str(supply_id), 0.0) + qty_out
 
-            for supply_id, qty_out, cost_u in consumptions:
-                row = production_repo.lock_supply_stock(cur, supply_id)
-                if not row:
+            locked = {
+                str(r[0]): float(r[1])
+                for r in production_repo.lock_supplies_stock(cur, list(stock_needs.keys()))
+            }
+            for supply_id, needed in stock_needs.items():
+                if supply_id not in locked:
                     raise HTTPException(status_code=400, detail=f"supply_id no existe: {supply_id}")
-
-                current_stock = float(row[0])
-                if current_stock < qty_out:
+                current_stock = locked[supply_id]
+                if current_stock < needed:
                     raise HTTPException(
                         status_code=400,
                         detail=(
-                            f"stock insuficiente supply_id={supply_id} needed={qty_out} available={current_stock}"
+                            f"stock insuficiente supply_id={supply_id} needed={needed} available={current_stock}"
                         ),
                     )
 
-                new_stock = current_stock - qty_out
-
-                production_repo.insert_inventory_movement(cur, supply_id, qty_out, cost_u, prod_id)
-                production_repo.update_supply_stock(cur, supply_id, new_stock)
+            with write_pipeline(conn):
+                prod_id = production_repo.insert_production_order(cur, product_id, recipe_id, qty, total_cost)
+                production_repo.insert_inventory_movements(
+                    cur,
+                    [(supply_id, qty_out, cost_u, prod_id) for supply_id, qty_out, cost_u in consumptions],
+                )
+                production_repo.update_supplies_stock(
+                    cur,
+                    [(locked[supply_id] - needed, supply_id) for supply_id, needed in stock_needs.items()],
+                )
 
         conn.commit()
 
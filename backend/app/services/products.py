@@ -1,5 +1,5 @@
 from fastapi import HTTPException
-from ..db import get_conn
+from ..db import get_async_conn, get_conn
 from ..repositories import products as products_repo
 
 
@@ -29,23 +29,31 @@ def create_product(
     }
 
 
+def _product_list_row(r) -> dict:
+    return {
+        "id": str(r[0]),
+        "name": r[1],
+        "active": r[2],
+        "created_at": r[3],
+        "product_type": r[4],
+        "category": r[5],
+        "unit_sale": r[6],
+        "margin_target": float(r[7]) if r[7] is not None else 0.4,
+    }
+
+
 def list_products(include_inactive: bool = False):
     with get_conn() as conn:
         with conn.cursor() as cur:
             rows = products_repo.list_products(cur, include_inactive=include_inactive)
-    return [
-        {
-            "id": str(r[0]),
-            "name": r[1],
-            "active": r[2],
-            "created_at": r[3],
-            "product_type": r[4],
-            "category": r[5],
-            "unit_sale": r[6],
-            "margin_target": float(r[7]) if r[7] is not None else 0.4,
-        }
-        for r in rows
-    ]
+    return [_product_list_row(r) for r in rows]
+
+
+async def list_products_async(include_inactive: bool = False):
+    async with get_async_conn() as conn:
+        async with conn.cursor() as cur:
+            rows = await products_repo.list_products_async(cur, include_inactive=include_inactive)
+    return [_product_list_row(r) for r in rows]
 
 
 def update_product(
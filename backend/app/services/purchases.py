@@ -1,62 +1,200 @@
+import csv
+import io
+import uuid
 from fastapi import HTTPException
-from ..db import get_conn
+from ..db import get_conn, write_pipeline
 from ..repositories import presentations as presentations_repo
 from ..repositories import purchases as purchases_repo
+from . import cost_plans, recipe_costs
+
+MAX_PURCHASE_LINES = 5000
+CSV_COLUMNS = ("supply_id", "presentation_id", "packs_qty", "total_cost")
 
 
 def _round2(x: float) -> float:
     return round(float(x), 2)
 
 
+def _uuid_str(value) -> str | None:
+    # forma canónica (minúsculas) para comparar con los ids que devuelve la BD
+    try:
+        return str(uuid.UUID(str(value).strip()))
+    except (ValueError, AttributeError):
+        return None
+
+
 def create_purchase(supply_id: str, presentation_id: str, packs_qty: float, total_cost: float, supplier_name: str | None):
+    result = create_purchase_batch(
+        [
+            {
+                "supply_id": supply_id,
+                "presentation_id": presentation_id,
+                "packs_qty": packs_qty,
+                "total_cost": total_cost,
+            }
+        ],
+        supplier_name,
+    )
+    item = result["items"][0]
+    supply = result["supplies"][0]
+    return {
+        "purchase_id": result["purchase_id"],
+        "purchase_item_id": item["purchase_item_id"],
+        "units_in_base": item["units_in_base"],
+        "unit_cost": item["unit_cost"],
+        "new_stock": supply["new_stock"],
+        "new_avg_unit_cost": supply["new_avg_unit_cost"],
+    }
+
+
+def create_purchase_batch(lines: list[dict], supplier_name: str | None):
+    """Una compra con varias líneas; cada insumo se bloquea una vez y su
+    costo promedio se recalcula con todas sus líneas juntas."""
+    if not lines:
+        raise HTTPException(status_code=400, detail="La compra debe tener al menos 1 línea")
+    if len(lines) > MAX_PURCHASE_LINES:
+        raise HTTPException(status_code=400, detail=f"La compra excede {MAX_PURCHASE_LINES} líneas")
+
+    def line_error(i: int, detail: str):
+        # con una sola línea se conserva el mensaje de siempre
+        return HTTPException(status_code=400, detail=detail if len(lines) == 1 else f"línea {i + 1}: {detail}")
+
+    ids = []
+    for i, ln in enumerate(lines):
+        supply_id = _uuid_str(ln["supply_id"])
+        if supply_id is None:
+            raise line_error(i, "supply_id inválido")
+        presentation_id = _uuid_str(ln["presentation_id"])
+        if presentation_id is None:
+            raise line_error(i, "presentation_id inválido")
+        ids.append((supply_id, presentation_id))
+
     with get_conn() as conn:
         with conn.cursor() as cur:
-            pres = presentations_repo.get_presentation_units(cur, presentation_id)
-            if not pres:
-                raise HTTPException(status_code=400, detail="presentation_id no existe")
-
-            units_per_pack = float(pres[0])
-            units_in_base = float(packs_qty) * units_per_pack
-            if units_in_base <= 0:
-                raise HTTPException(status_code=400, detail="units_in_base debe ser > 0")
-
-            unit_cost = float(total_cost) / units_in_base
-
-            row = purchases_repo.lock_supply(cur, supply_id)
-            if not row:
-                raise HTTPException(status_code=400, detail="supply_id no existe")
-
-            stock_on_hand = float(row[0])
-            avg_unit_cost = float(row[1])
-
-            prev_value = stock_on_hand * avg_unit_cost
-            buy_value = units_in_base * unit_cost
-            new_stock = stock_on_hand + units_in_base
-            new_avg = (prev_value + buy_value) / new_stock if new_stock > 0 else 0
-
-            purchase_id = purchases_repo.insert_purchase(cur, supplier_name)
-
-            purchase_item_id = purchases_repo.insert_purchase_item(
-                cur,
-                purchase_id,
-                supply_id,
-                presentation_id,
-                packs_qty,
-                units_in_base,
-                total_cost,
-                unit_cost,
-            )
+            presentation_ids = list(dict.fromkeys(pres for _sup, pres in ids))
+            units_per_pack = {
+                str(r[0]): float(r[1]) for r in presentations_repo.get_presentation_units_many(cur, presentation_ids)
+            }
 
-            purchases_repo.insert_inventory_movement(cur, supply_id, units_in_base, unit_cost, purchase_item_id)
-            purchases_repo.update_supply_stock(cur, supply_id, new_stock, new_avg)
+            item_rows = []
+            for i, ln in enumerate(lines):
+                supply_id, presentation_id = ids[i]
+                pres_units = units_per_pack.get(presentation_id)
+                if pres_units is None:
+                    raise line_error(i, "presentation_id no existe")
+                units_in_base = float(ln["packs_qty"]) * pres_units
+                if units_in_base <= 0:
+                    raise line_error(i, "units_in_base debe ser > 0")
+                total_cost = float(ln["total_cost"])
+                if total_cost < 0:
+                    raise line_error(i, "total_cost debe ser >= 0")
+                item_rows.append(
+                    (
+                        supply_id,
+                        presentation_id,
+                        float(ln["packs_qty"]),
+                        units_in_base,
+                        total_cost,
+                        total_cost / units_in_base,
+                    )
+                )
+
+            supply_ids = sorted({row[0] for row in item_rows})
+            locked = {str(r[0]): (float(r[1]), float(r[2])) for r in purchases_repo.lock_supplies(cur, supply_ids)}
+            for i, row in enumerate(item_rows):
+                if row[0] not in locked:
+                    raise line_error(i, "supply_id no existe")
+
+            # promedio ponderado por insumo con todas las líneas de la compra
+            bought: dict[str, list[float]] = {}
+            for supply_id, _pres, _packs, units_in_base, total_cost, _unit_cost in item_rows:
+                acc = bought.setdefault(supply_id, [0.0, 0.0])
+                acc[0] += units_in_base
+                acc[1] += total_cost
+
+            supplies = []
+            for supply_id in supply_ids:
+                stock_on_hand, avg_unit_cost = locked[supply_id]
+                buy_units, buy_value = bought[supply_id]
+                new_stock = stock_on_hand + buy_units
+                new_avg = (stock_on_hand * avg_unit_cost + buy_value) / new_stock if new_stock > 0 else 0
+                supplies.append((supply_id, new_stock, new_avg))
+
+            with write_pipeline(conn):
+                purchase_id = purchases_repo.insert_purchase(cur, supplier_name)
+                item_ids = purchases_repo.insert_purchase_items(cur, purchase_id, item_rows)
+                purchases_repo.insert_inventory_movements(
+                    cur,
+                    [(row[0], row[3], row[5], item_id) for row, item_id in zip(item_rows, item_ids)],
+                )
+                purchases_repo.update_supplies_stock(
+                    cur,
+                    [(new_stock, new_avg, supply_id) for supply_id, new_stock, new_avg in supplies],
+                )
+            for supply_id in supply_ids:
+                cost_plans.notify_supply(cur, supply_id)
 
         conn.commit()
+    for supply_id in supply_ids:
+        cost_plans.invalidate_supply(supply_id)
+    recipe_costs.refresh_costs_after_commit(supply_ids)
 
     return {
         "purchase_id": str(purchase_id),
-        "purchase_item_id": str(purchase_item_id),
-        "units_in_base": units_in_base,
-        "unit_cost": _round2(unit_cost),
-        "new_stock": new_stock,
-        "new_avg_unit_cost": _round2(new_avg),
+        "items": [
+            {
+                "purchase_item_id": str(item_id),
+                "supply_id": row[0],
+                "presentation_id": row[1],
+                "packs_qty": row[2],
+                "units_in_base": row[3],
+                "total_cost": row[4],
+                "unit_cost": _round2(row[5]),
+            }
+            for row, item_id in zip(item_rows, item_ids)
+        ],
+        "supplies": [
+            {
+                "supply_id": supply_id,
+                "new_stock": new_stock,
+                "new_avg_unit_cost": _round2(new_avg),
+            }
+            for supply_id, new_stock, new_avg in supplies
+        ],
     }
+
+
+def parse_purchase_csv(text: str) -> list[dict]:
+    # encabezado obligatorio: supply_id,presentation_id,packs_qty,total_cost (coma o punto y coma)
+    if not text.strip():
+        raise HTTPException(status_code=400, detail="CSV vacío")
+    text = text.lstrip("\ufeff")
+    first_line = text.splitlines()[0]
+    delimiter = ";" if first_line.count(";") > first_line.count(",") else ","
+    reader = csv.DictReader(io.StringIO(text), delimiter=delimiter)
+    header = [str(h).strip().lower() for h in (reader.fieldnames or [])]
+    missing = [c for c in CSV_COLUMNS if c not in header]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"CSV sin columnas: {', '.join(missing)}")
+    reader.fieldnames = header
+
+    lines = []
+    for row in reader:
+        if not any(isinstance(v, str) and v.strip() for v in row.values()):
+            continue
+        try:
+            lines.append(
+                {
+                    "supply_id": row["supply_id"].strip(),
+                    "presentation_id": row["presentation_id"].strip(),
+                    "packs_qty": float(row["packs_qty"]),
+                    "total_cost": float(row["total_cost"]),
+                }
+            )
+        except (TypeError, ValueError, AttributeError):
+            raise HTTPException(status_code=400, detail=f"CSV línea {reader.line_num}: valores inválidos")
+    return lines
+
+
+def import_purchase_csv(text: str, supplier_name: str | None):
+    return create_purchase_batch(parse_purchase_csv(text), supplier_name)
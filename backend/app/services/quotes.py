@@ -1,11 +1,13 @@
 from datetime import date, timedelta
 from types import SimpleNamespace
 from fastapi import HTTPException
-from ..db import get_conn
+from ..db import get_async_conn, get_conn, write_pipeline
 from ..repositories import quotes as quotes_repo
 from . import recipes as recipes_service
+from .cost_plans import CostPlan, get_cost_plans, load_cost_plans, plan_fingerprint, plan_key
 from .fixed_costs import get_operational_cost_per_order
-from .sales import create_sale as create_sale_service
+from .pagination import check_limit, decode_cursor, page
+from .sales import create_sale_in_transaction
 
 
 def _round2(x: float) -> float:
@@ -14,20 +16,36 @@ def _round2(x: float) -> float:
 
 ALLOWED_STATUSES = {"draft", "sent", "accepted", "rejected", "expired", "converted"}
 
+MAX_CONVERT_BATCH = 100
+EXPIRY_BATCH_SIZE = 500
+# tolerancia al comparar avg_unit_cost actual contra el del snapshot
+_COST_EPSILON = 1e-9
+
 
 def _next_quote_number(cur) -> str:
+    # llamar al final de la transacción, justo antes de insertar la cotización,
+    # para no serializar el costeo de cotizaciones concurrentes
     year = date.today().year
-    row = quotes_repo.lock_sequence(cur, year)
-    if row is None:
-        quotes_repo.insert_sequence(cur, year)
-        last = 0
-    else:
-        last = int(row[0])
-    new_num = last + 1
-    quotes_repo.update_sequence(cur, year, new_num)
+    new_num = quotes_repo.allocate_number(cur, year)
     return f"COT-{year}-{new_num:04d}"
 
 
+def _materials_snapshot(cost_data: dict, plan: CostPlan) -> dict:
+    # costeo por unidad de la línea; convert_quote lo reutiliza si ni la receta ni los costos cambiaron
+    return {
+        "fingerprint": plan_fingerprint(plan),
+        "materials_cost": float(cost_data["materials_cost"]),
+        "items": [
+            {
+                "supply_id": str(it["supply_id"]),
+                "qty_with_waste": float(it["qty_with_waste"]),
+                "avg_unit_cost": float(it["avg_unit_cost"]),
+            }
+            for it in cost_data["items"]
+        ],
+    }
+
+
 def _allocate_operational(total_operational: float, line_materials: list[float]) -> list[float]:
     if not line_materials:
         return []
@@ -58,19 +76,10 @@ def create_quote(payload):
         with get_conn() as conn:
             with conn.transaction():
                 with conn.cursor() as cur:
-                    quote_number = _next_quote_number(cur)
-
-                    for line in payload.lines:
-                        if float(line.qty) <= 0:
-                            raise HTTPException(status_code=400, detail="qty debe ser > 0")
-
-                        cost_data = recipes_service.compute_recipe_cost_strict(
-                            line.recipe_id,
-                            width=line.width,
-                            height=line.height,
-                            vars_payload=getattr(line, "vars", None),
-                            opts_payload=getattr(line, "opts", None),
-                        )
+                    costs = recipes_service.compute_order_costs(cur, payload.lines, check_product=False)
+                    plans = get_cost_plans([line.recipe_id for line in payload.lines], cur)
+
+                    for line, cost_data in zip(payload.lines, costs):
                         items = cost_data["items"]
                         if not items:
                             raise HTTPException(status_code=400, detail="La receta no tiene items")
@@ -90,13 +99,14 @@ def create_quote(payload):
                                 "sale_price_unit": float(line.sale_price) if line.sale_price is not None else None,
                                 "vars": getattr(line, "vars", None),
                                 "opts": getattr(line, "opts", None),
+                                "materials_snapshot": _materials_snapshot(cost_data, plans[plan_key(line.recipe_id)]),
                             }
                         )
 
                         line_materials_list.append(float(line_materials_cost))
                         total_materials += line_materials_cost
 
-                    operational_per_order, period_id = get_operational_cost_per_order()
+                    operational_per_order, period_id = get_operational_cost_per_order(cur)
                     operational_total = float(operational_per_order)
 
                     op_allocs = _allocate_operational(operational_total, line_materials_list)
@@ -128,40 +138,47 @@ def create_quote(payload):
                     total_cost = total_materials + operational_total
                     total_profit = total_sale - total_cost
 
-                    quote_id = quotes_repo.insert_quote(
-                        cur,
-                        quote_number,
-                        status,
-                        valid_until,
-                        payload.customer_name,
-                        payload.notes,
-                        payload.currency,
-                        payload.margin,
-                        total_materials,
-                        operational_total,
-                        total_cost,
-                        total_sale,
-                        total_profit,
-                        period_id,
-                    )
-
-                    for pl in prepared_lines:
-                        quotes_repo.insert_quote_item(
+                    with write_pipeline(conn):
+                        quote_number = _next_quote_number(cur)
+                        quote_id = quotes_repo.insert_quote(
+                            cur,
+                            quote_number,
+                            status,
+                            valid_until,
+                            payload.customer_name,
+                            payload.notes,
+                            payload.currency,
+                            payload.margin,
+                            total_materials,
+                            operational_total,
+                            total_cost,
+                            total_sale,
+                            total_profit,
+                            period_id,
+                        )
+
+                        quotes_repo.insert_quote_items(
                             cur,
                             quote_id,
-                            pl["product_id"],
-                            pl["recipe_id"],
-                            pl["qty"],
-                            pl["materials_cost_total"],
-                            pl["line_suggested_total"],
-                            pl["line_sale_total"],
-                            pl["line_profit"],
-                            pl.get("width"),
-                            pl.get("height"),
-                            {"vars": pl.get("vars") or {}, "opts": pl.get("opts") or {}},
+                            [
+                                (
+                                    pl["product_id"],
+                                    pl["recipe_id"],
+                                    pl["qty"],
+                                    pl["materials_cost_total"],
+                                    pl["line_suggested_total"],
+                                    pl["line_sale_total"],
+                                    pl["line_profit"],
+                                    pl.get("width"),
+                                    pl.get("height"),
+                                    {"vars": pl.get("vars") or {}, "opts": pl.get("opts") or {}},
+                                    pl["materials_snapshot"],
+                                )
+                                for pl in prepared_lines
+                            ],
                         )
 
-                    quotes_repo.insert_status_history(cur, quote_id, status, None, None)
+                        quotes_repo.insert_status_history(cur, quote_id, status, None, None)
 
         return {
             "quote_id": str(quote_id),
@@ -183,25 +200,51 @@ def create_quote(payload):
         raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
 
 
-def list_quotes(limit: int = 50, offset: int = 0, status: str | None = None):
+def _quote_list_row(r) -> dict:
+    return {
+        "id": str(r[0]),
+        "quote_number": r[1],
+        "status": r[2],
+        "valid_until": r[3],
+        "customer_name": r[4],
+        "currency": r[5],
+        "total_price": float(r[6]),
+        "total_cost": float(r[7]),
+        "total_profit": float(r[8]),
+        "created_at": r[9],
+    }
+
+
+def list_quotes(
+    limit: int = 50,
+    offset: int = 0,
+    status: str | None = None,
+    cursor: str | None = None,
+    active: bool = False,
+):
+    limit = check_limit(limit)
+    after = decode_cursor(cursor)
     with get_conn() as conn:
         with conn.cursor() as cur:
-            rows = quotes_repo.list_quotes(cur, limit, offset, status)
-    return [
-        {
-            "id": str(r[0]),
-            "quote_number": r[1],
-            "status": r[2],
-            "valid_until": r[3],
-            "customer_name": r[4],
-            "currency": r[5],
-            "total_price": float(r[6]),
-            "total_cost": float(r[7]),
-            "total_profit": float(r[8]),
-            "created_at": r[9],
-        }
-        for r in rows
-    ]
+            rows = quotes_repo.list_quotes(cur, limit + 1, offset, status, after, active)
+    rows, next_cursor = page(rows, limit, created_at_index=9)
+    return {"items": [_quote_list_row(r) for r in rows], "next_cursor": next_cursor}
+
+
+async def list_quotes_async(
+    limit: int = 50,
+    offset: int = 0,
+    status: str | None = None,
+    cursor: str | None = None,
+    active: bool = False,
+):
+    limit = check_limit(limit)
+    after = decode_cursor(cursor)
+    async with get_async_conn() as conn:
+        async with conn.cursor() as cur:
+            rows = await quotes_repo.list_quotes_async(cur, limit + 1, offset, status, after, active)
+    rows, next_cursor = page(rows, limit, created_at_index=9)
+    return {"items": [_quote_list_row(r) for r in rows], "next_cursor": next_cursor}
 
 
 def get_quote_detail(quote_id: str):
@@ -260,47 +303,142 @@ def update_quote_status(quote_id: str, status: str, notes: str | None, changed_b
                 head = quotes_repo.get_quote(cur, quote_id)
                 if not head:
                     raise HTTPException(status_code=404, detail="quote_id no existe")
-                quotes_repo.update_quote_status(cur, quote_id, status)
-                quotes_repo.insert_status_history(cur, quote_id, status, notes, changed_by)
+                with write_pipeline(conn):
+                    quotes_repo.update_quote_status(cur, quote_id, status)
+                    quotes_repo.insert_status_history(cur, quote_id, status, notes, changed_by)
     return {"ok": True, "quote_id": quote_id, "status": status}
 
 
-def convert_quote(quote_id: str):
-    detail = get_quote_detail(quote_id)
-    if detail["status"] == "converted":
+def _reusable_snapshots(cur, items_rows) -> list[dict | None]:
+    # snapshot por línea solo si la receta (huella y producto) y los costos promedio
+    # siguen iguales; los planes se leen de la BD, no de la caché del proceso
+    with_snapshot = [r for r in items_rows if r[12] and r[12].get("fingerprint")]
+    plans = load_cost_plans([r[2] for r in with_snapshot], cur) if with_snapshot else {}
+
+    out = []
+    for r in items_rows:
+        snap = r[12]
+        plan = plans.get(plan_key(r[2])) if snap else None
+        fresh = (
+            plan is not None
+            and plan.product_id is not None
+            and plan_key(plan.product_id) == plan_key(r[1])
+            and snap.get("fingerprint") == plan_fingerprint(plan)
+        )
+        if fresh:
+            current = {it.supply_id: it.avg_unit_cost for it in plan.items}
+            fresh = all(
+                it["supply_id"] in current and abs(current[it["supply_id"]] - float(it["avg_unit_cost"])) <= _COST_EPSILON
+                for it in snap["items"]
+            )
+        out.append(snap if fresh else None)
+    return out
+
+
+def _convert_in_transaction(conn, cur, quote_id: str):
+    head = quotes_repo.lock_quote(cur, quote_id)
+    if not head:
+        raise HTTPException(status_code=404, detail="quote_id no existe")
+    if head[2] == "converted":
         return {"error": "La cotización ya fue convertida", "quote_id": quote_id}
 
+    items_rows = quotes_repo.list_quote_items(cur, quote_id)
+    if not items_rows:
+        raise HTTPException(status_code=400, detail="La cotización no tiene líneas")
+
     lines = []
-    for it in detail["items"]:
-        qty = float(it["qty"])
-        sale_price_unit = float(it["sale_price"]) / qty if qty > 0 else 0.0
-        payload = SimpleNamespace(
-            product_id=it["product_id"],
-            recipe_id=it["recipe_id"],
-            qty=qty,
-            sale_price=sale_price_unit,
-            width=it.get("width"),
-            height=it.get("height"),
-            vars=(it.get("var_payload") or {}).get("vars"),
-            opts=(it.get("var_payload") or {}).get("opts"),
+    for r in items_rows:
+        qty = float(r[3])
+        var_payload = r[10] or {}
+        lines.append(
+            SimpleNamespace(
+                product_id=r[1],
+                recipe_id=r[2],
+                qty=qty,
+                sale_price=float(r[6]) / qty if qty > 0 else 0.0,
+                width=r[8],
+                height=r[9],
+                vars=var_payload.get("vars"),
+                opts=var_payload.get("opts"),
+            )
         )
-        lines.append(payload)
+
+    # solo se recostean las líneas cuyo snapshot quedó viejo
+    snapshots = _reusable_snapshots(cur, items_rows)
+    stale = [line for line, snap in zip(lines, snapshots) if snap is None]
+    recosted = iter(recipes_service.compute_order_costs(cur, stale) if stale else [])
+    costs = [snap if snap is not None else next(recosted) for snap in snapshots]
 
     sale_payload = SimpleNamespace(
-        customer_name=detail.get("customer_name"),
-        notes=detail.get("notes"),
-        currency=detail.get("currency") or "HNL",
-        margin=detail.get("margin") or 0.4,
+        customer_name=head[4],
+        notes=head[5],
+        currency=head[6] or "HNL",
+        margin=float(head[7]) if head[7] else 0.4,
         lines=lines,
     )
+    sale = create_sale_in_transaction(conn, cur, sale_payload, costs)
+    sale_id = sale["sale_id"]
+
+    with write_pipeline(conn):
+        quotes_repo.mark_quote_converted(cur, quote_id, sale_id)
+        quotes_repo.insert_status_history(cur, quote_id, "converted", None, None)
+
+    return {"ok": True, "quote_id": quote_id, "sale_id": sale_id, "recosted_lines": len(stale)}
 
-    sale_result = create_sale_service(sale_payload)
-    sale_id = sale_result.get("sale_id")
 
+def convert_quote(quote_id: str):
+    try:
+        with get_conn() as conn:
+            with conn.transaction():
+                with conn.cursor() as cur:
+                    return _convert_in_transaction(conn, cur, quote_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
+
+
+def convert_quotes_batch(quote_ids: list[str]):
+    ids = list(dict.fromkeys(str(q).strip() for q in quote_ids if str(q).strip()))
+    if not ids:
+        raise HTTPException(status_code=400, detail="quote_ids no puede estar vacío")
+    if len(ids) > MAX_CONVERT_BATCH:
+        raise HTTPException(status_code=400, detail=f"Máximo {MAX_CONVERT_BATCH} cotizaciones por lote")
+
+    results = []
     with get_conn() as conn:
         with conn.transaction():
             with conn.cursor() as cur:
-                quotes_repo.mark_quote_converted(cur, quote_id, sale_id)
-                quotes_repo.insert_status_history(cur, quote_id, "converted", None, None)
-
-    return {"ok": True, "quote_id": quote_id, "sale_id": sale_id}
+                for quote_id in ids:
+                    # savepoint por cotización: una que falla no revierte las demás
+                    try:
+                        with conn.transaction():
+                            results.append(_convert_in_transaction(conn, cur, quote_id))
+                    except HTTPException as e:
+                        results.append({"error": e.detail, "quote_id": quote_id})
+                    except Exception as e:
+                        results.append({"error": f"Internal error: {str(e)}", "quote_id": quote_id})
+
+    converted = sum(1 for r in results if r.get("ok"))
+    return {"converted": converted, "failed": len(results) - converted, "results": results}
+
+
+def expire_quotes(batch_size: int = EXPIRY_BATCH_SIZE, max_batches: int | None = None) -> int:
+    """Pasa a expired las cotizaciones draft/sent con valid_until vencido.
+
+    Cada lote va en su propia transacción, así los bloqueos duran poco.
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size debe ser >= 1")
+    total = 0
+    batches = 0
+    with get_conn() as conn:
+        while max_batches is None or batches < max_batches:
+            with conn.transaction():
+                with conn.cursor() as cur:
+                    expired = quotes_repo.expire_due_quotes(cur, batch_size, "expiry_sweeper")
+            total += expired
+            batches += 1
+            if expired < batch_size:
+                break
+    return total
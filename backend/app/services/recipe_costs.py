@@ -0,0 +1,150 @@
+import logging
+import threading
+import uuid
+from ..db import get_conn
+from ..repositories import recipe_costs as recipe_costs_repo
+from .cost_plans import CostPlan, get_cost_plans, load_cost_plans, plan_key
+from .recipes import materials_cost_at_defaults
+
+logger = logging.getLogger(__name__)
+
+# recetas que una lectura encontró sin costo vigente; las recalcula un hilo aparte
+_pending: set[str] = set()
+_pending_lock = threading.Lock()
+_worker: threading.Thread | None = None
+
+
+def is_fixed_plan(plan: CostPlan) -> bool:
+    # sin fórmulas, variables, opciones ni reglas el costo no depende del pedido
+    return (
+        bool(plan.items)
+        and all(it.formula is None for it in plan.items)
+        and not plan.variables
+        and not plan.options
+        and not plan.rules.by_supply
+        and not plan.rules.global_rules
+    )
+
+
+def _recipe_keys(recipe_ids) -> list[str]:
+    # recipe_cost_cache.recipe_id es uuid: los ids mal formados no pueden estar cacheados
+    keys = []
+    for r in dict.fromkeys(plan_key(r) for r in recipe_ids):
+        try:
+            uuid.UUID(r)
+        except ValueError:
+            continue
+        keys.append(r)
+    return keys
+
+
+def _costs_from_plans(plans: dict[str, CostPlan]) -> tuple[dict[str, float | None], list[str]]:
+    # devuelve (costos, recetas que ya no existen)
+    out: dict[str, float | None] = {}
+    gone = []
+    for recipe_id, plan in plans.items():
+        if plan.product_id is None:
+            gone.append(recipe_id)
+            continue
+        cost = None
+        if is_fixed_plan(plan):
+            try:
+                cost = materials_cost_at_defaults(recipe_id, plan)
+            except Exception:
+                # un ítem inválido (p. ej. merma >= 100 en piezas) no frena a las demás;
+                # la fila queda en null y se recalcula cuando se edite la receta
+                logger.warning("no se pudo costear la receta %s", recipe_id, exc_info=True)
+        out[recipe_id] = cost
+    return out, gone
+
+
+def _refresh(conn, recipe_ids: list[str]) -> dict[str, float | None]:
+    with conn.transaction():
+        with conn.cursor() as cur:
+            # primero el bloqueo: los costos se leen después, con datos ya confirmados
+            recipe_costs_repo.lock_recipe_costs(cur, recipe_ids)
+            out, gone = _costs_from_plans(load_cost_plans(recipe_ids, cur))
+            if out:
+                recipe_costs_repo.upsert_recipe_costs(cur, list(out.items()))
+            if gone:
+                recipe_costs_repo.delete_recipe_costs(cur, gone)
+    return out
+
+
+def refresh_recipe_costs(recipe_ids) -> dict[str, float | None]:
+    keys = _recipe_keys(recipe_ids)
+    if not keys:
+        return {}
+    with get_conn() as conn:
+        return _refresh(conn, keys)
+
+
+def refresh_costs_for_supplies(supply_ids) -> int:
+    """Recalcula solo las recetas que usan estos insumos; devuelve cuántas."""
+    supply_ids = [str(s) for s in dict.fromkeys(supply_ids)]
+    if not supply_ids:
+        return 0
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            recipe_ids = recipe_costs_repo.list_recipes_using_supplies(cur, supply_ids)
+        conn.commit()
+        if recipe_ids:
+            _refresh(conn, [plan_key(r) for r in recipe_ids])
+    return len(recipe_ids)
+
+
+def refresh_costs_after_commit(supply_ids) -> None:
+    # la compra ya se confirmó; si falla, las filas quedan marcadas y se recalculan al leer
+    try:
+        refresh_costs_for_supplies(supply_ids)
+    except Exception:
+        logger.exception("fallo al recalcular costos de recetas")
+
+
+def _drain_pending() -> None:
+    global _worker
+    while True:
+        with _pending_lock:
+            if not _pending:
+                _worker = None
+                return
+            keys = sorted(_pending)
+            _pending.clear()
+        try:
+            refresh_recipe_costs(keys)
+        except Exception:
+            logger.exception("fallo al recalcular costos de recetas")
+
+
+def _schedule_refresh(recipe_ids: list[str]) -> None:
+    global _worker
+    with _pending_lock:
+        _pending.update(recipe_ids)
+        if _worker is None:
+            _worker = threading.Thread(target=_drain_pending, name="recipe-costs", daemon=True)
+            _worker.start()
+
+
+def cached_recipe_costs(recipe_ids) -> dict[str, float | None]:
+    """Costo de materiales de recetas fijas; None si la receta es variable.
+
+    Solo lee: las filas que faltan o están viejas se costean en memoria y se
+    recalculan en segundo plano, así un GET no toma bloqueos ni espera a una compra.
+    """
+    keys = _recipe_keys(recipe_ids)
+    if not keys:
+        return {}
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            rows = recipe_costs_repo.get_recipe_costs(cur, keys)
+
+    out: dict[str, float | None] = {}
+    for recipe_id, materials_cost, stale, _computed_at in rows:
+        if not stale:
+            out[plan_key(recipe_id)] = float(materials_cost) if materials_cost is not None else None
+    missing = [k for k in keys if k not in out]
+    if missing:
+        costs, _gone = _costs_from_plans(get_cost_plans(missing))
+        out.update(costs)
+        _schedule_refresh(missing)
+    return out
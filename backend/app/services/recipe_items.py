@@ -3,6 +3,7 @@ from ..db import get_conn
 from ..repositories import recipe_items as recipe_items_repo
 from ..repositories import recipes as recipes_repo
 from .formulas import validate_formula
+from . import cost_plans
 
 
 def add_recipe_item(recipe_id: str, supply_id: str, qty_base: float, waste_pct: float, qty_formula: str | None):
@@ -31,7 +32,9 @@ def add_recipe_item(recipe_id: str, supply_id: str, qty_base: float, waste_pct:
                     raise HTTPException(status_code=400, detail="qty_base debe ser > 0")
 
             row = recipe_items_repo.insert_recipe_item(cur, recipe_id, supply_id, qty_base, waste_pct, qty_formula)
+            cost_plans.notify_recipe(cur, recipe_id)
         conn.commit()
+    cost_plans.invalidate_recipe(recipe_id)
     return {
         "id": str(row[0]),
         "recipe_id": str(row[1]),
@@ -91,7 +94,10 @@ def update_recipe_item(item_id: str, recipe_id: str, supply_id: str, qty_base: f
             row = recipe_items_repo.update_recipe_item(
                 cur, item_id, recipe_id, supply_id, qty_base, waste_pct, qty_formula
             )
+            cost_plans.notify_all(cur)
         conn.commit()
+    # el item pudo cambiar de receta
+    cost_plans.invalidate_all()
 
     if not row:
         raise HTTPException(status_code=404, detail="recipe_item_id no existe")
@@ -110,7 +116,9 @@ def delete_recipe_item(item_id: str):
     with get_conn() as conn:
         with conn.cursor() as cur:
             ok = recipe_items_repo.delete_recipe_item(cur, item_id)
+            cost_plans.notify_all(cur)
         conn.commit()
+    cost_plans.invalidate_all()
     if not ok:
         raise HTTPException(status_code=404, detail="recipe_item_id no existe")
     return {"ok": True, "id": item_id}
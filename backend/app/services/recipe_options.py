@@ -2,6 +2,7 @@ from fastapi import HTTPException
 from ..db import get_conn
 from ..repositories import recipe_options as recipe_options_repo
 from ..repositories import recipe_option_values as option_values_repo
+from . import cost_plans
 
 
 def create_option(recipe_id: str, code: str, label: str):
@@ -12,7 +13,9 @@ def create_option(recipe_id: str, code: str, label: str):
     with get_conn() as conn:
         with conn.cursor() as cur:
             row = recipe_options_repo.insert_recipe_option(cur, recipe_id, code.strip(), label.strip())
+            cost_plans.notify_recipe(cur, recipe_id)
         conn.commit()
+    cost_plans.invalidate_recipe(recipe_id)
     return {
         "id": str(row[0]),
         "recipe_id": str(row[1]),
@@ -46,7 +49,9 @@ def update_option(option_id: str, recipe_id: str, code: str, label: str):
     with get_conn() as conn:
         with conn.cursor() as cur:
             row = recipe_options_repo.update_recipe_option(cur, option_id, recipe_id, code.strip(), label.strip())
+            cost_plans.notify_all(cur)
         conn.commit()
+    cost_plans.invalidate_all()
     if not row:
         raise HTTPException(status_code=404, detail="option_id no existe")
     return {
@@ -62,7 +67,9 @@ def delete_option(option_id: str):
     with get_conn() as conn:
         with conn.cursor() as cur:
             ok = recipe_options_repo.delete_recipe_option(cur, option_id)
+            cost_plans.notify_all(cur)
         conn.commit()
+    cost_plans.invalidate_all()
     if not ok:
         raise HTTPException(status_code=404, detail="option_id no existe")
     return {"ok": True, "id": option_id}
@@ -78,7 +85,9 @@ def add_option_value(option_id: str, value_key: str, label: str, numeric_value:
             row = option_values_repo.insert_option_value(
                 cur, option_id, value_key.strip(), label.strip(), numeric_value
             )
+            cost_plans.notify_all(cur)
         conn.commit()
+    cost_plans.invalidate_all()
     return {
         "id": str(row[0]),
         "option_id": str(row[1]),
@@ -116,7 +125,9 @@ def update_option_value(value_id: str, option_id: str, value_key: str, label: st
             row = option_values_repo.update_option_value(
                 cur, value_id, option_id, value_key.strip(), label.strip(), numeric_value
             )
+            cost_plans.notify_all(cur)
         conn.commit()
+    cost_plans.invalidate_all()
     if not row:
         raise HTTPException(status_code=404, detail="value_id no existe")
     return {
@@ -133,7 +144,9 @@ def delete_option_value(value_id: str):
     with get_conn() as conn:
         with conn.cursor() as cur:
             ok = option_values_repo.delete_option_value(cur, value_id)
+            cost_plans.notify_all(cur)
         conn.commit()
+    cost_plans.invalidate_all()
     if not ok:
         raise HTTPException(status_code=404, detail="value_id no existe")
     return {"ok": True, "id": value_id}
@@ -1,6 +1,7 @@
 from fastapi import HTTPException
 from ..db import get_conn
 from ..repositories import recipe_rules as recipe_rules_repo
+from . import cost_plans
 
 
 ALLOWED_SCOPES = {"global", "supply"}
@@ -50,7 +51,9 @@ def add_rule(
                 effect_type.strip(),
                 effect_value,
             )
+            cost_plans.notify_recipe(cur, recipe_id)
         conn.commit()
+    cost_plans.invalidate_recipe(recipe_id)
     return {
         "id": str(row[0]),
         "recipe_id": str(row[1]),
@@ -117,7 +120,9 @@ def update_rule(
                 effect_type.strip(),
                 effect_value,
             )
+            cost_plans.notify_all(cur)
         conn.commit()
+    cost_plans.invalidate_all()
     if not row:
         raise HTTPException(status_code=404, detail="rule_id no existe")
     return {
@@ -138,7 +143,9 @@ def delete_rule(rule_id: str):
     with get_conn() as conn:
         with conn.cursor() as cur:
             ok = recipe_rules_repo.delete_recipe_rule(cur, rule_id)
+            cost_plans.notify_all(cur)
         conn.commit()
+    cost_plans.invalidate_all()
     if not ok:
         raise HTTPException(status_code=404, detail="rule_id no existe")
     return {"ok": True, "id": rule_id}
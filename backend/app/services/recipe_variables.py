@@ -1,6 +1,7 @@
 from fastapi import HTTPException
 from ..db import get_conn
 from ..repositories import recipe_variables as recipe_variables_repo
+from . import cost_plans
 
 
 def add_variable(recipe_id: str, code: str, label: str, min_value, max_value, default_value):
@@ -22,7 +23,9 @@ def add_variable(recipe_id: str, code: str, label: str, min_value, max_value, de
                 max_value,
                 default_value,
             )
+            cost_plans.notify_recipe(cur, recipe_id)
         conn.commit()
+    cost_plans.invalidate_recipe(recipe_id)
     return {
         "id": str(row[0]),
         "recipe_id": str(row[1]),
@@ -74,7 +77,9 @@ def update_variable(var_id: str, recipe_id: str, code: str, label: str, min_valu
                 max_value,
                 default_value,
             )
+            cost_plans.notify_all(cur)
         conn.commit()
+    cost_plans.invalidate_all()
     if not row:
         raise HTTPException(status_code=404, detail="variable_id no existe")
     return {
@@ -93,7 +98,9 @@ def delete_variable(var_id: str):
     with get_conn() as conn:
         with conn.cursor() as cur:
             ok = recipe_variables_repo.delete_recipe_variable(cur, var_id)
+            cost_plans.notify_all(cur)
         conn.commit()
+    cost_plans.invalidate_all()
     if not ok:
         raise HTTPException(status_code=404, detail="variable_id no existe")
     return {"ok": True, "id": var_id}
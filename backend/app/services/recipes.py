@@ -1,11 +1,19 @@
+import uuid
 from fastapi import HTTPException
 from ..db import get_conn
 from ..repositories import recipes as recipes_repo
-from ..repositories import recipe_variables as recipe_variables_repo
-from ..repositories import recipe_options as recipe_options_repo
-from ..repositories import recipe_rules as recipe_rules_repo
-from .formulas import eval_formula
+from .cost_plans import (
+    CostPlan,
+    PlanVariable,
+    get_cost_plan,
+    get_cost_plans,
+    get_cost_plans_async,
+    invalidate_recipe,
+    notify_recipe,
+    plan_key,
+)
 from .quantity import apply_waste
+from .rules_engine import apply_global_rules, apply_supply_rules
 
 
 def _round2(x: float) -> float:
@@ -34,50 +42,9 @@ def _normalize_opts_payload(payload: dict | None) -> dict[str, str]:
     return out
 
 
-def _load_recipe_context(cur, recipe_id: str):
-    vars_rows = recipe_variables_repo.list_recipe_variables(cur, recipe_id)
-    options_rows = recipe_options_repo.list_options_with_values(cur, recipe_id)
-    rules_rows = recipe_rules_repo.list_recipe_rules(cur, recipe_id)
-
-    variables = [
-        {
-            "code": r[2],
-            "min_value": r[4],
-            "max_value": r[5],
-            "default_value": r[6],
-        }
-        for r in vars_rows
-    ]
-
-    options: dict[str, dict[str, float]] = {}
-    for _opt_id, opt_code, _opt_label, _val_id, value_key, _value_label, numeric_value in options_rows:
-        if opt_code is None:
-            continue
-        code = str(opt_code).strip().lower()
-        if code not in options:
-            options[code] = {}
-        if value_key is not None:
-            options[code][str(value_key)] = float(numeric_value)
-
-    rules = [
-        {
-            "scope": r[2],
-            "target_supply_id": r[3],
-            "condition_var": str(r[4]).strip().lower(),
-            "operator": r[5],
-            "condition_value": r[6],
-            "effect_type": r[7],
-            "effect_value": float(r[8]),
-        }
-        for r in rules_rows
-    ]
-
-    return variables, options, rules
-
-
 def _build_variable_context(
-    variables_def: list[dict],
-    options_def: dict[str, dict[str, float]],
+    variables_def: tuple[PlanVariable, ...],
+    options_def,
     width: float | None,
     height: float | None,
     vars_payload: dict | None,
@@ -110,23 +77,23 @@ def _build_variable_context(
         numeric_vars["alto"] = float(height)
 
     for v in variables_def:
-        code = str(v["code"]).strip().lower()
+        code = v.code
         if code in vars_map:
             val = float(vars_map[code])
-        elif v.get("default_value") is not None:
-            val = float(v["default_value"])
+        elif v.default_value is not None:
+            val = v.default_value
         elif not strict:
-            if v.get("min_value") is not None:
-                val = float(v["min_value"])
+            if v.min_value is not None:
+                val = v.min_value
             else:
                 val = 1.0
         else:
             raise HTTPException(status_code=400, detail=f"Falta valor para variable: {code}")
 
-        if v.get("min_value") is not None and val < float(v["min_value"]):
-            raise HTTPException(status_code=400, detail=f"{code} debe ser >= {v['min_value']}")
-        if v.get("max_value") is not None and val > float(v["max_value"]):
-            raise HTTPException(status_code=400, detail=f"{code} debe ser <= {v['max_value']}")
+        if v.min_value is not None and val < v.min_value:
+            raise HTTPException(status_code=400, detail=f"{code} debe ser >= {v.min_text}")
+        if v.max_value is not None and val > v.max_value:
+            raise HTTPException(status_code=400, detail=f"{code} debe ser <= {v.max_text}")
         numeric_vars[code] = val
 
     for opt_code, values in options_def.items():
@@ -146,78 +113,6 @@ def _build_variable_context(
     return numeric_vars, opts_selected
 
 
-def _eval_condition(var_name: str, operator: str, condition_value: str, numeric_vars: dict, opts_selected: dict) -> bool:
-    var = var_name.strip().lower()
-    if var in numeric_vars:
-        left = float(numeric_vars[var])
-        try:
-            right = float(condition_value)
-        except Exception:
-            raise HTTPException(status_code=400, detail=f"condition_value inválido para {var}")
-        if operator == "==":
-            return left == right
-        if operator == "!=":
-            return left != right
-        if operator == ">":
-            return left > right
-        if operator == "<":
-            return left < right
-        if operator == ">=":
-            return left >= right
-        if operator == "<=":
-            return left <= right
-        return False
-
-    if var in opts_selected:
-        left = opts_selected[var]
-        if operator == "==":
-            return left == condition_value
-        if operator == "!=":
-            return left != condition_value
-        return False
-
-    return False
-
-
-def _apply_supply_rules(
-    qty: float,
-    supply_id: str,
-    rules: list[dict],
-    numeric_vars: dict,
-    opts_selected: dict,
-) -> float:
-    new_qty = float(qty)
-    for r in rules:
-        if r["scope"] != "supply":
-            continue
-        if str(r.get("target_supply_id")) != str(supply_id):
-            continue
-        if not _eval_condition(r["condition_var"], r["operator"], r["condition_value"], numeric_vars, opts_selected):
-            continue
-        if r["effect_type"] == "multiplier":
-            new_qty *= float(r["effect_value"])
-        elif r["effect_type"] == "add_qty":
-            new_qty += float(r["effect_value"])
-    return float(new_qty)
-
-
-def _apply_global_rules(
-    total_cost: float,
-    rules: list[dict],
-    numeric_vars: dict,
-    opts_selected: dict,
-) -> float:
-    new_total = float(total_cost)
-    for r in rules:
-        if r["scope"] != "global":
-            continue
-        if not _eval_condition(r["condition_var"], r["operator"], r["condition_value"], numeric_vars, opts_selected):
-            continue
-        if r["effect_type"] == "multiplier":
-            new_total *= float(r["effect_value"])
-    return float(new_total)
-
-
 def _compute_recipe_cost(
     recipe_id: str,
     width: float | None,
@@ -226,14 +121,22 @@ def _compute_recipe_cost(
     opts_payload: dict | None,
     strict: bool,
 ):
-    with get_conn() as conn:
-        with conn.cursor() as cur:
-            rows = recipes_repo.list_recipe_items_for_cost(cur, recipe_id)
-            variables_def, options_def, rules = _load_recipe_context(cur, recipe_id)
+    plan = get_cost_plan(recipe_id)
+    return _cost_from_plan(recipe_id, plan, width, height, vars_payload, opts_payload, strict)
 
+
+def _cost_from_plan(
+    recipe_id: str,
+    plan: CostPlan,
+    width: float | None,
+    height: float | None,
+    vars_payload: dict | None,
+    opts_payload: dict | None,
+    strict: bool,
+):
     numeric_vars, opts_selected = _build_variable_context(
-        variables_def,
-        options_def,
+        plan.variables,
+        plan.options,
         width,
         height,
         vars_payload,
@@ -245,35 +148,35 @@ def _compute_recipe_cost(
     total = 0.0
     has_formula = False
 
-    for supply_id, supply_name, qty_base, waste_pct, avg_unit_cost, qty_formula, unit_code, unit_name in rows:
-        if qty_formula:
+    for it in plan.items:
+        if it.formula is not None:
             has_formula = True
-            qty = float(eval_formula(qty_formula, numeric_vars))
+            qty = float(it.formula(numeric_vars))
         else:
-            qty = float(qty_base)
+            qty = it.qty_base
 
-        qty = _apply_supply_rules(qty, str(supply_id), rules, numeric_vars, opts_selected)
-        cost_u = float(avg_unit_cost)
+        qty = apply_supply_rules(qty, plan.rules.for_supply(it.supply_id), numeric_vars, opts_selected)
+        cost_u = it.avg_unit_cost
 
-        qty_with_waste = apply_waste(qty, float(waste_pct), unit_code, unit_name)
+        qty_with_waste = apply_waste(qty, it.waste_pct, it.is_piece)
         line_cost = qty_with_waste * cost_u
         total += line_cost
 
         items.append(
             {
-                "supply_id": str(supply_id),
-                "supply_name": supply_name,
+                "supply_id": it.supply_id,
+                "supply_name": it.supply_name,
                 "qty_base": qty,
-                "waste_pct": float(waste_pct),
+                "waste_pct": it.waste_pct,
                 "qty_with_waste": qty_with_waste,
                 "avg_unit_cost": cost_u,
                 "line_cost": _round2(line_cost),
-                "qty_formula": qty_formula,
-                "unit_code": unit_code,
+                "qty_formula": it.qty_formula,
+                "unit_code": it.unit_code,
             }
         )
 
-    total = _apply_global_rules(total, rules, numeric_vars, opts_selected)
+    total = apply_global_rules(total, plan.rules.global_rules, numeric_vars, opts_selected)
 
     return {
         "recipe_id": recipe_id,
@@ -285,6 +188,11 @@ def _compute_recipe_cost(
     }
 
 
+def materials_cost_at_defaults(recipe_id: str, plan: CostPlan) -> float:
+    """Costo de materiales sin medidas ni selección: ancho/alto 1 y variables por defecto."""
+    return _cost_from_plan(recipe_id, plan, None, None, None, None, False)["materials_cost"]
+
+
 def create_recipe(product_id: str, name: str):
     with get_conn() as conn:
         with conn.cursor() as cur:
@@ -303,16 +211,26 @@ def list_recipes(product_id: str):
     with get_conn() as conn:
         with conn.cursor() as cur:
             rows = recipes_repo.list_recipes(cur, product_id)
-    return [
-        {
-            "id": str(r[0]),
-            "product_id": str(r[1]),
-            "name": r[2],
-            "created_at": r[3],
-            "margin_target": float(r[4]) if r[4] is not None else 0.4,
-        }
-        for r in rows
-    ]
+    from .recipe_costs import cached_recipe_costs  # evita import circular
+
+    costs = cached_recipe_costs([r[0] for r in rows])
+    out = []
+    for r in rows:
+        margin = float(r[4]) if r[4] is not None else 0.4
+        cost = costs.get(plan_key(r[0]))
+        out.append(
+            {
+                "id": str(r[0]),
+                "product_id": str(r[1]),
+                "name": r[2],
+                "created_at": r[3],
+                "margin_target": margin,
+                # solo recetas fijas; las variables se cotizan con /recipes/{id}/cost
+                "materials_cost": cost,
+                "suggested_price": _round2(cost / (1 - margin)) if cost is not None and margin < 1 else None,
+            }
+        )
+    return out
 
 
 def get_recipe(recipe_id: str):
@@ -372,7 +290,9 @@ def delete_recipe(recipe_id: str):
                     detail="No se puede eliminar la receta porque tiene ventas asociadas",
                 )
             ok = recipes_repo.delete_recipe(cur, recipe_id)
+            notify_recipe(cur, recipe_id)
         conn.commit()
+    invalidate_recipe(recipe_id)
     if not ok:
         raise HTTPException(status_code=404, detail="recipe_id no existe")
     return {"ok": True, "id": recipe_id}
@@ -396,9 +316,70 @@ def recipe_cost(
     )
 
 
+async def recipe_cost_async(
+    recipe_id: str,
+    width: float | None = None,
+    height: float | None = None,
+    vars_payload: dict | None = None,
+    opts_payload: dict | None = None,
+    strict: bool = False,
+):
+    # con el plan en caché no hay viaje a la BD; si falta se carga por el pool async
+    plan = (await get_cost_plans_async([recipe_id]))[plan_key(recipe_id)]
+    return _cost_from_plan(recipe_id, plan, width, height, vars_payload, opts_payload, strict)
+
+
+MAX_BATCH_ENTRIES = 500
+
+
+def recipe_cost_batch(entries: list[dict]):
+    if not entries:
+        raise HTTPException(status_code=400, detail="Se requiere al menos 1 configuración")
+    if len(entries) > MAX_BATCH_ENTRIES:
+        raise HTTPException(status_code=400, detail=f"Máximo {MAX_BATCH_ENTRIES} configuraciones por lote")
+
+    def valid_id(value) -> bool:
+        try:
+            uuid.UUID(str(value).strip())
+            return True
+        except ValueError:
+            return False
+
+    # un recipe_id mal formado haría fallar la consulta de todo el lote
+    valid = [valid_id(e.get("recipe_id")) for e in entries]
+    ids = [e["recipe_id"] for e, ok in zip(entries, valid) if ok]
+    plans = get_cost_plans(ids) if ids else {}
+
+    results = []
+    for idx, e in enumerate(entries):
+        if not valid[idx]:
+            results.append({"index": idx, "ok": False, "status_code": 400, "error": "recipe_id inválido"})
+            continue
+        try:
+            data = _cost_from_plan(
+                e["recipe_id"],
+                plans[plan_key(e["recipe_id"])],
+                e.get("width"),
+                e.get("height"),
+                e.get("vars"),
+                e.get("opts"),
+                bool(e.get("strict", False)),
+            )
+            results.append({"index": idx, "ok": True, "result": data})
+        except HTTPException as exc:
+            results.append({"index": idx, "ok": False, "status_code": exc.status_code, "error": exc.detail})
+        except Exception as exc:
+            results.append({"index": idx, "ok": False, "status_code": 500, "error": f"Internal error: {str(exc)}"})
+    return results
+
+
 def suggested_price(recipe_id: str, value: float = 0.4, mode: str = "margin", width: float | None = None, height: float | None = None):
-    data = recipe_cost(recipe_id, width=width, height=height)
-    cost = float(data["materials_cost"])
+    from .recipe_costs import cached_recipe_costs  # evita import circular
+
+    # las recetas fijas no dependen de width/height: se usa el costo precalculado
+    cost = cached_recipe_costs([recipe_id]).get(plan_key(recipe_id))
+    if cost is None:
+        cost = float(recipe_cost(recipe_id, width=width, height=height)["materials_cost"])
 
     if value < 0:
         raise HTTPException(status_code=400, detail="value debe ser >= 0")
@@ -438,3 +419,34 @@ def compute_recipe_cost_strict(
         opts_payload=opts_payload,
         strict=True,
     )
+
+
+def compute_order_costs(cur, lines, check_product: bool = True) -> list[dict]:
+    """Costeo estricto de las líneas de una venta/cotización sobre el cursor del llamador.
+
+    Todas las recetas de la orden se cargan juntas (o salen del cache de planes),
+    así que no se toma ninguna conexión adicional del pool.
+    """
+    plans = get_cost_plans([line.recipe_id for line in lines], cur)
+    out = []
+    for line in lines:
+        if float(line.qty) <= 0:
+            raise HTTPException(status_code=400, detail="qty debe ser > 0")
+        plan = plans[plan_key(line.recipe_id)]
+        if check_product and (plan.product_id is None or plan_key(plan.product_id) != plan_key(line.product_id)):
+            raise HTTPException(
+                status_code=400,
+                detail=f"recipe_id no pertenece al product_id (recipe_id={line.recipe_id})",
+            )
+        out.append(
+            _cost_from_plan(
+                line.recipe_id,
+                plan,
+                line.width,
+                line.height,
+                getattr(line, "vars", None),
+                getattr(line, "opts", None),
+                True,
+            )
+        )
+    return out
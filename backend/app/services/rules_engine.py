@@ -0,0 +1,111 @@
+import operator
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Callable, Mapping
+from fastapi import HTTPException
+
+
+_NUMERIC_OPS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    "<": operator.lt,
+    ">=": operator.ge,
+    "<=": operator.le,
+}
+
+
+@dataclass(frozen=True)
+class CompiledRule:
+    scope: str
+    target_supply_id: str | None
+    condition_var: str
+    operator: str
+    condition_value: str
+    threshold: float | None
+    numeric_op: Callable | None
+    effect_type: str
+    effect_value: float
+
+    def matches(self, numeric_vars: dict, opts_selected: dict):
+        # acepta floats o arreglos NumPy; con arreglos devuelve una máscara
+        var = self.condition_var
+        if var in numeric_vars:
+            if self.threshold is None:
+                raise HTTPException(status_code=400, detail=f"condition_value inválido para {var}")
+            if self.numeric_op is None:
+                return False
+            return self.numeric_op(numeric_vars[var], self.threshold)
+
+        if var in opts_selected:
+            left = opts_selected[var]
+            if self.operator == "==":
+                return left == self.condition_value
+            if self.operator == "!=":
+                return left != self.condition_value
+            return False
+
+        return False
+
+
+@dataclass(frozen=True)
+class RuleIndex:
+    by_supply: Mapping[str, tuple[CompiledRule, ...]]
+    global_rules: tuple[CompiledRule, ...]
+
+    def for_supply(self, supply_id: str) -> tuple[CompiledRule, ...]:
+        return self.by_supply.get(supply_id, ())
+
+
+def _parse_threshold(condition_value) -> float | None:
+    try:
+        return float(condition_value)
+    except Exception:
+        return None
+
+
+def compile_rules(rules_rows) -> RuleIndex:
+    by_supply: dict[str, list[CompiledRule]] = {}
+    global_rules: list[CompiledRule] = []
+    for r in rules_rows:
+        rule = CompiledRule(
+            scope=r[2],
+            target_supply_id=str(r[3]) if r[3] is not None else None,
+            condition_var=str(r[4]).strip().lower(),
+            operator=r[5],
+            condition_value=r[6],
+            threshold=_parse_threshold(r[6]),
+            numeric_op=_NUMERIC_OPS.get(r[5]),
+            effect_type=r[7],
+            effect_value=float(r[8]),
+        )
+        if rule.scope == "supply":
+            by_supply.setdefault(str(rule.target_supply_id), []).append(rule)
+        elif rule.scope == "global":
+            global_rules.append(rule)
+    return RuleIndex(
+        by_supply=MappingProxyType({k: tuple(v) for k, v in by_supply.items()}),
+        global_rules=tuple(global_rules),
+    )
+
+
+def apply_supply_rules(qty: float, rules: tuple[CompiledRule, ...], numeric_vars: dict, opts_selected: dict) -> float:
+    new_qty = float(qty)
+    for r in rules:
+        if not r.matches(numeric_vars, opts_selected):
+            continue
+        if r.effect_type == "multiplier":
+            new_qty *= r.effect_value
+        elif r.effect_type == "add_qty":
+            new_qty += r.effect_value
+    return float(new_qty)
+
+
+def apply_global_rules(total_cost: float, rules: tuple[CompiledRule, ...], numeric_vars: dict, opts_selected: dict) -> float:
+    new_total = float(total_cost)
+    for r in rules:
+        if not r.matches(numeric_vars, opts_selected):
+            continue
+        if r.effect_type == "multiplier":
+            new_total *= r.effect_value
+    return float(new_total)
@@ -1,8 +1,10 @@
+from datetime import date
 from fastapi import HTTPException
-from ..db import get_conn
+from ..db import get_async_conn, get_conn, write_pipeline
 from ..repositories import sales as sales_repo
 from . import recipes as recipes_service
 from .fixed_costs import get_operational_cost_per_order
+from .pagination import check_limit, decode_cursor, page
 
 
 def _round2(x: float) -> float:
@@ -30,197 +32,7 @@ def create_sale(payload):
         with get_conn() as conn:
             with conn.transaction():
                 with conn.cursor() as cur:
-                    total_sale = 0.0
-                    total_cost = 0.0
-                    prepared_lines: list[dict] = []
-                    stock_needs: dict[str, float] = {}
-                    line_materials_list: list[float] = []
-
-                    for line in payload.lines:
-                        if float(line.qty) <= 0:
-                            raise HTTPException(status_code=400, detail="qty debe ser > 0")
-
-                        if not sales_repo.ensure_recipe_belongs(cur, line.recipe_id, line.product_id):
-                            raise HTTPException(
-                                status_code=400,
-                                detail=f"recipe_id no pertenece al product_id (recipe_id={line.recipe_id})",
-                            )
-
-                        cost_data = recipes_service.compute_recipe_cost_strict(
-                            line.recipe_id,
-                            width=line.width,
-                            height=line.height,
-                            vars_payload=getattr(line, "vars", None),
-                            opts_payload=getattr(line, "opts", None),
-                        )
-                        items = cost_data["items"]
-                        if not items:
-                            raise HTTPException(status_code=400, detail="La receta no tiene items")
-
-                        unit_materials_cost = float(cost_data["materials_cost"])
-                        line_materials_cost = unit_materials_cost * float(line.qty)
-                        consumptions_for_line: list[dict] = []
-
-                        for it in items:
-                            qty_unit = float(it["qty_with_waste"])
-                            qty = qty_unit * float(line.qty)
-                            cost_u = float(it["avg_unit_cost"])
-                            supply_id = str(it["supply_id"])
-
-                            stock_needs[supply_id] = stock_needs.get(supply_id, 0.0) + qty
-                            consumptions_for_line.append(
-                                {"supply_id": supply_id, "qty_base": qty, "unit_cost": cost_u}
-                            )
-
-                        prepared_lines.append(
-                            {
-                                "product_id": line.product_id,
-                                "recipe_id": line.recipe_id,
-                                "qty": float(line.qty),
-                                "materials_cost_total": float(line_materials_cost),
-                                "materials_cost_unit": float(unit_materials_cost),
-                                "consumptions": consumptions_for_line,
-                                "width": line.width,
-                                "height": line.height,
-                                "sale_price_unit": float(line.sale_price) if line.sale_price is not None else None,
-                                "vars": getattr(line, "vars", None),
-                                "opts": getattr(line, "opts", None),
-                            }
-                        )
-
-                        line_materials_list.append(float(line_materials_cost))
-                        total_cost += line_materials_cost
-
-                    operational_per_order, period_id = get_operational_cost_per_order()
-                    operational_total = float(operational_per_order)
-                    total_cost += operational_total
-
-                    op_allocs = _allocate_operational(operational_total, line_materials_list)
-
-                    total_sale = 0.0
-                    for idx, pl in enumerate(prepared_lines):
-                        op_alloc = float(op_allocs[idx]) if idx < len(op_allocs) else 0.0
-                        unit_cost_for_price = float(pl["materials_cost_unit"]) + (
-                            op_alloc / float(pl["qty"]) if float(pl["qty"]) > 0 else 0.0
-                        )
-                        suggested_unit = unit_cost_for_price / (1.0 - float(payload.margin))
-                        sale_price_unit = (
-                            float(pl["sale_price_unit"]) if pl["sale_price_unit"] is not None else float(suggested_unit)
-                        )
-                        if sale_price_unit < 0:
-                            raise HTTPException(status_code=400, detail="sale_price debe ser >= 0")
-
-                        line_sale_total = sale_price_unit * float(pl["qty"])
-                        line_suggested_total = float(suggested_unit) * float(pl["qty"])
-                        line_profit = line_sale_total - (float(pl["materials_cost_total"]) + op_alloc)
-
-                        pl["op_alloc"] = op_alloc
-                        pl["suggested_unit"] = suggested_unit
-                        pl["sale_price_unit"] = sale_price_unit
-                        pl["line_sale_total"] = line_sale_total
-                        pl["line_suggested_total"] = line_suggested_total
-                        pl["line_profit"] = line_profit
-
-                        total_sale += line_sale_total
-
-                    total_profit = total_sale - total_cost
-
-                    for supply_id, needed in stock_needs.items():
-                        row = sales_repo.lock_supply_for_update(cur, supply_id)
-                        if not row:
-                            raise HTTPException(status_code=400, detail=f"supply_id no existe: {supply_id}")
-                        available = float(row[0])
-                        if available < needed:
-                            raise HTTPException(
-                                status_code=400,
-                                detail=f"stock insuficiente supply_id={supply_id} needed={needed} available={available}",
-                            )
-
-                    sale_id = sales_repo.insert_sale(
-                        cur,
-                        payload.customer_name,
-                        payload.notes,
-                        payload.currency,
-                        payload.margin,
-                        total_sale,
-                        total_cost,
-                        total_profit,
-                        total_materials=sum(line_materials_list),
-                        operational_cost=operational_total,
-                        fixed_cost_period_id=period_id,
-                    )
-
-                    sale_items_out: list[dict] = []
-                    movements_out: list[dict] = []
-
-                    for pl in prepared_lines:
-                        sale_item_id = sales_repo.insert_sale_item(
-                            cur,
-                            sale_id,
-                            pl["product_id"],
-                            pl["recipe_id"],
-                            pl["qty"],
-                            pl["materials_cost_total"],
-                            pl["line_suggested_total"],
-                            pl["line_sale_total"],
-                            pl["line_profit"],
-                            pl.get("width"),
-                            pl.get("height"),
-                            {"vars": pl.get("vars") or {}, "opts": pl.get("opts") or {}},
-                        )
-
-                        for c in pl["consumptions"]:
-                            supply_id = c["supply_id"]
-                            qty_out = float(c["qty_base"])
-                            cost_u = float(c["unit_cost"])
-
-                            row = sales_repo.lock_supply_for_update(cur, supply_id)
-                            current_stock = float(row[0])
-                            new_stock = current_stock - qty_out
-
-                            sales_repo.insert_sale_movement_out(cur, supply_id, qty_out, cost_u, sale_item_id)
-                            sales_repo.update_supply_stock(cur, supply_id, new_stock)
-
-                            movements_out.append(
-                                {
-                                    "supply_id": str(supply_id),
-                                    "qty_base": _round2(qty_out),
-                                    "unit_cost": _round2(cost_u),
-                                    "ref_type": "sale",
-                                    "ref_id": str(sale_item_id),
-                                }
-                            )
-
-                        sale_items_out.append(
-                            {
-                                "sale_item_id": str(sale_item_id),
-                                "product_id": pl["product_id"],
-                                "recipe_id": pl["recipe_id"],
-                                "qty": float(pl["qty"]),
-                                "materials_cost": _round2(pl["materials_cost_total"]),
-                                "suggested_price": _round2(pl["line_suggested_total"]),
-                                "sale_price": _round2(pl["line_sale_total"]),
-                                "profit": _round2(pl["line_profit"]),
-                                "width": pl.get("width"),
-                                "height": pl.get("height"),
-                            }
-                        )
-
-        total_profit = total_sale - total_cost
-
-        return {
-            "sale_id": str(sale_id),
-            "currency": payload.currency,
-            "total_sale": _round2(total_sale),
-            "total_cost": _round2(total_cost),
-            "materials_cost_total": _round2(sum(line_materials_list)),
-            "operational_cost_total": _round2(operational_total),
-            "fixed_cost_period_id": period_id,
-            "total_profit": _round2(total_profit),
-            "margin": float(payload.margin),
-            "items": sale_items_out,
-            "movements": movements_out,
-        }
+                    return create_sale_in_transaction(conn, cur, payload)
 
     except HTTPException:
         raise
@@ -228,31 +40,241 @@ def create_sale(payload):
         raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
 
 
-def list_sales(limit: int = 50, offset: int = 0):
+def create_sale_in_transaction(conn, cur, payload, costs: list[dict] | None = None):
+    """Registra la venta en la transacción abierta del llamador.
+
+    ``costs`` permite pasar el costeo por línea ya resuelto (ej. el snapshot de
+    una cotización); si falta, se costea cada línea con compute_order_costs.
+    """
+    total_sale = 0.0
+    total_cost = 0.0
+    prepared_lines: list[dict] = []
+    stock_needs: dict[str, float] = {}
+    line_materials_list: list[float] = []
+
+    if costs is None:
+        costs = recipes_service.compute_order_costs(cur, payload.lines)
+
+    for line, cost_data in zip(payload.lines, costs):
+        items = cost_data["items"]
+        if not items:
+            raise HTTPException(status_code=400, detail="La receta no tiene items")
+
+        unit_materials_cost = float(cost_data["materials_cost"])
+        line_materials_cost = unit_materials_cost * float(line.qty)
+        consumptions_for_line: list[dict] = []
+
+        for it in items:
+            qty_unit = float(it["qty_with_waste"])
+            qty = qty_unit * float(line.qty)
+            cost_u = float(it["avg_unit_cost"])
+            supply_id = str(it["supply_id"])
+
+            stock_needs[supply_id] = stock_needs.get(supply_id, 0.0) + qty
+            consumptions_for_line.append(
+                {"supply_id": supply_id, "qty_base": qty, "unit_cost": cost_u}
+            )
+
+        prepared_lines.append(
+            {
+                "product_id": line.product_id,
+                "recipe_id": line.recipe_id,
+                "qty": float(line.qty),
+                "materials_cost_total": float(line_materials_cost),
+                "materials_cost_unit": float(unit_materials_cost),
+                "consumptions": consumptions_for_line,
+                "width": line.width,
+                "height": line.height,
+                "sale_price_unit": float(line.sale_price) if line.sale_price is not None else None,
+                "vars": getattr(line, "vars", None),
+                "opts": getattr(line, "opts", None),
+            }
+        )
+
+        line_materials_list.append(float(line_materials_cost))
+        total_cost += line_materials_cost
+
+    operational_per_order, period_id = get_operational_cost_per_order(cur)
+    operational_total = float(operational_per_order)
+    total_cost += operational_total
+
+    op_allocs = _allocate_operational(operational_total, line_materials_list)
+
+    total_sale = 0.0
+    for idx, pl in enumerate(prepared_lines):
+        op_alloc = float(op_allocs[idx]) if idx < len(op_allocs) else 0.0
+        unit_cost_for_price = float(pl["materials_cost_unit"]) + (
+            op_alloc / float(pl["qty"]) if float(pl["qty"]) > 0 else 0.0
+        )
+        suggested_unit = unit_cost_for_price / (1.0 - float(payload.margin))
+        sale_price_unit = (
+            float(pl["sale_price_unit"]) if pl["sale_price_unit"] is not None else float(suggested_unit)
+        )
+        if sale_price_unit < 0:
+            raise HTTPException(status_code=400, detail="sale_price debe ser >= 0")
+
+        line_sale_total = sale_price_unit * float(pl["qty"])
+        line_suggested_total = float(suggested_unit) * float(pl["qty"])
+        line_profit = line_sale_total - (float(pl["materials_cost_total"]) + op_alloc)
+
+        pl["op_alloc"] = op_alloc
+        pl["suggested_unit"] = suggested_unit
+        pl["sale_price_unit"] = sale_price_unit
+        pl["line_sale_total"] = line_sale_total
+        pl["line_suggested_total"] = line_suggested_total
+        pl["line_profit"] = line_profit
+
+        total_sale += line_sale_total
+
+    total_profit = total_sale - total_cost
+
+    locked = {
+        str(r[0]): float(r[1])
+        for r in sales_repo.lock_supplies_for_update(cur, list(stock_needs.keys()))
+    }
+    for supply_id, needed in stock_needs.items():
+        if supply_id not in locked:
+            raise HTTPException(status_code=400, detail=f"supply_id no existe: {supply_id}")
+        available = locked[supply_id]
+        if available < needed:
+            raise HTTPException(
+                status_code=400,
+                detail=f"stock insuficiente supply_id={supply_id} needed={needed} available={available}",
+            )
+
+    with write_pipeline(conn):
+        sale_id = sales_repo.insert_sale(
+            cur,
+            payload.customer_name,
+            payload.notes,
+            payload.currency,
+            payload.margin,
+            total_sale,
+            total_cost,
+            total_profit,
+            total_materials=sum(line_materials_list),
+            operational_cost=operational_total,
+            fixed_cost_period_id=period_id,
+        )
+
+        sale_item_ids = sales_repo.insert_sale_items(
+            cur,
+            sale_id,
+            [
+                (
+                    pl["product_id"],
+                    pl["recipe_id"],
+                    pl["qty"],
+                    pl["materials_cost_total"],
+                    pl["line_suggested_total"],
+                    pl["line_sale_total"],
+                    pl["line_profit"],
+                    pl.get("width"),
+                    pl.get("height"),
+                    {"vars": pl.get("vars") or {}, "opts": pl.get("opts") or {}},
+                )
+                for pl in prepared_lines
+            ],
+        )
+
+        sale_items_out: list[dict] = []
+        movements_out: list[dict] = []
+        movement_rows: list[tuple] = []
+
+        for pl, sale_item_id in zip(prepared_lines, sale_item_ids):
+            for c in pl["consumptions"]:
+                supply_id = c["supply_id"]
+                qty_out = float(c["qty_base"])
+                cost_u = float(c["unit_cost"])
+
+                movement_rows.append((supply_id, qty_out, cost_u, sale_item_id))
+                movements_out.append(
+                    {
+                        "supply_id": str(supply_id),
+                        "qty_base": _round2(qty_out),
+                        "unit_cost": _round2(cost_u),
+                        "ref_type": "sale",
+                        "ref_id": str(sale_item_id),
+                    }
+                )
+
+            sale_items_out.append(
+                {
+                    "sale_item_id": str(sale_item_id),
+                    "product_id": pl["product_id"],
+                    "recipe_id": pl["recipe_id"],
+                    "qty": float(pl["qty"]),
+                    "materials_cost": _round2(pl["materials_cost_total"]),
+                    "suggested_price": _round2(pl["line_suggested_total"]),
+                    "sale_price": _round2(pl["line_sale_total"]),
+                    "profit": _round2(pl["line_profit"]),
+                    "width": pl.get("width"),
+                    "height": pl.get("height"),
+                }
+            )
+
+        sales_repo.insert_sale_movements_out(cur, movement_rows)
+        sales_repo.update_supplies_stock(
+            cur,
+            [(locked[supply_id] - needed, supply_id) for supply_id, needed in stock_needs.items()],
+        )
+        sales_repo.add_sale_to_daily_rollup(cur, sale_id)
+
+    total_profit = total_sale - total_cost
+
+    return {
+        "sale_id": str(sale_id),
+        "currency": payload.currency,
+        "total_sale": _round2(total_sale),
+        "total_cost": _round2(total_cost),
+        "materials_cost_total": _round2(sum(line_materials_list)),
+        "operational_cost_total": _round2(operational_total),
+        "fixed_cost_period_id": period_id,
+        "total_profit": _round2(total_profit),
+        "margin": float(payload.margin),
+        "items": sale_items_out,
+        "movements": movements_out,
+    }
+
+
+def _sale_list_row(r) -> dict:
+    return {
+        "id": str(r[0]),
+        "created_at": r[1],
+        "customer_name": r[2],
+        "notes": r[3],
+        "currency": r[4],
+        "total_sale": float(r[5]),
+        "total_cost": float(r[6]),
+        "total_profit": float(r[7]),
+        "materials_cost_total": float(r[8]) if r[8] is not None else 0.0,
+        "operational_cost_total": float(r[9]) if r[9] is not None else 0.0,
+        "margin": float(r[10]) if r[10] is not None else 0.0,
+        "voided": bool(r[11]),
+        "voided_at": r[12],
+        "void_reason": r[13],
+        "voided_by": r[14],
+    }
+
+
+def list_sales(limit: int = 50, offset: int = 0, cursor: str | None = None):
+    limit = check_limit(limit)
+    after = decode_cursor(cursor)
     with get_conn() as conn:
         with conn.cursor() as cur:
-            rows = sales_repo.list_sales(cur, limit, offset)
+            rows = sales_repo.list_sales(cur, limit + 1, offset, after)
+    rows, next_cursor = page(rows, limit, created_at_index=1)
+    return {"items": [_sale_list_row(r) for r in rows], "next_cursor": next_cursor}
 
-    return [
-        {
-            "id": str(r[0]),
-            "created_at": r[1],
-            "customer_name": r[2],
-            "notes": r[3],
-            "currency": r[4],
-            "total_sale": float(r[5]),
-            "total_cost": float(r[6]),
-            "total_profit": float(r[7]),
-            "materials_cost_total": float(r[8]) if r[8] is not None else 0.0,
-            "operational_cost_total": float(r[9]) if r[9] is not None else 0.0,
-            "margin": float(r[10]) if r[10] is not None else 0.0,
-            "voided": bool(r[11]),
-            "voided_at": r[12],
-            "void_reason": r[13],
-            "voided_by": r[14],
-        }
-        for r in rows
-    ]
+
+async def list_sales_async(limit: int = 50, offset: int = 0, cursor: str | None = None):
+    limit = check_limit(limit)
+    after = decode_cursor(cursor)
+    async with get_async_conn() as conn:
+        async with conn.cursor() as cur:
+            rows = await sales_repo.list_sales_async(cur, limit + 1, offset, after)
+    rows, next_cursor = page(rows, limit, created_at_index=1)
+    return {"items": [_sale_list_row(r) for r in rows], "next_cursor": next_cursor}
 
 
 def sales_summary(include_voided: bool = False, period: str = "7d"):
@@ -273,22 +295,9 @@ def sales_summary(include_voided: bool = False, period: str = "7d"):
             detail="period inválido. Usa: 7d, 1m, 3m, 6m, 9m, 1y, all",
         )
 
-    where_parts = []
-
-    if not include_voided:
-        where_parts.append("voided = false")
-
-    interval_literal = interval_map[period]
-    if interval_literal is not None:
-        where_parts.append(f"created_at >= now() - interval '{interval_literal}'")
-
-    where_sql = ""
-    if where_parts:
-        where_sql = "where " + " and ".join(where_parts)
-
     with get_conn() as conn:
         with conn.cursor() as cur:
-            row = sales_repo.sales_summary(cur, where_sql)
+            row = sales_repo.sales_summary(cur, interval_map[period], include_voided)
 
     total_sale = float(row[0])
     total_cost = float(row[1])
@@ -307,6 +316,31 @@ def sales_summary(include_voided: bool = False, period: str = "7d"):
     }
 
 
+MAX_DAILY_RANGE_DAYS = 3660
+
+
+def sales_daily(date_from: date, date_to: date, include_voided: bool = False):
+    if date_to < date_from:
+        raise HTTPException(status_code=400, detail="date_to debe ser >= date_from")
+    if (date_to - date_from).days > MAX_DAILY_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"El rango no puede exceder {MAX_DAILY_RANGE_DAYS} días")
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            rows = sales_repo.sales_daily(cur, date_from, date_to, include_voided)
+
+    return [
+        {
+            "day": r[0],
+            "count_sales": int(r[1]),
+            "total_sale": _round2(r[2]),
+            "total_cost": _round2(r[3]),
+            "total_profit": _round2(r[4]),
+        }
+        for r in rows
+    ]
+
+
 def get_sale_detail(sale_id: str):
     with get_conn() as conn:
         with conn.cursor() as cur:
@@ -387,31 +421,41 @@ def void_sale(sale_id: str, reason: str | None):
                 if not outs:
                     return {"error": "No hay movimientos OUT para revertir", "sale_id": sale_id}
 
-                reversed_movements = []
-                for supply_id, qty_base, unit_cost_snapshot, ref_id in outs:
-                    qty_in = float(qty_base)
-                    cost_u = float(unit_cost_snapshot)
+                returns: dict[str, float] = {}
+                for supply_id, qty_base, _unit_cost, _ref_id in outs:
+                    returns[str(supply_id)] = returns.get(str(supply_id), 0.0) + float(qty_base)
 
-                    row = sales_repo.lock_supply_for_update(cur, supply_id)
-                    if not row:
+                locked = {
+                    str(r[0]): float(r[1])
+                    for r in sales_repo.lock_supplies_for_update(cur, list(returns.keys()))
+                }
+                for supply_id in returns:
+                    if supply_id not in locked:
                         raise HTTPException(status_code=400, detail=f"supply_id no existe: {supply_id}")
 
-                    new_stock = float(row[0]) + qty_in
-
-                    mov_id = sales_repo.insert_sale_void_movement(cur, supply_id, qty_in, cost_u, ref_id)
-                    sales_repo.update_supply_stock(cur, supply_id, new_stock)
-
-                    reversed_movements.append(
-                        {
-                            "movement_id": str(mov_id),
-                            "supply_id": str(supply_id),
-                            "qty_base": qty_in,
-                            "unit_cost_snapshot": cost_u,
-                            "ref_type": "sale_void",
-                            "ref_id": str(ref_id),
-                        }
+                void_rows = [
+                    (supply_id, float(qty_base), float(unit_cost_snapshot), ref_id)
+                    for supply_id, qty_base, unit_cost_snapshot, ref_id in outs
+                ]
+                with write_pipeline(conn):
+                    mov_ids = sales_repo.insert_sale_void_movements(cur, void_rows)
+                    sales_repo.update_supplies_stock(
+                        cur,
+                        [(locked[supply_id] + qty_in, supply_id) for supply_id, qty_in in returns.items()],
                     )
-
-                sales_repo.mark_sale_voided(cur, sale_id, reason)
+                    sales_repo.mark_sale_voided(cur, sale_id, reason)
+                    sales_repo.move_sale_to_voided_rollup(cur, sale_id)
+
+                reversed_movements = [
+                    {
+                        "movement_id": str(mov_id),
+                        "supply_id": str(supply_id),
+                        "qty_base": qty_in,
+                        "unit_cost_snapshot": cost_u,
+                        "ref_type": "sale_void",
+                        "ref_id": str(ref_id),
+                    }
+                    for mov_id, (supply_id, qty_in, cost_u, ref_id) in zip(mov_ids, void_rows)
+                ]
 
     return {"ok": True, "sale_id": sale_id, "reversed_movements": reversed_movements}
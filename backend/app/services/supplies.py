@@ -1,6 +1,7 @@
 from fastapi import HTTPException
-from ..db import get_conn
+from ..db import get_async_conn, get_conn
 from ..repositories import supplies as supplies_repo
+from . import cost_plans, recipe_costs
 
 
 def create_supply(name: str, unit_base_id: int, stock_min: float):
@@ -20,31 +21,42 @@ def create_supply(name: str, unit_base_id: int, stock_min: float):
     }
 
 
+def _supply_list_row(r) -> dict:
+    return {
+        "id": str(r[0]),
+        "name": r[1],
+        "unit_base": r[2],
+        "stock_on_hand": float(r[3]),
+        "stock_min": float(r[4]),
+        "avg_unit_cost": float(r[5]),
+        "active": bool(r[6]),
+    }
+
+
 def list_supplies(include_inactive: bool = False):
     with get_conn() as conn:
         with conn.cursor() as cur:
             rows = supplies_repo.list_supplies(cur, include_inactive=include_inactive)
-    return [
-        {
-            "id": str(r[0]),
-            "name": r[1],
-            "unit_base": r[2],
-            "stock_on_hand": float(r[3]),
-            "stock_min": float(r[4]),
-            "avg_unit_cost": float(r[5]),
-            "active": bool(r[6]),
-        }
-        for r in rows
-    ]
+    return [_supply_list_row(r) for r in rows]
+
+
+async def list_supplies_async(include_inactive: bool = False):
+    async with get_async_conn() as conn:
+        async with conn.cursor() as cur:
+            rows = await supplies_repo.list_supplies_async(cur, include_inactive=include_inactive)
+    return [_supply_list_row(r) for r in rows]
 
 
 def update_supply(supply_id: str, name: str, unit_base_id: int, stock_min: float):
     with get_conn() as conn:
         with conn.cursor() as cur:
             row = supplies_repo.update_supply(cur, supply_id, name.strip(), unit_base_id, stock_min)
+            cost_plans.notify_supply(cur, supply_id)
         conn.commit()
+    cost_plans.invalidate_supply(supply_id)
     if not row:
         raise HTTPException(status_code=404, detail="supply_id no existe")
+    recipe_costs.refresh_costs_after_commit([supply_id])
     return {
         "id": str(row[0]),
         "name": row[1],
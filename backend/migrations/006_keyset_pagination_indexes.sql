@@ -0,0 +1,13 @@
+-- Indexes for keyset pagination on (created_at, id)
+
+create index if not exists sales_created_at_id_idx
+  on public.sales (created_at desc, id desc);
+
+create index if not exists quotes_created_at_id_idx
+  on public.quotes (created_at desc, id desc);
+
+create index if not exists quotes_status_created_at_id_idx
+  on public.quotes (status, created_at desc, id desc);
+
+create index if not exists inventory_movements_supply_created_at_id_idx
+  on public.inventory_movements (supply_id, created_at desc, id desc);
@@ -0,0 +1,21 @@
+-- Daily sales rollup maintained by create_sale / void_sale
+-- Rebuild with: python -m app.sales_rollup rebuild
+
+create table if not exists public.sales_daily_rollup (
+  day date not null,
+  voided boolean not null,
+  count_sales bigint not null default 0,
+  total_sale numeric not null default 0,
+  total_cost numeric not null default 0,
+  total_profit numeric not null default 0,
+  primary key (day, voided)
+);
+
+-- Initial backfill (only when the table is empty).
+-- Days are taken in the SALES_TIMEZONE default; rebuild after changing that setting.
+insert into public.sales_daily_rollup (day, voided, count_sales, total_sale, total_cost, total_profit)
+select (created_at::timestamptz at time zone 'America/Tegucigalpa')::date, voided, count(*), coalesce(sum(total_sale), 0),
+       coalesce(sum(total_cost), 0), coalesce(sum(total_profit), 0)
+from public.sales
+where not exists (select 1 from public.sales_daily_rollup)
+group by 1, voided;
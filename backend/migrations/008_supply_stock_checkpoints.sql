@@ -0,0 +1,15 @@
+-- Per-supply stock checkpoint: totals of inventory_movements up to
+-- (last_created_at, last_movement_id), inclusive.
+-- Summaries and the kardex opening balance read checkpoint + later movements.
+-- Advance / reconcile with: python -m app.stock_reconcile
+
+create table if not exists public.supply_stock_checkpoints (
+  supply_id uuid primary key references public.supplies(id) on delete cascade,
+  last_created_at timestamptz not null,
+  last_movement_id uuid not null,
+  total_in numeric not null default 0,
+  total_out numeric not null default 0,
+  balance_value numeric not null default 0,
+  movement_count bigint not null default 0,
+  updated_at timestamptz not null default now()
+);
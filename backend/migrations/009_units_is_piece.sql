@@ -0,0 +1,67 @@
+-- Stored piece flag on units, kept in sync with public.piece_unit_codes
+-- A unit is a piece unit when its code or name (trimmed, lowercase) is listed.
+-- With an empty piece_unit_codes the built-in defaults (the 002 seed) apply,
+-- as the old DEFAULT_PIECE_CODES fallback did.
+
+alter table public.units
+  add column if not exists is_piece boolean not null default false;
+
+create or replace function public.unit_is_piece(p_code text, p_name text)
+returns boolean
+language sql
+stable
+as $$
+  with codes as (
+    select code from public.piece_unit_codes
+    union all
+    select d.code
+    from unnest(array[
+      'unidad', 'pieza', 'unidad/pieza', 'unit', 'units', 'piece', 'pieces',
+      'u', 'ud', 'uds', 'pz', 'pza', 'pzas', 'pc', 'pcs'
+    ]) as d(code)
+    where not exists (select 1 from public.piece_unit_codes)
+  )
+  select exists (
+    select 1 from codes c
+    where c.code in (lower(btrim(coalesce(p_code, ''))), lower(btrim(coalesce(p_name, ''))))
+  )
+$$;
+
+-- units: recompute the flag of the row being written
+create or replace function public.units_set_is_piece()
+returns trigger
+language plpgsql
+as $$
+begin
+  new.is_piece := public.unit_is_piece(new.code, new.name);
+  return new;
+end;
+$$;
+
+drop trigger if exists units_set_is_piece on public.units;
+create trigger units_set_is_piece
+before insert or update of code, name on public.units
+for each row execute function public.units_set_is_piece();
+
+-- piece_unit_codes: recompute every unit when the list changes
+create or replace function public.piece_unit_codes_refresh_units()
+returns trigger
+language plpgsql
+as $$
+begin
+  update public.units u
+  set is_piece = public.unit_is_piece(u.code, u.name)
+  where u.is_piece is distinct from public.unit_is_piece(u.code, u.name);
+  return null;
+end;
+$$;
+
+drop trigger if exists piece_unit_codes_refresh_units on public.piece_unit_codes;
+create trigger piece_unit_codes_refresh_units
+after insert or update or delete or truncate on public.piece_unit_codes
+for each statement execute function public.piece_unit_codes_refresh_units();
+
+-- Backfill
+update public.units u
+set is_piece = public.unit_is_piece(u.code, u.name)
+where u.is_piece is distinct from public.unit_is_piece(u.code, u.name);
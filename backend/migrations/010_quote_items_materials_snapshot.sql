@@ -0,0 +1,6 @@
+-- Per-unit materials costing captured when the quote is created:
+-- {"materials_cost": n, "items": [{"supply_id", "qty_with_waste", "avg_unit_cost"}]}
+-- Conversion reuses it while the supplies' avg_unit_cost has not changed.
+
+alter table public.quote_items
+  add column if not exists materials_snapshot jsonb;
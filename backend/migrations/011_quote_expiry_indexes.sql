@@ -0,0 +1,10 @@
+-- Partial indexes on open quotes
+-- Sweeper (python -m app.quote_expiry): draft/sent quotes past valid_until
+create index if not exists quotes_expirable_valid_until_idx
+  on public.quotes (valid_until, id)
+  where status in ('draft', 'sent');
+
+-- GET /quotes?active=true: keyset order over open quotes only
+create index if not exists quotes_active_created_at_id_idx
+  on public.quotes (created_at desc, id desc)
+  where status in ('draft', 'sent', 'accepted');
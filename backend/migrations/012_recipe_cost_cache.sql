@@ -0,0 +1,133 @@
+-- Precomputed material cost of fixed recipes (no formulas, variables or options)
+-- Purchases recompute the recipes that use the bought supplies right after commit;
+-- any other change to a recipe's inputs marks its row stale and readers recompute it.
+
+-- Reverse index supply -> recipes
+create index if not exists recipe_items_supply_id_recipe_id_idx
+  on public.recipe_items (supply_id, recipe_id);
+
+create table if not exists public.recipe_cost_cache (
+  recipe_id uuid primary key references public.recipes(id) on delete cascade,
+  -- null: the cost depends on size, variables, options or rules
+  materials_cost numeric,
+  stale boolean not null default false,
+  computed_at timestamptz not null default now()
+);
+
+-- recipe_variables/options/rules keep recipe_id as text (migration 003, no FK);
+-- a value that is not a uuid cannot match any cached recipe
+create or replace function public.recipe_cost_cache_uuid(p_value text)
+returns uuid
+language sql
+immutable
+as $$
+  select case
+    when p_value ~* '^[0-9a-f]{8}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{12}$' then p_value::uuid
+  end
+$$;
+
+create or replace function public.recipe_cost_cache_mark_stale()
+returns trigger
+language plpgsql
+as $$
+begin
+  if tg_op in ('UPDATE', 'DELETE') then
+    update public.recipe_cost_cache set stale = true
+    where recipe_id = public.recipe_cost_cache_uuid(old.recipe_id::text) and not stale;
+  end if;
+  if tg_op in ('INSERT', 'UPDATE') then
+    update public.recipe_cost_cache set stale = true
+    where recipe_id = public.recipe_cost_cache_uuid(new.recipe_id::text) and not stale;
+  end if;
+  return null;
+end;
+$$;
+
+drop trigger if exists recipe_cost_cache_stale on public.recipe_items;
+create trigger recipe_cost_cache_stale
+after insert or update or delete on public.recipe_items
+for each row execute function public.recipe_cost_cache_mark_stale();
+
+drop trigger if exists recipe_cost_cache_stale on public.recipe_variables;
+create trigger recipe_cost_cache_stale
+after insert or update or delete on public.recipe_variables
+for each row execute function public.recipe_cost_cache_mark_stale();
+
+drop trigger if exists recipe_cost_cache_stale on public.recipe_options;
+create trigger recipe_cost_cache_stale
+after insert or update or delete on public.recipe_options
+for each row execute function public.recipe_cost_cache_mark_stale();
+
+drop trigger if exists recipe_cost_cache_stale on public.recipe_rules;
+create trigger recipe_cost_cache_stale
+after insert or update or delete on public.recipe_rules
+for each row execute function public.recipe_cost_cache_mark_stale();
+
+create or replace function public.recipe_cost_cache_mark_stale_by_option()
+returns trigger
+language plpgsql
+as $$
+begin
+  update public.recipe_cost_cache c set stale = true
+  where not c.stale
+    and c.recipe_id in (
+      select public.recipe_cost_cache_uuid(o.recipe_id)
+      from public.recipe_options o
+      where o.id in (
+        case when tg_op = 'INSERT' then null else old.option_id end,
+        case when tg_op = 'DELETE' then null else new.option_id end
+      )
+    );
+  return null;
+end;
+$$;
+
+drop trigger if exists recipe_cost_cache_stale on public.recipe_option_values;
+create trigger recipe_cost_cache_stale
+after insert or update or delete on public.recipe_option_values
+for each row execute function public.recipe_cost_cache_mark_stale_by_option();
+
+-- Supply cost or unit changes: recipes found through the reverse index
+create or replace function public.recipe_cost_cache_mark_stale_by_supply()
+returns trigger
+language plpgsql
+as $$
+begin
+  update public.recipe_cost_cache c set stale = true
+  where not c.stale
+    and c.recipe_id in (select ri.recipe_id from public.recipe_items ri where ri.supply_id = new.id);
+  return null;
+end;
+$$;
+
+drop trigger if exists recipe_cost_cache_stale on public.supplies;
+create trigger recipe_cost_cache_stale
+after update of avg_unit_cost, unit_base_id on public.supplies
+for each row
+when (old.avg_unit_cost is distinct from new.avg_unit_cost or old.unit_base_id is distinct from new.unit_base_id)
+execute function public.recipe_cost_cache_mark_stale_by_supply();
+
+-- Piece flag changes (migration 009) change waste rounding
+create or replace function public.recipe_cost_cache_mark_stale_by_unit()
+returns trigger
+language plpgsql
+as $$
+begin
+  update public.recipe_cost_cache c set stale = true
+  where not c.stale
+    and c.recipe_id in (
+      select ri.recipe_id
+      from public.recipe_items ri
+      join public.supplies s on s.id = ri.supply_id
+      where s.unit_base_id = new.id
+    );
+  return null;
+end;
+$$;
+
+drop trigger if exists recipe_cost_cache_stale on public.units;
+create trigger recipe_cost_cache_stale
+after update of is_piece on public.units
+for each row
+when (old.is_piece is distinct from new.is_piece)
+execute function public.recipe_cost_cache_mark_stale_by_unit();
@@ -0,0 +1,70 @@
+-- Low-stock threshold crossings, recorded by a trigger on supplies so every
+-- stock-changing path (sales, voids, production, purchases) is covered.
+-- Each event is published on the stock_alerts channel when the transaction commits.
+
+create table if not exists public.stock_alert_events (
+  id bigserial primary key,
+  supply_id uuid not null references public.supplies(id) on delete cascade,
+  kind text not null check (kind in ('low', 'recovered')),
+  stock_on_hand numeric not null,
+  stock_min numeric not null,
+  created_at timestamptz not null default now()
+);
+
+create index if not exists stock_alert_events_supply_id_id_idx
+  on public.stock_alert_events (supply_id, id desc);
+
+create or replace function public.stock_alert_record()
+returns trigger
+language plpgsql
+as $$
+declare
+  ev public.stock_alert_events;
+begin
+  insert into public.stock_alert_events (supply_id, kind, stock_on_hand, stock_min)
+  values (
+    new.id,
+    case when new.active and new.stock_on_hand <= new.stock_min then 'low' else 'recovered' end,
+    new.stock_on_hand,
+    new.stock_min
+  )
+  returning * into ev;
+
+  perform pg_notify(
+    'stock_alerts',
+    json_build_object(
+      'id', ev.id,
+      'supply_id', ev.supply_id,
+      'name', new.name,
+      'kind', ev.kind,
+      'stock_on_hand', ev.stock_on_hand,
+      'stock_min', ev.stock_min,
+      'created_at', ev.created_at
+    )::text
+  );
+  return null;
+end;
+$$;
+
+-- Fires only on crossings, not on every stock change
+drop trigger if exists stock_alert_crossing on public.supplies;
+create trigger stock_alert_crossing
+after update of stock_on_hand, stock_min, active on public.supplies
+for each row
+when (
+  (old.active and old.stock_on_hand <= old.stock_min)
+  is distinct from (new.active and new.stock_on_hand <= new.stock_min)
+)
+execute function public.stock_alert_record();
+
+drop trigger if exists stock_alert_created_low on public.supplies;
+create trigger stock_alert_created_low
+after insert on public.supplies
+for each row
+when (new.active and new.stock_on_hand <= new.stock_min)
+execute function public.stock_alert_record();
+
+-- /alerts/low-stock reads only the supplies under their minimum, already ordered
+create index if not exists supplies_low_stock_idx
+  on public.supplies ((stock_on_hand - stock_min), name)
+  where active = true and stock_on_hand <= stock_min;
@@ -0,0 +1,19 @@
+-- units.is_piece only changes through SQL (units or piece_unit_codes edits),
+-- so no API write path notifies: tell every worker to drop its cost plans.
+
+create or replace function public.units_notify_cost_plans()
+returns trigger
+language plpgsql
+as $$
+begin
+  perform pg_notify('cost_plans_changed', 'all');
+  return null;
+end;
+$$;
+
+drop trigger if exists units_notify_cost_plans on public.units;
+create trigger units_notify_cost_plans
+after update of is_piece on public.units
+for each row
+when (old.is_piece is distinct from new.is_piece)
+execute function public.units_notify_cost_plans();
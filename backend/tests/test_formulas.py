@@ -0,0 +1,112 @@
+"""Pruebas diferenciales: compile_formula debe dar lo mismo que interpret_formula.
+
+Mismo resultado para fórmulas válidas y el mismo primer error (tipo y mensaje)
+para las inválidas.
+"""
+import math
+import random
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.formulas import clear_formula_cache, eval_formula, interpret_formula
+
+
+def _outcome(fn, expr, variables):
+    try:
+        return ("ok", fn(expr, variables))
+    except HTTPException as exc:
+        return ("http", exc.status_code, exc.detail)
+    except Exception as exc:
+        return ("exc", type(exc).__name__)
+
+
+def _assert_same(expr, variables):
+    expected = _outcome(interpret_formula, expr, variables)
+    got = _outcome(eval_formula, expr, variables)
+    if expected[0] == "ok" and got[0] == "ok" and math.isnan(expected[1]) and math.isnan(got[1]):
+        return
+    assert got == expected, f"{expr!r} con {variables!r}"
+
+
+CASES = [
+    ("width * height", {"width": 2, "height": 3}),
+    ("W * H / 10000", {"w": 120, "h": 80}),
+    ("ancho + alto * 2", {"ANCHO": 1.5, "alto": 2}),
+    ("-a + +b", {"a": 1, "b": 4}),
+    ("a ** 0.5 % 3", {"a": 16}),
+    ("(a + 1) * (b - 1)", {"a": 1, "b": 1}),
+    ("True + a", {"a": 1}),
+    ("1 / 0", {}),
+    ("a % 0", {"a": 3}),
+    ("2 ** 2000.0", {}),
+    ("10 ** 400", {}),
+    ("a * b", {"a": 1}),
+    ("a // b", {"b": 1}),
+    ("a // b", {"a": 1, "b": 1}),
+    ("a << b", {}),
+    ("~a", {}),
+    ("~a", {"a": 1}),
+    ("not a", {"a": 1}),
+    ("x // y + z", {"x": 1, "y": 2}),
+    ("f(a)", {"a": 1}),
+    ("a.b", {"a": 1}),
+    ("a[0]", {"a": 1}),
+    ("'texto'", {}),
+    ("1j", {}),
+    ("None", {}),
+    ("a if b else c", {"a": 1, "b": 1, "c": 1}),
+    ("a < b", {"a": 1, "b": 2}),
+    ("(a, b)", {"a": 1, "b": 2}),
+    ("_a * 2", {"_a": 1}),
+    ("a_1 * 2", {"A_1": 3}),
+    ("a +", {}),
+]
+
+
+@pytest.mark.parametrize("expr,variables", CASES)
+def test_compiled_matches_interpreter(expr, variables):
+    clear_formula_cache()
+    _assert_same(expr, variables)
+
+
+def test_cached_formula_matches_interpreter():
+    # la segunda llamada sale de la caché LRU y no debe arrastrar variables anteriores
+    clear_formula_cache()
+    _assert_same("a * b", {"a": 2, "b": 3})
+    _assert_same("a * b", {"a": 2})
+    _assert_same("a * b", {"A": 5, "B": 7})
+
+
+_NAMES = ["a", "b", "W", "alto", "x1", "_z"]
+_GOOD_BINOPS = ["+", "-", "*", "/", "**", "%"]
+_BAD_BINOPS = ["//", "<<", "&", "|", "^", "@"]
+_CONSTANTS = ["0", "1", "2", "0.5", "3.25", "10", "1e3", "'s'", "None", "1j"]
+
+
+def _random_expr(rng: random.Random, depth: int) -> str:
+    roll = rng.random()
+    if depth <= 0 or roll < 0.25:
+        return rng.choice(_NAMES) if rng.random() < 0.6 else rng.choice(_CONSTANTS)
+    if roll < 0.35:
+        return f"{rng.choice(['-', '+', '-', '~', 'not '])}{_random_expr(rng, depth - 1)}"
+    if roll < 0.40:
+        return f"f({_random_expr(rng, depth - 1)})"
+    ops = _BAD_BINOPS if rng.random() < 0.1 else _GOOD_BINOPS
+    return f"({_random_expr(rng, depth - 1)} {rng.choice(ops)} {_random_expr(rng, depth - 1)})"
+
+
+def _random_vars(rng: random.Random) -> dict:
+    out = {}
+    for name in _NAMES:
+        if rng.random() < 0.8:
+            key = name.upper() if rng.random() < 0.3 else name
+            out[key] = rng.choice([0, 1, 2, -1, 0.5, 7.25, 100])
+    return out
+
+
+def test_random_formulas_match_interpreter():
+    rng = random.Random(20260101)
+    clear_formula_cache()
+    for _ in range(2000):
+        _assert_same(_random_expr(rng, 4), _random_vars(rng))
@@ -103,6 +103,21 @@ export default function KardexPage() {
       if (res.ok) {
         console.log("✅ Kardex endpoint usado:", url);
         const data = (await res.json()) as Movement[];
+
+        // /movements viene paginado: seguimos X-Next-Cursor para tener todo el historial
+        let next = res.headers.get("X-Next-Cursor");
+        while (next) {
+          const pageRes = await fetch(
+            `${url}&limit=500&cursor=${encodeURIComponent(next)}`,
+            { cache: "no-store" }
+          );
+          if (!pageRes.ok) {
+            const text = await pageRes.text().catch(() => "");
+            throw new Error(`Error ${pageRes.status} en ${url}: ${text}`);
+          }
+          data.push(...((await pageRes.json()) as Movement[]));
+          next = pageRes.headers.get("X-Next-Cursor");
+        }
         return data;
       }
 